@@ -0,0 +1,85 @@
+"""
+Measure checkout/return throughput of CheckoutManager.apply_batch against
+replaying the same operations through checkout_book/return_book one call
+at a time (with their per-call print output discarded). Both runs persist
+through journaled storage, as `main.py --journal` does.
+
+Usage:
+    python benchmarks/bench_batch.py [--books 100000] [--ops 100000]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import random
+import tempfile
+import time
+
+from datagen import make_books
+from book import BookManager
+from user import UserManager
+from check import CheckoutManager
+from storage import JournalStorageManager
+
+def make_ops(count, books, users, seed=0):
+    """
+    Build a valid sequence of checkouts and returns.
+    """
+    rng = random.Random(seed)
+    holders = {}
+    ops = []
+    while len(ops) < count:
+        isbn = rng.randint(1, books)
+        if isbn in holders:
+            ops.append({"op": "return", "user_id": holders.pop(isbn), "isbn": isbn})
+        else:
+            holders[isbn] = rng.randint(1, users)
+            ops.append({"op": "checkout", "user_id": holders[isbn], "isbn": isbn})
+    return ops
+
+def build_managers(books, users, directory):
+    book_manager = BookManager()
+    book_manager.books = make_books(books)
+    user_manager = UserManager()
+    for user_id in range(1, users + 1):
+        user_manager.add_user(f"User {user_id}", user_id)
+    checkout_manager = CheckoutManager(user_manager, book_manager)
+    # Compaction is disabled so both runs measure only the journal appends
+    book_manager.observers.append(
+        JournalStorageManager(os.path.join(directory, "books.json"), 'isbn', compact_threshold=float('inf')))
+    checkout_manager.observers.append(
+        JournalStorageManager(os.path.join(directory, "checkouts.json"), 'isbn', compact_threshold=float('inf')))
+    return checkout_manager
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--ops", type=int, default=100_000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    ops = make_ops(args.ops, args.books, args.users)
+
+    with tempfile.TemporaryDirectory() as loop_dir, tempfile.TemporaryDirectory() as batch_dir:
+        manager = build_managers(args.books, args.users, loop_dir)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for op in ops:
+                if op["op"] == "checkout":
+                    manager.checkout_book(op["user_id"], op["isbn"])
+                else:
+                    manager.return_book(op["isbn"], op["user_id"])
+        loop_time = time.perf_counter() - start
+
+        manager = build_managers(args.books, args.users, batch_dir)
+        start = time.perf_counter()
+        result = manager.apply_batch(ops)
+        batch_time = time.perf_counter() - start
+        assert result["applied"], result["errors"][:5]
+
+    print(f"per-call loop: {args.ops / loop_time:>10.0f} ops/s")
+    print(f"apply_batch:   {args.ops / batch_time:>10.0f} ops/s ({loop_time / batch_time:.1f}x)")
+
+if __name__ == "__main__":
+    main()
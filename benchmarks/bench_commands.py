@@ -0,0 +1,84 @@
+"""
+Throughput of `main.py batch` (JSON-lines in, JSON-lines out) against
+driving the interactive menu with the same operations on stdin.
+
+A request file of add_book / find_book / checkout operations is generated,
+and both modes run as subprocesses in a scratch directory holding the
+data files, so neither touches the repository's data.
+
+Usage:
+    python benchmarks/bench_commands.py [--ops 20000]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+def make_requests(count, seed=0):
+    """
+    Build a mix of operations: roughly 40% add_book, 40% find_book and 20% checkout.
+    """
+    rng = random.Random(seed)
+    requests = []
+    next_isbn = 1
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.4 or next_isbn == 1:
+            requests.append({"op": "add_book", "title": f"Title {next_isbn}", "author": "Author", "isbn": next_isbn})
+            next_isbn += 1
+        elif roll < 0.8:
+            requests.append({"op": "find_book", "isbn": rng.randrange(1, next_isbn)})
+        else:
+            requests.append({"op": "checkout", "user_id": rng.randint(1, 100), "isbn": rng.randrange(1, next_isbn)})
+    return requests
+
+def menu_input(requests):
+    """
+    Translate the requests into keystrokes for the interactive menu.
+    """
+    lines = []
+    for request in requests:
+        if request["op"] == "add_book":
+            lines += ["1", request["title"], request["author"], str(request["isbn"])]
+        elif request["op"] == "find_book":
+            lines += ["3", "3", str(request["isbn"])]
+        else:
+            lines += ["11", str(request["user_id"]), str(request["isbn"])]
+    lines.append("15")
+    return "\n".join(lines) + "\n"
+
+def timed_run(command, directory, stdin_text=None):
+    start = time.perf_counter()
+    subprocess.run(command, cwd=directory, input=stdin_text, text=True, check=True,
+                   stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=20_000)
+    args = parser.parse_args()
+    requests = make_requests(args.ops)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        users = [{"name": f"User {user_id}", "user_id": user_id} for user_id in range(1, 101)]
+        for name, data in [("books.json", []), ("user.json", users), ("checkouts.json", [])]:
+            with open(os.path.join(tmp, name), "w") as file:
+                json.dump(data, file)
+        request_file = os.path.join(tmp, "requests.jsonl")
+        with open(request_file, "w") as file:
+            file.writelines(json.dumps(request) + "\n" for request in requests)
+
+        menu_time = timed_run([sys.executable, MAIN], tmp, menu_input(requests))
+        batch_time = timed_run([sys.executable, MAIN, "batch", "--no-save", request_file], tmp)
+
+    print(f"interactive menu: {args.ops / menu_time:>9.0f} ops/s ({menu_time:.2f} s)")
+    print(f"batch mode:       {args.ops / batch_time:>9.0f} ops/s ({batch_time:.2f} s, {menu_time / batch_time:.1f}x)")
+
+if __name__ == "__main__":
+    main()
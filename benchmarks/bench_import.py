@@ -0,0 +1,52 @@
+"""
+Time a catalog import through BookManager.bulk_add_books (streaming a CSV
+file via storage.iter_book_records) against calling add_book once per row.
+
+Usage:
+    python benchmarks/bench_import.py [--size 1000000] [--loop-size 100000]
+"""
+import argparse
+import csv
+import logging
+import os
+import tempfile
+import time
+
+from datagen import make_books
+from book import BookManager
+from storage import iter_book_records
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1_000_000, help="Rows imported with bulk_add_books")
+    parser.add_argument("--loop-size", type=int, default=100_000, help="Rows imported with the add_book loop")
+    args = parser.parse_args()
+    # Keep INFO enabled so the per-call log formatting cost is included, but discard the output
+    logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.csv")
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(["title", "author", "isbn"])
+            for book in make_books(max(args.size, args.loop_size)):
+                writer.writerow([book.title, book.author, book.isbn])
+
+        manager = BookManager()
+        start = time.perf_counter()
+        for number, record in enumerate(iter_book_records(path)):
+            if number == args.loop_size:
+                break
+            manager.add_book(record["title"], record["author"], record["isbn"])
+        loop_time = time.perf_counter() - start
+
+        manager = BookManager()
+        start = time.perf_counter()
+        summary = manager.bulk_add_books(iter_book_records(path))
+        bulk_time = time.perf_counter() - start
+
+    print(f"add_book loop:  {args.loop_size:>9} rows in {loop_time:6.2f} s ({args.loop_size / loop_time:>9.0f} rows/s)")
+    print(f"bulk_add_books: {summary['added']:>9} rows in {bulk_time:6.2f} s ({summary['added'] / bulk_time:>9.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
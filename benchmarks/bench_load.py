@@ -0,0 +1,88 @@
+"""
+Compare peak memory (RSS) and time of the original whole-file JSON loader
+with the streaming StorageManager.iter_books loader.
+
+Both loaders materialize the same list of Book objects, so the difference
+in peak RSS is the loader's own overhead (raw text, stripped copy and list
+of dicts). Each loader runs in a fresh subprocess so peak RSS is not shared.
+
+Usage:
+    python benchmarks/bench_load.py [--size 1000000]
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from datagen import make_books
+from book import Book
+from storage import StorageManager
+
+def load_whole_file(path):
+    """
+    The loader as it was before streaming: read, strip, json.loads, build a list of Books.
+    """
+    with open(path, 'r') as file:
+        data = file.read().strip()
+    return [Book(**book) for book in json.loads(data)]
+
+def load_streaming(path):
+    return list(StorageManager(path).iter_books())
+
+LOADERS = {"whole-file": load_whole_file, "streaming": load_streaming}
+
+def peak_rss_kb():
+    """
+    Peak resident set size of this process in KiB.
+
+    Prefers VmHWM from /proc, because on Linux ru_maxrss can carry over the
+    parent's high-water mark across fork/exec.
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def run_child(loader, path):
+    logging.disable(logging.CRITICAL)
+    baseline = peak_rss_kb()
+    start = time.perf_counter()
+    books = LOADERS[loader](path)
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_kb()
+    print(json.dumps({"books": len(books), "seconds": elapsed,
+                      "baseline_kb": baseline, "peak_kb": peak}))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--child", nargs=2, metavar=("LOADER", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "books.json")
+        with open(path, 'w') as file:
+            json.dump([book.to_dict() for book in make_books(args.size)], file)
+        print(f"{args.size} books, {os.path.getsize(path) / 2**20:.1f} MiB on disk")
+        print(f"{'loader':>12} {'seconds':>9} {'peak RSS MiB':>13} {'over baseline MiB':>18}")
+        for loader in LOADERS:
+            output = subprocess.run([sys.executable, __file__, "--child", loader, path],
+                                    check=True, capture_output=True, text=True).stdout
+            result = json.loads(output)
+            print(f"{loader:>12} {result['seconds']:>9.2f} {result['peak_kb'] / 1024:>13.1f} "
+                  f"{(result['peak_kb'] - result['baseline_kb']) / 1024:>18.1f}")
+
+if __name__ == "__main__":
+    main()
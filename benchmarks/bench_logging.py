@@ -0,0 +1,75 @@
+"""
+ISBN lookup throughput (find_books_by_isbn, which logs every call) under
+different logging set-ups:
+
+  off        --log-level off: the level guard skips the log call entirely
+  sync       the old set-up: a FileHandler on the root logger, formatting
+             and writing each record on the caller's thread
+  queue      eventlog.setup_logging(): records go through a QueueHandler and
+             a listener thread writes them as JSON lines
+  sampled    as queue, logging one lookup in --sample (eventlog sampling)
+
+Records written to the log file are counted after the listener is stopped.
+
+Usage:
+    python benchmarks/bench_logging.py [--books 100000] [--lookups 200000] [--sample 100]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import random
+import tempfile
+import time
+
+from datagen import make_books
+from book import BookManager
+from eventlog import setup_logging, stop_logging
+
+def configure(mode, path, sample):
+    if mode == "sync":
+        setup_logging(level=None)
+        handler = logging.FileHandler(path)
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+        root = logging.getLogger()
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+    elif mode == "off":
+        setup_logging(level=None)
+    else:
+        setup_logging(path, sample_every=sample if mode == "sampled" else 1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--sample", type=int, default=100)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        book_manager = BookManager()
+        book_manager.books = make_books(args.books)
+    rng = random.Random(0)
+    isbns = [rng.randint(1, args.books) for _ in range(args.lookups)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("off", "sync", "queue", "sampled"):
+            path = os.path.join(tmp, f"{mode}.log")
+            configure(mode, path, args.sample)
+            start = time.perf_counter()
+            for isbn in isbns:
+                book_manager.find_books_by_isbn(isbn)
+            elapsed = time.perf_counter() - start
+            stop_logging()
+            for handler in logging.getLogger().handlers[:]:
+                logging.getLogger().removeHandler(handler)
+                handler.close()
+            lines = 0
+            if os.path.exists(path):
+                with open(path) as log:
+                    lines = sum(1 for _ in log)
+            print(f"{mode:>8}: {args.lookups / elapsed:>10,.0f} lookups/s   {lines:>8,} records written")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Measure memory per book record for two representations:
+
+  * dict-backed  - a plain class with a per-instance __dict__ (Book before __slots__)
+  * slotted      - the current Book class (__slots__, interned authors)
+
+For a column layout of the catalog, see the binary snapshot (snapshot.py),
+which BookManager.load_snapshot serves from mmap without building the books.
+
+Sizes are Python heap bytes counted by tracemalloc, including the title and
+author strings each representation keeps alive.
+
+Usage:
+    python benchmarks/bench_memory.py [--size 1000000]
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+
+from datagen import TITLE_WORDS, FIRST_NAMES, LAST_NAMES
+from book import Book
+
+# The Book class as it was before __slots__
+class DictBook:
+    def __init__(self, title, author, isbn, available=True):
+        self.title = title
+        self.author = author
+        self.isbn = isbn
+        self.available = available
+
+def raw_records(count, seed=0):
+    """
+    Yield (title, author, isbn) tuples with freshly built strings, as a JSON parser would.
+    """
+    rng = random.Random(seed)
+    for isbn in range(1, count + 1):
+        title = " ".join(rng.choice(TITLE_WORDS) for _ in range(rng.randint(2, 5))).title()
+        author = " ".join([rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)])
+        yield title, author, isbn
+
+def measure(build, count):
+    gc.collect()
+    tracemalloc.start()
+    result = build(raw_records(count))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current / count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    representations = {
+        "dict-backed": lambda records: [DictBook(*record) for record in records],
+        "slotted": lambda records: [Book(*record) for record in records],
+    }
+    print(f"{args.size} books")
+    print(f"{'representation':>15} {'bytes/record':>13}")
+    for name, build in representations.items():
+        print(f"{name:>15} {measure(build, args.size):>13.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Overhead of the metrics instrumentation on a hot read path: ISBN lookups
+(find_books_by_isbn) and checkout/return pairs, with logging off, comparing
+the undecorated methods, timed() with metrics disabled, and timed() with
+metrics enabled. Prints the collected percentiles at the end.
+
+Usage:
+    python benchmarks/bench_metrics.py [--books 100000] [--ops 200000]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import random
+import time
+
+from datagen import make_books
+from book import BookManager
+from user import UserManager
+from check import CheckoutManager
+from metrics import metrics
+
+def run(book_manager, checkout_manager, isbns):
+    start = time.perf_counter()
+    for isbn in isbns:
+        book_manager.find_books_by_isbn(isbn)
+    lookups = len(isbns) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for isbn in isbns[:len(isbns) // 10]:
+        checkout_manager.checkout_book(1, isbn)
+        checkout_manager.return_book(isbn, 1)
+    checkouts = len(isbns) // 10 / (time.perf_counter() - start)
+    return lookups, checkouts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--ops", type=int, default=200_000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    book_manager = BookManager()
+    book_manager.books = make_books(args.books)
+    user_manager = UserManager()
+    user_manager.add_user("Reader", 1)
+    checkout_manager = CheckoutManager(user_manager, book_manager)
+    rng = random.Random(0)
+    isbns = [rng.randint(1, args.books) for _ in range(args.ops)]
+
+    instrumented = {}
+    for cls, name in ((BookManager, "find_books_by_isbn"), (CheckoutManager, "checkout_book"),
+                      (CheckoutManager, "return_book")):
+        instrumented[cls, name] = getattr(cls, name)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for (cls, name), method in instrumented.items():
+            setattr(cls, name, method.__wrapped__)
+        results = {"undecorated": run(book_manager, checkout_manager, isbns)}
+        for (cls, name), method in instrumented.items():
+            setattr(cls, name, method)
+        results["disabled"] = run(book_manager, checkout_manager, isbns)
+        metrics.enable()
+        results["enabled"] = run(book_manager, checkout_manager, isbns)
+
+    for label, (lookups, checkouts) in results.items():
+        print(f"{label:>12}: {lookups:>10,.0f} lookups/s   {checkouts:>9,.0f} checkout+return/s")
+    for operation, stats in metrics.snapshot()["operations"].items():
+        print(f"{operation:<32} {stats['count']:>8} calls  p50 {stats['p50'] * 1e6:7.1f} us  "
+              f"p95 {stats['p95'] * 1e6:7.1f} us  p99 {stats['p99'] * 1e6:7.1f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Speedup of ParallelSearcher (parallel_search.py) over a single-process scan
+for unindexed queries: a regex on titles, a regex on authors and a
+predicate, on --books synthetic books, with 2, 4, ... worker processes
+up to --max-workers (default: the CPU count).
+
+The one-off export of the catalog to the memory-mapped snapshot the workers
+read is timed separately; it is repeated only after the catalog changes.
+Each search is run --repeat times and the best time kept. Results are
+checked against the single-process scan.
+
+Usage:
+    python benchmarks/bench_parallel_search.py [--books 5000000] [--max-workers 8]
+"""
+import argparse
+import logging
+import os
+import re
+import time
+
+from datagen import iter_books
+from book import BookManager
+from parallel_search import ParallelSearcher, scan_books
+
+def checked_out_by_emma(book):
+    return not book.available and book.author.startswith("Emma")
+
+# Label -> (pattern, field, predicate)
+QUERIES = {
+    "title regex": (r"\b(river|garden)s?\b.*\bnight", "title", None),
+    "author regex": (r"^(ha|ge)\w* .*(son|sen)$", "author", None),
+    "predicate": (None, "title", checked_out_by_emma),
+}
+
+def best_of(repeat, function, *args, **kwargs):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=5_000_000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    book_manager = BookManager()
+    book_manager.books = iter_books(args.books, checked_out=frozenset(range(1, args.books + 1, 7)))
+    workers = [1]
+    while workers[-1] * 2 <= args.max_workers:
+        workers.append(workers[-1] * 2)
+    if workers[-1] != args.max_workers:
+        workers.append(args.max_workers)
+    print(f"{args.books:,} books, {os.cpu_count()} CPUs")
+
+    baseline = {}
+    for label, (pattern, field, predicate) in QUERIES.items():
+        seconds, expected = best_of(args.repeat, scan_books, book_manager.books, pattern, field, re.IGNORECASE, predicate)
+        baseline[label] = (seconds, expected)
+        print(f"{label:<14} single process {seconds:>8.3f} s  {len(expected):>8,} matches")
+
+    for count in workers[1:]:
+        with ParallelSearcher(book_manager, count) as searcher:
+            start = time.perf_counter()
+            searcher.search("warm up")  # Export the catalog and start the workers
+            print(f"{count} workers: export and start {time.perf_counter() - start:.3f} s")
+            for label, (pattern, field, predicate) in QUERIES.items():
+                seconds, results = best_of(args.repeat, searcher.search, pattern, field, predicate=predicate)
+                single, expected = baseline[label]
+                assert len(results) == len(expected) and all(a is b for a, b in zip(results, expected)), label
+                print(f"{label:<14} {count:>2} workers {seconds:>10.3f} s  speedup {single / seconds:5.2f}x")
+
+if __name__ == "__main__":
+    main()
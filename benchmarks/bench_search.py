@@ -0,0 +1,61 @@
+"""
+Compare BookManager's search indexes with a full substring scan:
+the inverted token index (search_books) and the trigram index behind
+find_books_by_title / find_books_by_author.
+
+Usage:
+    python benchmarks/bench_search.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import logging
+import time
+
+from datagen import make_books
+from book import BookManager
+
+QUERIES = ["orwell", "winter garden", "sha", "silent kingdom", "priya iyer"]
+SUBSTRING_QUERIES = ["ockin", "orwe", "en Gard", "ghost ci", "Iyer"]
+
+def scan(books, query):
+    """
+    Reference implementation: substring match of every term against title and author.
+    """
+    terms = query.lower().split()
+    return [book for book in books
+            if all(term in book.title.lower() or term in book.author.lower() for term in terms)]
+
+def time_per_query(func, repeat, queries=QUERIES):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            func(query)
+    return (time.perf_counter() - start) / (repeat * len(queries))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    print(f"{'books':>10} {'build s':>9} {'scan ms':>9} {'token ms':>9} {'speedup':>8} "
+          f"{'substr ms':>10} {'trigram ms':>11} {'speedup':>8}")
+    for size in args.sizes:
+        books = make_books(size)
+        manager = BookManager(cache_size=0)  # Time the indexes, not the query cache
+        start = time.perf_counter()
+        manager.books = books
+        manager._ensure_search_indexes()  # Built lazily; keep the rebuild out of the query timings
+        build = time.perf_counter() - start
+
+        scan_time = time_per_query(lambda q: scan(books, q), 1)
+        index_time = time_per_query(manager.search_books, args.repeat)
+        substring_scan = time_per_query(
+            lambda q: [book for book in books if q.lower() in book.title.lower()], 1, SUBSTRING_QUERIES)
+        trigram_time = time_per_query(manager.find_books_by_title, args.repeat, SUBSTRING_QUERIES)
+        print(f"{size:>10} {build:>9.2f} {scan_time * 1e3:>9.2f} {index_time * 1e3:>9.3f} "
+              f"{scan_time / index_time:>7.0f}x {substring_scan * 1e3:>10.2f} {trigram_time * 1e3:>11.3f} "
+              f"{substring_scan / trigram_time:>7.0f}x")
+
+if __name__ == "__main__":
+    main()
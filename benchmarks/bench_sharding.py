@@ -0,0 +1,72 @@
+"""
+Cost of persisting a one-book change to a large catalog, stored as one
+books.json (StorageManager) or as --shards files (ShardedStorageManager):
+
+  load          read every record (shards are read from a thread pool)
+  record_change one changed book reported through the observer hook, as the
+                write-behind persister does: the monolithic file is re-read
+                and rewritten, the sharded storage rewrites one shard
+  full save     save_data of the whole catalog with one book changed, as
+                "Save and Exit" does: the monolithic file is rewritten, the
+                sharded storage (told of the change by its track_changes
+                observer) serializes and writes only the changed shard
+
+The catalog is generated with datagen.iter_books. --skip-save leaves out the
+full save, which needs the whole catalog in memory as dicts.
+
+Usage:
+    python benchmarks/bench_sharding.py [--books 5000000] [--shards 64] [--skip-save]
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from datagen import iter_books, write_json_array
+from book import Book
+from storage import StorageManager
+from sharded_storage import ShardedStorageManager
+
+def measure(label, function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    print(f"{label:<28} {time.perf_counter() - start:>8.3f} s")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=5_000_000)
+    parser.add_argument("--shards", type=int, default=64)
+    parser.add_argument("--skip-save", action="store_true", help="Skip the full-save comparison")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        monolithic = StorageManager(os.path.join(tmp, "books.json"))
+        sharded = ShardedStorageManager(os.path.join(tmp, "sharded", "books.json"), 'isbn', args.shards)
+        os.makedirs(os.path.join(tmp, "sharded"))
+        write_json_array(monolithic.file_path, iter_books(args.books))
+        sharded.write_data(monolithic.iter_data())
+        size = os.path.getsize(monolithic.file_path)
+        print(f"{args.books:,} books, {size / 2**20:,.0f} MiB; {args.shards} shards of "
+              f"~{size / args.shards / 2**20:,.1f} MiB")
+
+        def count(storage):
+            return sum(1 for _ in storage.iter_data())
+        measure("load (monolithic)", count, monolithic)
+        measure(f"load ({args.shards} shards)", count, sharded)
+
+        changed = Book("Changed Title", "Changed Author", args.books // 2, False)
+        measure("record_change (monolithic)", monolithic.record_change, "books", "put", changed.isbn, changed)
+        measure(f"record_change ({args.shards} shards)", sharded.record_change, "books", "put", changed.isbn, changed)
+
+        if not args.skip_save:
+            data = monolithic.load_data()
+            data[args.books // 3]["title"] = "Changed Again"
+            sharded.track_changes().record_change("books", "put", data[args.books // 3]["isbn"])
+            measure("full save (monolithic)", monolithic.save_data, data, 'isbn')
+            measure(f"full save ({args.shards} shards)", sharded.save_data, data, 'isbn')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Cold-start comparison of loading the catalog from books.json and from the
+binary snapshot (snapshot.py), each in a fresh subprocess:
+
+  json            stream books.json into a BookManager, then one ISBN lookup
+  snapshot        map the snapshot with BookManager.load_snapshot, then one ISBN lookup
+  snapshot+scan   as snapshot, then force every Book to be built (first listing/search)
+
+"first result" is the time from process start to the answer of the first
+lookup; it includes interpreter start-up and imports. Files are read from
+the page cache (they were just written), so this measures CPU cost, not disk.
+
+Usage:
+    python benchmarks/bench_snapshot.py [--size 1000000]
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from datagen import make_books
+
+def run_child(mode, directory):
+    logging.disable(logging.CRITICAL)
+    from book import BookManager
+    from snapshot import BookSnapshot
+    from storage import StorageManager
+
+    start = time.perf_counter()
+    book_manager = BookManager()
+    if mode == "json":
+        book_manager.books = StorageManager(os.path.join(directory, "books.json")).iter_books()
+    else:
+        book_manager.load_snapshot(BookSnapshot(os.path.join(directory, "books.bin")))
+    book = book_manager.find_books_by_isbn(12345)
+    answered_at = time.time()
+    loaded = time.perf_counter() - start
+    if mode == "snapshot+scan":
+        len(book_manager.books)
+    print(json.dumps({"load": loaded, "total": time.perf_counter() - start, "answered_at": answered_at,
+                      "found": book is not None}))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(*args.child)
+        return
+
+    from storage import StorageManager
+    from snapshot import write_snapshot
+
+    with tempfile.TemporaryDirectory() as tmp:
+        books = make_books(args.size)
+        StorageManager(os.path.join(tmp, "books.json")).save_books(books)
+        write_snapshot(os.path.join(tmp, "books.bin"), books)
+        del books
+        print(f"{args.size} books: books.json {os.path.getsize(os.path.join(tmp, 'books.json')) / 2**20:.1f} MiB, "
+              f"books.bin {os.path.getsize(os.path.join(tmp, 'books.bin')) / 2**20:.1f} MiB")
+        print(f"{'mode':>14} {'load+lookup s':>14} {'incl. scan s':>13} {'first result s':>15}")
+        for mode in ("json", "snapshot", "snapshot+scan"):
+            started_at = time.time()
+            output = subprocess.run([sys.executable, __file__, "--child", mode, tmp],
+                                    check=True, capture_output=True, text=True).stdout
+            result = json.loads(output)
+            first_result = result["answered_at"] - started_at
+            print(f"{mode:>14} {result['load']:>14.3f} {result['total']:>13.3f} {first_result:>15.3f}")
+
+if __name__ == "__main__":
+    main()
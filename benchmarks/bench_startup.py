@@ -0,0 +1,78 @@
+"""
+CLI startup cost for a session that only looks up one book by ISBN, each
+mode in a fresh subprocess running main.py's own storage and loading code:
+
+  eager           load_managers() as before: parse every file and build every object
+  lazy            load_managers(lazy=True): each manager reads its file on first use
+  lazy+snapshot   as lazy, with books mapped from a binary snapshot (--snapshot)
+
+"prompt" is the time from process start until the menu could be shown
+(imports and load_managers); "first result" until the answer of one
+find_books_by_isbn. Both include interpreter start-up.
+
+Usage:
+    python benchmarks/bench_startup.py [--books 1000000] [--users 100000] [--checkouts 100000]
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from datagen import make_books
+
+def run_child(mode, directory):
+    os.chdir(directory)
+    import main
+    logging.disable(logging.CRITICAL)
+
+    options = ["--snapshot", "books.bin"] if mode == "lazy+snapshot" else []
+    args = main.parse_args(options)
+    managers = main.load_managers(*main.open_storages(args), lazy=mode != "eager", snapshot_path=args.snapshot)
+    prompt_at = time.time()
+    book = managers[0].find_books_by_isbn(12345)
+    print(json.dumps({"prompt_at": prompt_at, "answered_at": time.time(), "found": book is not None}))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--checkouts", type=int, default=100_000)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(*args.child)
+        return
+
+    from check import Checkout
+    from snapshot import write_snapshot
+    from storage import StorageManager
+    from user import User
+
+    with tempfile.TemporaryDirectory() as tmp:
+        books = make_books(args.books)
+        for book in books[:args.checkouts]:
+            book.available = False
+        StorageManager(os.path.join(tmp, "books.json")).save_books(books)
+        write_snapshot(os.path.join(tmp, "books.bin"), books)
+        del books
+        StorageManager(os.path.join(tmp, "user.json")).save_users(
+            User(f"User {user_id}", user_id) for user_id in range(1, args.users + 1))
+        StorageManager(os.path.join(tmp, "checkouts.json")).save_checkouts(
+            Checkout(isbn % args.users + 1, isbn) for isbn in range(1, args.checkouts + 1))
+
+        print(f"{args.books} books, {args.users} users, {args.checkouts} checkouts")
+        print(f"{'mode':>14} {'prompt s':>9} {'first result s':>15}")
+        for mode in ("eager", "lazy", "lazy+snapshot"):
+            started_at = time.time()
+            output = subprocess.run([sys.executable, __file__, "--child", mode, tmp],
+                                    check=True, capture_output=True, text=True).stdout
+            result = json.loads(output)
+            print(f"{mode:>14} {result['prompt_at'] - started_at:>9.3f} "
+                  f"{result['answered_at'] - started_at:>15.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Compare the JSON StorageManager with SQLiteStorageManager on a synthetic
+catalog: full save, full load, a single-book lookup and a single-book update.
+
+For JSON, a lookup or update has to load (and for updates, rewrite) the
+whole file; SQLite answers both with a point query.
+
+Usage:
+    python benchmarks/bench_storage.py [--size 100000]
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from datagen import make_books
+from book import Book
+from storage import StorageManager
+from sqlite_storage import SQLiteStorageManager
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    books = make_books(args.size)
+    target = args.size // 2
+    changed = Book("Updated Title", "Updated Author", target, False)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_storage = StorageManager(os.path.join(tmp, "books.json"))
+        json_results = {
+            "save": timed(lambda: json_storage.save_books(books))[0],
+            "load": timed(json_storage.load_books)[0],
+            "lookup": timed(lambda: next(b for b in json_storage.iter_books() if b.isbn == target))[0],
+            "update": timed(lambda: json_storage.save_books([changed]))[0],
+        }
+
+        db = SQLiteStorageManager(os.path.join(tmp, "library.db"))
+        sqlite_results = {
+            "save": timed(lambda: db.save_books(books))[0],
+            "load": timed(db.load_books)[0],
+            "lookup": timed(lambda: db.find_book(target))[0],
+            "update": timed(lambda: db.upsert("books", changed))[0],
+        }
+        db.close()
+
+    print(f"{args.size} books")
+    print(f"{'operation':>10} {'json ms':>10} {'sqlite ms':>10}")
+    for operation in json_results:
+        print(f"{operation:>10} {json_results[operation] * 1e3:>10.2f} {sqlite_results[operation] * 1e3:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Foreground latency of checkouts and returns when every change is persisted
+to the JSON files synchronously (StorageManager as an observer, one full
+rewrite per change) and through a WriteBehindPersister over the same
+storages (changes queued in memory, flushed from a background thread).
+
+Also reports how many records the persister wrote after coalescing, and
+checks that the files match the managers after its final flush.
+
+Usage:
+    python benchmarks/bench_write_behind.py [--books 5000] [--ops 500]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import random
+import tempfile
+import time
+
+from datagen import make_books
+from book import BookManager
+from user import UserManager
+from check import CheckoutManager
+from storage import StorageManager
+from persister import WriteBehindPersister
+
+def build(books, users, directory):
+    storages = {entity: StorageManager(os.path.join(directory, f"{entity}.json"))
+                for entity in ("books", "users", "checkouts")}
+    book_manager = BookManager()
+    book_manager.books = make_books(books)
+    storages["books"].save_books(book_manager.books)
+    user_manager = UserManager()
+    for user_id in range(1, users + 1):
+        user_manager.add_user(f"User {user_id}", user_id)
+    return storages, book_manager, CheckoutManager(user_manager, book_manager)
+
+def run_ops(checkout_manager, ops, seed=0):
+    """
+    Alternate checkouts and returns on a small set of hot books; returns per-op latencies.
+    """
+    rng = random.Random(seed)
+    latencies = []
+    for _ in range(ops):
+        isbn = rng.randint(1, 200)
+        start = time.perf_counter()
+        if not checkout_manager.checkout_book(1, isbn):
+            checkout_manager.return_book(isbn, 1)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies
+
+def describe(name, latencies):
+    p50 = latencies[len(latencies) // 2] * 1e6
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+    print(f"{name:<14} p50 {p50:>9.1f} us   p99 {p99:>9.1f} us   total {sum(latencies):.2f} s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=5_000)
+    parser.add_argument("--ops", type=int, default=500)
+    parser.add_argument("--flush-interval", type=float, default=0.5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        storages, book_manager, checkout_manager = build(args.books, 10, tmp)
+        book_manager.observers.append(storages["books"])
+        checkout_manager.observers.append(storages["checkouts"])
+        synchronous = run_ops(checkout_manager, args.ops)
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        storages, book_manager, checkout_manager = build(args.books, 10, tmp)
+        persister = WriteBehindPersister(storages, args.flush_interval)
+        book_manager.observers.append(persister)
+        checkout_manager.observers.append(persister)
+        write_behind = run_ops(checkout_manager, args.ops)
+        persister.close()
+        stored = {book.isbn: book.available for book in storages["books"].iter_books()}
+        consistent = stored == {book.isbn: book.available for book in book_manager.books}
+
+    describe("synchronous", synchronous)
+    describe("write-behind", write_behind)
+    print(f"write-behind wrote {persister.records_written} records for {args.ops * 2} changes; "
+          f"files match memory after final flush: {consistent}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+import random
+import sys
+
+# Make the library modules importable when running scripts from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from book import Book
+from user import User
+from check import Checkout
+
+# Word pools used to build synthetic titles and author names
+TITLE_WORDS = [
+    "the", "of", "and", "a", "night", "river", "garden", "war", "peace", "shadow",
+    "kingdom", "silent", "winter", "summer", "house", "stone", "empire", "ghost",
+    "journey", "secret", "island", "fire", "glass", "iron", "letters", "city",
+    "mountain", "dream", "ocean", "forgotten", "last", "first", "children", "star",
+]
+FIRST_NAMES = [
+    "Harper", "George", "Jane", "Scott", "Emma", "Oliver", "Amara", "Kenji", "Lucia",
+    "Ivan", "Noor", "Mateo", "Priya", "Sven", "Chloe", "Tomas", "Aisha", "Leo",
+]
+LAST_NAMES = [
+    "Lee", "Orwell", "Austen", "Fitzgerald", "Salinger", "Morrison", "Tanaka", "Okafor",
+    "Novak", "Haddad", "Silva", "Kowalski", "Iyer", "Larsen", "Dubois", "Reyes",
+]
+
+def iter_books(count, seed=0, checked_out=frozenset()):
+    """
+    Generate a reproducible stream of synthetic books with ISBNs 1..count,
+    one at a time, so even 10M-book catalogs need no list in memory.
+
+    Args:
+        count (int): Number of books to generate.
+        seed (int): Random seed. Defaults to 0.
+        checked_out (set): ISBNs to mark unavailable. Defaults to none.
+
+    Yields:
+        Book: Each book, in ISBN order.
+    """
+    rng = random.Random(seed)
+    for isbn in range(1, count + 1):
+        title = " ".join(rng.choice(TITLE_WORDS) for _ in range(rng.randint(2, 5))).title()
+        author = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        yield Book(title, author, isbn, isbn not in checked_out)
+
+def make_books(count, seed=0):
+    """
+    Build a reproducible list of synthetic books with ISBNs 1..count.
+
+    Args:
+        count (int): Number of books to generate.
+        seed (int): Random seed. Defaults to 0.
+
+    Returns:
+        list: A list of Book objects.
+    """
+    return list(iter_books(count, seed))
+
+def iter_users(count, seed=0):
+    """
+    Generate a reproducible stream of synthetic users with IDs 1..count.
+
+    Args:
+        count (int): Number of users to generate.
+        seed (int): Random seed. Defaults to 0.
+
+    Yields:
+        User: Each user, in ID order.
+    """
+    rng = random.Random(seed + 1)
+    for user_id in range(1, count + 1):
+        yield User(f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", user_id)
+
+def make_checkouts(count, books, users, seed=0):
+    """
+    Build reproducible checkouts of `count` distinct books by random users.
+
+    Args:
+        count (int): Number of checkouts (at most `books`).
+        books (int): Number of books in the catalog (ISBNs 1..books).
+        users (int): Number of users (IDs 1..users).
+        seed (int): Random seed. Defaults to 0.
+
+    Returns:
+        list: Checkout objects, ordered by ISBN.
+    """
+    rng = random.Random(seed + 2)
+    isbns = sorted(rng.sample(range(1, books + 1), min(count, books)))
+    return [Checkout(rng.randint(1, users), isbn) for isbn in isbns]
+
+def write_json_array(path, records):
+    """
+    Write records as a JSON array (the StorageManager file format), streaming
+    one record at a time.
+
+    Args:
+        path (str): The file to write.
+        records (iterable): Objects with a to_dict() method.
+
+    Returns:
+        int: The number of records written.
+    """
+    count = 0
+    with open(path, 'w') as file:
+        file.write("[")
+        for record in records:
+            file.write(", " if count else "")
+            file.write(json.dumps(record.to_dict()))
+            count += 1
+        file.write("]")
+    return count
+
+def write_dataset(directory, books, users, checkouts, seed=0):
+    """
+    Write a consistent synthetic dataset as books.json, user.json and
+    checkouts.json: every checked-out book is marked unavailable.
+
+    Args:
+        directory (str): Where to write the files.
+        books (int): Number of books.
+        users (int): Number of users.
+        checkouts (int): Number of active checkouts.
+        seed (int): Random seed. Defaults to 0.
+
+    Returns:
+        dict: The paths of the three files, keyed "books", "users" and "checkouts".
+    """
+    paths = {entity: os.path.join(directory, name)
+             for entity, name in (("books", "books.json"), ("users", "user.json"), ("checkouts", "checkouts.json"))}
+    checkout_list = make_checkouts(checkouts, books, users, seed)
+    write_json_array(paths["checkouts"], checkout_list)
+    write_json_array(paths["books"], iter_books(books, seed, {checkout.isbn for checkout in checkout_list}))
+    write_json_array(paths["users"], iter_users(users, seed))
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a reproducible synthetic library dataset "
+                                                 "(books.json, user.json and checkouts.json).")
+    parser.add_argument("directory", help="Directory to write the files to")
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--users", type=int, help="Number of users (default: books / 10)")
+    parser.add_argument("--checkouts", type=int, help="Number of active checkouts (default: books / 20)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    users = args.users if args.users is not None else max(args.books // 10, 1)
+    checkouts = args.checkouts if args.checkouts is not None else args.books // 20
+    os.makedirs(args.directory, exist_ok=True)
+    write_dataset(args.directory, args.books, users, checkouts, args.seed)
+    print(f"Wrote {args.books} books, {users} users and {checkouts} checkouts to {args.directory}")
@@ -0,0 +1,137 @@
+"""
+Load generator for server.py: concurrent keep-alive clients on localhost
+issuing a mix of reads (find_book, search) and writes (checkout/return).
+Reports requests/sec and p50/p99 latency overall and per operation.
+
+By default a server is started as a subprocess in a scratch directory
+holding a synthetic catalog, so the repository's data is not touched.
+Pass --url to target an already running server instead.
+
+Usage:
+    python benchmarks/loadgen.py [--books 10000] [--clients 32] [--requests 20000]
+    python benchmarks/loadgen.py --url http://127.0.0.1:8080
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from datagen import make_books
+
+SERVER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server.py")
+USERS = 100
+
+def make_request(rng, books):
+    """
+    Pick one request: 60% find_book, 20% search, 20% checkout or return.
+    """
+    roll = rng.random()
+    isbn = rng.randint(1, books)
+    if roll < 0.6:
+        return "find_book", "GET", f"/find_book?isbn={isbn}", b""
+    if roll < 0.8:
+        return "search", "GET", f"/search?query={rng.choice(['night', 'river', 'lee', 'stone'])}", b""
+    op = "checkout" if roll < 0.9 else "return"
+    body = json.dumps({"user_id": rng.randint(1, USERS), "isbn": isbn}).encode()
+    return op, "POST", f"/{op}", body
+
+async def client(host, port, requests, latencies):
+    """
+    Send requests one after another over a single keep-alive connection.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for op, method, path, body in requests:
+            start = time.perf_counter()
+            writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+            await reader.readline()  # Status line
+            length = 0
+            while (line := await reader.readline()) not in (b"\r\n", b""):
+                name, _, value = line.decode().partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.setdefault(op, []).append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+async def run_load(host, port, clients, total, books, seed):
+    rng = random.Random(seed)
+    plans = [[make_request(rng, books) for _ in range(total // clients)] for _ in range(clients)]
+    latencies = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, plan, latencies) for plan in plans))
+    return time.perf_counter() - start, latencies
+
+def report(elapsed, latencies):
+    everything = sorted(value for values in latencies.values() for value in values)
+    print(f"{len(everything)} requests in {elapsed:.2f} s: {len(everything) / elapsed:,.0f} req/s")
+    rows = [("all", everything)] + [(op, sorted(values)) for op, values in sorted(latencies.items())]
+    for op, values in rows:
+        print(f"  {op:<10} n={len(values):>6}  p50={percentile(values, 0.50) * 1000:6.2f} ms"
+              f"  p99={percentile(values, 0.99) * 1000:6.2f} ms  mean={statistics.fmean(values) * 1000:6.2f} ms")
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_for_port(host, port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Server did not start on {host}:{port}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Target a running server instead of starting one")
+    parser.add_argument("--books", type=int, default=10_000, help="Catalog size of the started server")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.url:
+        url = urlsplit(args.url)
+        elapsed, latencies = asyncio.run(
+            run_load(url.hostname, url.port or 80, args.clients, args.requests, args.books, args.seed))
+        report(elapsed, latencies)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        users = [{"name": f"User {user_id}", "user_id": user_id} for user_id in range(1, USERS + 1)]
+        books = [book.to_dict() for book in make_books(args.books)]
+        for name, data in [("books.json", books), ("user.json", users), ("checkouts.json", [])]:
+            with open(os.path.join(tmp, name), "w") as file:
+                json.dump(data, file)
+        port = free_port()
+        server = subprocess.Popen([sys.executable, SERVER, "--port", str(port), "--save-interval", "1"],
+                                  cwd=tmp, stdout=subprocess.DEVNULL)
+        try:
+            wait_for_port("127.0.0.1", port)
+            elapsed, latencies = asyncio.run(
+                run_load("127.0.0.1", port, args.clients, args.requests, args.books, args.seed))
+        finally:
+            server.terminate()
+            server.wait()
+    report(elapsed, latencies)
+
+if __name__ == "__main__":
+    main()
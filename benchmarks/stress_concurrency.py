@@ -0,0 +1,156 @@
+"""
+Multi-threaded stress test for the managers' concurrent mode.
+
+1. Checkout race: every thread tries to check out every book, in its own
+   random order. Exactly one checkout per book may succeed; the script
+   checks that, and that checkouts, availability flags and the bitmap agree.
+   It then runs a checkout/return churn and checks consistency again.
+   With --unsafe the managers are built without locking, for comparison
+   (double checkouts are then possible, though timing-dependent).
+2. Read scaling: a fixed number of keyword and substring searches is split
+   across 1, 2, 4, ... threads and the throughput of each run is reported.
+   On a GIL build of CPython reads are serialized by the interpreter, so
+   throughput stays flat; the locks let them run in parallel on a
+   free-threaded build.
+
+Exits with status 1 if a consistency check fails.
+
+Usage:
+    python benchmarks/stress_concurrency.py [--books 2000] [--threads 8] [--unsafe]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from datagen import make_books
+from book import BookManager
+from user import UserManager
+from check import CheckoutManager
+
+def build(book_count, user_count, concurrent):
+    book_manager = BookManager(concurrent)
+    book_manager.books = make_books(book_count)
+    user_manager = UserManager(concurrent)
+    for user_id in range(1, user_count + 1):
+        user_manager.add_user(f"User {user_id}", user_id)
+    return book_manager, user_manager, CheckoutManager(user_manager, book_manager, concurrent)
+
+def run_threads(count, target):
+    """
+    Start `count` threads running target(index), release them together and wait.
+    """
+    barrier = threading.Barrier(count)
+    def run(index):
+        barrier.wait()
+        target(index)
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+def check_consistency(book_manager, checkout_manager):
+    """
+    Return a list of problems: books whose availability disagrees with the checkouts.
+    """
+    problems = []
+    checked_out = {checkout.isbn for checkout in checkout_manager.checkouts}
+    for book in book_manager.books:
+        if book.available == (book.isbn in checked_out):
+            problems.append(f"ISBN {book.isbn}: available={book.available} but checked out={book.isbn in checked_out}")
+    if book_manager.count_available() != len(book_manager.books) - len(checked_out):
+        problems.append(f"bitmap counts {book_manager.count_available()} available, "
+                        f"expected {len(book_manager.books) - len(checked_out)}")
+    return problems
+
+def checkout_race(book_count, thread_count, concurrent):
+    book_manager, user_manager, checkout_manager = build(book_count, thread_count, concurrent)
+    successes = [Counter() for _ in range(thread_count)]
+    def worker(index):
+        isbns = list(range(1, book_count + 1))
+        random.Random(index).shuffle(isbns)
+        for isbn in isbns:
+            if checkout_manager.checkout_book(index + 1, isbn):
+                successes[index][isbn] += 1
+    elapsed = run_threads(thread_count, worker)
+    totals = sum(successes, Counter())
+    doubles = sum(1 for count in totals.values() if count > 1)
+    problems = check_consistency(book_manager, checkout_manager)
+    if len(totals) != book_count:
+        problems.append(f"only {len(totals)} of {book_count} books were checked out")
+    if doubles:
+        problems.append(f"{doubles} double checkouts")
+    summary = (f"checkout race: {thread_count} threads x {book_count} books in {elapsed:.2f} s, "
+               f"{sum(totals.values())} successful checkouts, {doubles} books checked out more than once")
+    return summary, problems
+
+def checkout_churn(book_count, thread_count, operations, concurrent):
+    book_manager, user_manager, checkout_manager = build(book_count, thread_count, concurrent)
+    def worker(index):
+        rng = random.Random(index)
+        user_id = index + 1
+        for _ in range(operations):
+            isbn = rng.randint(1, book_count)
+            if not checkout_manager.checkout_book(user_id, isbn):
+                checkout_manager.return_book(isbn, user_id)
+    elapsed = run_threads(thread_count, worker)
+    summary = f"checkout/return churn: {thread_count * operations / elapsed:,.0f} ops/s with {thread_count} threads"
+    return summary, check_consistency(book_manager, checkout_manager)
+
+def read_scaling(book_count, max_threads, queries, concurrent):
+    book_manager, _, _ = build(book_count, 1, concurrent)
+    book_manager.search_books("warm up")  # Build the search indexes outside the timings
+    rng = random.Random(0)
+    terms = [rng.choice(["night", "river", "lee", "stone", "orw", "kingdom of"]) for _ in range(queries)]
+    print("read scaling (search_books + find_books_by_title):")
+    threads = 1
+    while threads <= max_threads:
+        share = queries // threads
+        def worker(index):
+            for term in terms[index * share:(index + 1) * share]:
+                book_manager.search_books(term)
+                book_manager.find_books_by_title(term)
+        elapsed = run_threads(threads, worker)
+        print(f"  {threads:>2} threads: {share * threads / elapsed:>9,.0f} queries/s")
+        threads *= 2
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--operations", type=int, default=5000, help="Churn operations per thread")
+    parser.add_argument("--queries", type=int, default=4000)
+    parser.add_argument("--unsafe", action="store_true", help="Build the managers without locking")
+    args = parser.parse_args()
+    concurrent = not args.unsafe
+
+    logging.disable(logging.WARNING)  # Failed returns during the churn would log warnings
+    sys.setswitchinterval(1e-6)  # Switch threads as often as possible to expose races
+    problems = []
+    for name, run in [
+        ("race", lambda: checkout_race(args.books, args.threads, concurrent)),
+        ("churn", lambda: checkout_churn(args.books, args.threads, args.operations, concurrent)),
+    ]:
+        with contextlib.redirect_stdout(io.StringIO()):  # The managers print on every checkout
+            summary, found = run()
+        print(summary)
+        problems += [f"{name}: {problem}" for problem in found]
+    sys.setswitchinterval(0.005)
+    read_scaling(args.books, args.threads, args.queries, concurrent)
+
+    for problem in problems:
+        print(f"FAIL {problem}")
+    if problems:
+        sys.exit(1)
+    print("OK: no double checkouts, availability consistent")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Correctness and speed of the LRU query cache on title, author and user name
+searches.
+
+1. Staleness check: a skewed stream of searches (a few popular queries make
+   up most of them) is interleaved with random mutations: add_book,
+   update_books, remove_book, update_book_availability, add_user,
+   update_user and remove_user. Every search is answered by a cached manager
+   and by an uncached one (cache_size=0) holding the same data, and the
+   results (ISBN or ID, title, author, availability) must be identical.
+2. Speed: the same skewed searches without mutations, cached and uncached.
+
+Exits with status 1 if a cached result was ever stale.
+
+Usage:
+    python benchmarks/stress_query_cache.py [--books 20000] [--steps 50000]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import random
+import sys
+import time
+
+from datagen import FIRST_NAMES, LAST_NAMES, TITLE_WORDS, make_books
+from book import BookManager
+from user import UserManager
+
+def build(books, users, cache_size):
+    book_manager = BookManager(cache_size=cache_size)
+    book_manager.books = make_books(books)
+    user_manager = UserManager(cache_size=cache_size)
+    for user_id in range(1, users + 1):
+        user_manager.add_user(f"{FIRST_NAMES[user_id % len(FIRST_NAMES)]} {user_id}", user_id)
+    return book_manager, user_manager
+
+def make_queries(rng, count=200):
+    """
+    Build a pool of searches with Zipf-like weights (the first is the most popular).
+    """
+    queries = []
+    for _ in range(count):
+        kind = rng.choice(("title", "author", "name"))
+        if kind == "title":
+            text = " ".join(rng.choice(TITLE_WORDS) for _ in range(rng.randint(1, 2)))
+        elif kind == "author":
+            text = rng.choice(LAST_NAMES + FIRST_NAMES)
+        else:
+            text = rng.choice(FIRST_NAMES)[:rng.randint(2, 5)]
+        queries.append((kind, text.upper() if rng.random() < 0.2 else text))
+    weights = [1 / rank for rank in range(1, count + 1)]
+    return queries, weights
+
+def search(book_manager, user_manager, kind, text):
+    if kind == "title":
+        return [(b.isbn, b.title, b.author, b.available) for b in book_manager.find_books_by_title(text)]
+    if kind == "author":
+        return [(b.isbn, b.title, b.author, b.available) for b in book_manager.find_books_by_author(text)]
+    return [(u.user_id, u.name) for u in user_manager.find_users_by_name(text)]
+
+def mutate(rng, managers, next_ids):
+    """
+    Apply one random mutation, identically, to every (book_manager, user_manager) pair.
+    """
+    choice = rng.randrange(7)
+    isbn = rng.randint(1, next_ids["isbn"])
+    user_id = rng.randint(1, next_ids["user"])
+    title = " ".join(rng.choice(TITLE_WORDS) for _ in range(3)).title()
+    author = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    available = rng.random() < 0.5
+    new_title = title if rng.random() < 0.5 else None
+    if choice == 0:
+        next_ids["isbn"] += 1
+    elif choice == 4:
+        next_ids["user"] += 1
+    for book_manager, user_manager in managers:
+        if choice == 0:
+            book_manager.add_book(title, author, next_ids["isbn"])
+        elif choice == 1:
+            book_manager.update_books(isbn, title=new_title, author=author)
+        elif choice == 2:
+            book_manager.remove_book(isbn)
+        elif choice == 3:
+            book_manager.update_book_availability(isbn, available)
+        elif choice == 4:
+            user_manager.add_user(name, next_ids["user"])
+        elif choice == 5:
+            user_manager.update_user(user_id, name)
+        else:
+            user_manager.remove_user(user_id)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--steps", type=int, default=50_000)
+    parser.add_argument("--mutation-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    rng = random.Random(args.seed)
+    queries, weights = make_queries(rng)
+    with contextlib.redirect_stdout(io.StringIO()):
+        cached = build(args.books, args.users, 1024)
+        uncached = build(args.books, args.users, 0)
+    next_ids = {"isbn": args.books, "user": args.users}
+
+    stale = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for step in range(args.steps):
+            if rng.random() < args.mutation_rate:
+                mutate(rng, (cached, uncached), next_ids)
+                continue
+            kind, text = rng.choices(queries, weights)[0]
+            if search(*cached, kind, text) != search(*uncached, kind, text):
+                stale += 1
+    book_stats, user_stats = cached[0].query_cache.stats(), cached[1].query_cache.stats()
+    print(f"{args.steps} steps at mutation rate {args.mutation_rate}: {stale} stale results")
+    print(f"book cache {book_stats}")
+    print(f"user cache {user_stats}")
+
+    workload = [rng.choices(queries, weights)[0] for _ in range(args.steps)]
+    for label, managers in (("uncached", uncached), ("cached", cached)):
+        start = time.perf_counter()
+        for kind, text in workload:
+            search(*managers, kind, text)
+        elapsed = time.perf_counter() - start
+        print(f"{label:>9}: {len(workload) / elapsed:>10,.0f} searches/s")
+
+    if stale:
+        print("FAIL: cached searches returned stale results")
+        sys.exit(1)
+    print("OK: no stale results")
+
+if __name__ == "__main__":
+    main()
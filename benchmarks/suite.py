@@ -0,0 +1,248 @@
+"""
+Reproducible benchmark suite for the managers and the JSON storage.
+
+A seeded synthetic dataset (datagen.write_dataset) is written to a scratch
+directory, loaded, and each scenario is timed --repeat times; the best run
+is kept. Logging is disabled and the managers' console output is discarded.
+
+Scenarios:
+  add_book          BookManager.add_book of every book into an empty manager
+  isbn_lookup       find_books_by_isbn of random ISBNs
+  title_search      find_books_by_title of title substrings (query cache off)
+  author_search     find_books_by_author of author substrings (query cache off)
+  user_lookup       find_user_by_id of random IDs
+  checkout_return   checkout_book then return_book of random available books
+  storage_load      StorageManager load of books, users and checkouts into the managers
+  storage_save      StorageManager save of books, users and checkouts
+
+Results are written as JSON (--output) with the environment, dataset size
+and, per scenario, the operation count, best time and microseconds per
+operation. With --baseline, each scenario is compared with a saved result
+and the script exits with status 1 if any is slower by more than
+--threshold. Only compare results taken at the same --size on the same machine.
+
+Usage:
+    python benchmarks/suite.py [--size 100000] [--output results.json]
+    python benchmarks/suite.py --baseline baseline.json [--threshold 0.15]
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from datagen import FIRST_NAMES, LAST_NAMES, TITLE_WORDS, iter_books, write_dataset
+from book import BookManager
+from user import UserManager
+from check import CheckoutManager
+from storage import StorageManager
+
+def load(paths, cache_size=1024):
+    """
+    Build the three managers from the dataset files.
+    """
+    book_manager = BookManager(cache_size=cache_size)
+    user_manager = UserManager(cache_size=cache_size)
+    checkout_manager = CheckoutManager(user_manager, book_manager)
+    book_manager.books = StorageManager(paths["books"]).iter_books()
+    user_manager.users = StorageManager(paths["users"]).iter_users()
+    checkout_manager.checkouts = StorageManager(paths["checkouts"]).iter_checkouts()
+    return book_manager, user_manager, checkout_manager
+
+def scenario_add_book(context):
+    books = [(book.title, book.author, book.isbn) for book in iter_books(context["size"], context["seed"])]
+    book_manager = BookManager()
+    start = time.perf_counter()
+    for title, author, isbn in books:
+        book_manager.add_book(title, author, isbn)
+    return len(books), time.perf_counter() - start
+
+def scenario_isbn_lookup(context):
+    book_manager = context["managers"][0]
+    isbns = [context["rng"].randint(1, context["size"]) for _ in range(context["lookups"])]
+    start = time.perf_counter()
+    for isbn in isbns:
+        book_manager.find_books_by_isbn(isbn)
+    return len(isbns), time.perf_counter() - start
+
+def scenario_title_search(context):
+    book_manager = context["uncached"][0]
+    rng = context["rng"]
+    queries = [f"{rng.choice(TITLE_WORDS)} {rng.choice(TITLE_WORDS)}" for _ in range(context["searches"])]
+    book_manager.find_books_by_title("warm up")  # Build the search indexes outside the timing
+    start = time.perf_counter()
+    for query in queries:
+        book_manager.find_books_by_title(query)
+    return len(queries), time.perf_counter() - start
+
+def scenario_author_search(context):
+    book_manager = context["uncached"][0]
+    rng = context["rng"]
+    queries = [rng.choice(FIRST_NAMES + LAST_NAMES)[:rng.randint(3, 6)] for _ in range(context["searches"])]
+    book_manager.find_books_by_author("warm up")
+    start = time.perf_counter()
+    for query in queries:
+        book_manager.find_books_by_author(query)
+    return len(queries), time.perf_counter() - start
+
+def scenario_user_lookup(context):
+    user_manager = context["managers"][1]
+    user_ids = [context["rng"].randint(1, context["users"]) for _ in range(context["lookups"])]
+    start = time.perf_counter()
+    for user_id in user_ids:
+        user_manager.find_user_by_id(user_id)
+    return len(user_ids), time.perf_counter() - start
+
+def scenario_checkout_return(context):
+    book_manager, _, checkout_manager = context["managers"]
+    rng = context["rng"]
+    pairs = []
+    while len(pairs) < context["lookups"] // 10:
+        isbn = rng.randint(1, context["size"])
+        if book_manager.get_book(isbn).available:
+            pairs.append((rng.randint(1, context["users"]), isbn))
+    start = time.perf_counter()
+    for user_id, isbn in pairs:
+        checkout_manager.checkout_book(user_id, isbn)
+        checkout_manager.return_book(isbn, user_id)
+    return 2 * len(pairs), time.perf_counter() - start
+
+def scenario_storage_load(context):
+    start = time.perf_counter()
+    book_manager, user_manager, checkout_manager = load(context["paths"])
+    elapsed = time.perf_counter() - start
+    return len(book_manager.books) + len(user_manager.users) + len(checkout_manager.checkouts), elapsed
+
+def scenario_storage_save(context):
+    book_manager, user_manager, checkout_manager = context["managers"]
+    directory = context["scratch"]
+    start = time.perf_counter()
+    StorageManager(os.path.join(directory, "books.json")).save_books(book_manager.books)
+    StorageManager(os.path.join(directory, "user.json")).save_users(user_manager.users)
+    StorageManager(os.path.join(directory, "checkouts.json")).save_checkouts(checkout_manager.checkouts)
+    elapsed = time.perf_counter() - start
+    return len(book_manager.books) + len(user_manager.users) + len(checkout_manager.checkouts), elapsed
+
+# Scenario name -> function(context) returning (operation count, seconds)
+SCENARIOS = {
+    "add_book": scenario_add_book,
+    "isbn_lookup": scenario_isbn_lookup,
+    "title_search": scenario_title_search,
+    "author_search": scenario_author_search,
+    "user_lookup": scenario_user_lookup,
+    "checkout_return": scenario_checkout_return,
+    "storage_load": scenario_storage_load,
+    "storage_save": scenario_storage_save,
+}
+
+def git_revision():
+    """
+    Return the current commit hash (with "+dirty" if the tree has changes), or None outside git.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, check=True,
+                                  capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                               check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return revision + ("+dirty" if dirty else "")
+
+def run_suite(args):
+    """
+    Generate the dataset, run the selected scenarios and return the results document.
+    """
+    users = max(args.size // 10, 1)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        os.makedirs(os.path.join(tmp, "scratch"))
+        paths = write_dataset(tmp, args.size, users, args.size // 20, args.seed)
+        context = {
+            "size": args.size, "users": users, "seed": args.seed, "paths": paths,
+            "scratch": os.path.join(tmp, "scratch"), "lookups": args.lookups, "searches": args.searches,
+            "managers": load(paths), "uncached": load(paths, cache_size=0),
+        }
+        for name in args.scenarios:
+            best = None
+            for attempt in range(args.repeat):
+                context["rng"] = random.Random(args.seed + attempt)
+                ops, seconds = SCENARIOS[name](context)
+                if best is None or seconds < best[1]:
+                    best = (ops, seconds)
+            ops, seconds = best
+            results[name] = {"ops": ops, "seconds": seconds, "us_per_op": seconds / ops * 1e6,
+                             "ops_per_sec": ops / seconds}
+    return {
+        "meta": {
+            "python": platform.python_version(), "implementation": platform.python_implementation(),
+            "platform": platform.platform(), "revision": git_revision(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "size": args.size, "users": users,
+            "checkouts": args.size // 20, "seed": args.seed, "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+def compare(current, baseline, threshold):
+    """
+    Print each scenario's change against the baseline and return the regressed scenario names.
+    """
+    if current["meta"]["size"] != baseline["meta"]["size"]:
+        print(f"warning: baseline was taken at size {baseline['meta']['size']}, "
+              f"this run at {current['meta']['size']}")
+    regressions = []
+    print(f"{'scenario':<16} {'baseline us/op':>15} {'current us/op':>14} {'change':>8}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<16} {'-':>15} {result['us_per_op']:>14.3f} {'new':>8}")
+            continue
+        change = result["us_per_op"] / before["us_per_op"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<16} {before['us_per_op']:>15.3f} {result['us_per_op']:>14.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000, help="Number of books (users: size/10, checkouts: size/20)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario; the best is kept")
+    parser.add_argument("--lookups", type=int, default=100_000, help="Lookups per lookup scenario")
+    parser.add_argument("--searches", type=int, default=2_000, help="Queries per search scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS), metavar="NAME")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare with results previously written by --output")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Relative slowdown reported as a regression (default: 0.15)")
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    current = run_suite(args)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(current, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(current, json.load(file), args.threshold)
+        if regressions:
+            print(f"FAIL: {len(regressions)} scenario(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+        print("OK: no regressions")
+    else:
+        print(f"{'scenario':<16} {'ops':>9} {'best s':>9} {'us/op':>10} {'ops/s':>12}")
+        for name, result in current["results"].items():
+            print(f"{name:<16} {result['ops']:>9} {result['seconds']:>9.3f} {result['us_per_op']:>10.3f} "
+                  f"{result['ops_per_sec']:>12,.0f}")
+
+if __name__ == "__main__":
+    main()
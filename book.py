@@ -9,9 +9,33 @@
 #         print(book)
 
 import logging
+import sys
+import threading
+from itertools import islice
+from cache import QueryCache
+from eventlog import should_log
+from index import Bitmap, TokenIndex, TrigramIndex
+from locks import RWLock, reads, writes
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+def intern_author(author):
+    """
+    Intern an author name so books by the same author share a single string.
+
+    Args:
+        author (str): The author name.
+
+    Returns:
+        str: The interned name (or the value unchanged if it is not a string).
+    """
+    return sys.intern(author) if type(author) is str else author
 
 # Class representing a book in the library
 class Book:
+    __slots__ = ('title', 'author', 'isbn', 'available')  # No per-instance __dict__, to keep large catalogs small
+
     def __init__(self, title, author, isbn, available=True):
         """
         Initialize a new Book object.
@@ -23,9 +47,18 @@ class Book:
             available (bool): Availability status of the book. Default is True.
         """
         self.title = title
-        self.author = author
+        self.author = intern_author(author)  # Authors repeat across many books; share one string each
         self.isbn = isbn
         self.available = available  # Indicates if the book is currently available for checkout
+
+    def to_dict(self):
+        """
+        Dictionary of the book's fields, as stored in books.json.
+
+        Returns:
+            dict: The title, author, isbn and available fields.
+        """
+        return {"title": self.title, "author": self.author, "isbn": self.isbn, "available": self.available}
     
     def __str__(self):
         """
@@ -39,12 +72,291 @@ class Book:
     
 # Class for managing a collection of books
 class BookManager:
-    def __init__(self):
+    def __init__(self, concurrent=False, cache_size=1024):
         """
         Initialize a new BookManager object to manage book collections.
+
+        Args:
+            concurrent (bool): Guard the collection with a reader-writer lock so
+                it can be shared between threads: searches run in parallel and
+                mutations are exclusive. Defaults to False (no locking overhead).
+            cache_size (int): Number of title and author search results kept in
+                the LRU query cache. Defaults to 1024; 0 disables the cache.
+        """
+        self._books = {}  # Primary index mapping ISBN to Book, kept in insertion order
+        self._search_index = TokenIndex()  # Inverted index over title and author tokens
+        self._title_index = TrigramIndex()  # Substring index over titles
+        self._author_index = TrigramIndex()  # Substring index over authors
+        self._search_indexes_ready = True  # False while the three search indexes await a rebuild
+        self._ids = {}  # Maps ISBN to a dense internal ID (never reused until the next reload)
+        self._isbn_by_id = []  # Maps dense ID back to ISBN; None for removed books
+        self._available = Bitmap()  # Availability bit per dense ID
+        self.observers = []  # Objects notified of every mutation via record_change()
+        self.lock = RWLock() if concurrent else None  # Reader-writer lock in concurrent mode
+        self._rebuild_lock = threading.Lock()  # Lets only one reader materialize the snapshot or rebuild indexes
+        self._snapshot = None  # Mapped BookSnapshot whose books have not been materialized yet
+        self._snapshot_books = {}  # Books built from the snapshot by point lookups, reused on materialization
+        self.query_cache = QueryCache(cache_size)  # Title/author search results by normalized query
+        self._loader = None  # Callable returning the books, run on first use (see load_lazily)
+        self.version = 0  # Incremented on every change, so copies of the collection can tell they are stale
+        self.catalog_version = 0  # Incremented when books are added or removed or a title or author changes, not on availability changes
+
+    @property
+    def books(self):
+        """
+        View of all Book objects in the collection, in insertion order.
+
+        Returns:
+            dict_values: An iterable view over the stored books.
+        """
+        self._ensure_loaded()
+        return self._books.values()
+
+    @books.setter
+    @writes
+    def books(self, books):
+        """
+        Replace the collection with the given books and rebuild the ISBN index.
+        The search indexes are rebuilt on the first search that needs them.
+
+        Args:
+            books (iterable): An iterable of Book objects.
+        """
+        self._replace_books(books)
+
+    def _replace_books(self, books):
+        """
+        Replace the collection and rebuild the ISBN index and availability bitmap
+        (the books setter, without taking the write lock).
+
+        Args:
+            books (iterable): An iterable of Book objects.
+        """
+        self._books = {book.isbn: book for book in books}
+        self._ids = {}
+        self._isbn_by_id = []
+        self._available = Bitmap()
+        for book in self._books.values():
+            self._assign_id(book)
+        self._invalidate_search_indexes()
+        self._snapshot_books = {}
+        self._loader = None
+        self.version += 1
+        self._snapshot = None  # Last, so lock-free readers never see a half-built collection
+
+    @writes
+    def load_snapshot(self, snapshot):
+        """
+        Replace the collection with the books of a binary snapshot (or another
+        on-demand book source), without building them.
+
+        Until something needs the whole collection, lookups by ISBN and the
+        available count are answered straight from the mapped snapshot, and
+        only the books looked up are built. The first listing, search or
+        change materializes every book (reusing the ones already built), after
+        which the manager behaves as if the books had been assigned normally.
+        The snapshot must stay open until then.
+
+        Args:
+            snapshot (BookSnapshot): The opened snapshot, or any source with
+                get_book(isbn), count_available(), a path and iteration over
+                every book in catalog order (e.g. sharded_storage.ShardedBooks).
+        """
+        self._replace_books(())
+        self._snapshot = snapshot
+
+    @writes
+    def load_lazily(self, loader):
+        """
+        Empty the collection and defer loading it until it is first used.
+
+        Args:
+            loader (callable): Returns an iterable of Book objects, e.g. a
+                storage's iter_books method.
+        """
+        self._replace_books(())
+        self._loader = loader
+
+    def is_loaded(self):
+        """
+        Check whether every book is in memory (no lazy load or snapshot pending).
+        A collection that is not loaded has not been changed since it was read.
+
+        Returns:
+            bool: True if the books have been loaded or materialized.
+        """
+        return self._snapshot is None and self._loader is None
+
+    def _ensure_loaded(self):
+        """
+        Run a pending lazy load, or materialize every book of a pending
+        snapshot in catalog order.
+        """
+        if self._snapshot is None and self._loader is None:
+            return
+        with self._rebuild_lock:
+            if self._loader is not None:
+                self._replace_books(self._loader())
+                logger.info("Loaded %s books on first use", len(self._books))
+                return
+            snapshot = self._snapshot
+            if snapshot is None:
+                return  # Another reader materialized it while we waited
+            built = self._snapshot_books
+            self._replace_books(built.get(book.isbn, book) for book in snapshot)
+            logger.info("Materialized %s books from snapshot %s", len(self._books), snapshot.path)
+
+    def _snapshot_book(self, isbn):
+        """
+        Look up a book in the pending snapshot, building it on first access.
+
+        Returns:
+            Book: The book (the same object on every lookup), or None if not found.
+        """
+        book = self._snapshot_books.get(isbn)
+        if book is not None:
+            return book
+        with self._rebuild_lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                return self._books.get(isbn)  # Materialized meanwhile
+            book = self._snapshot_books[isbn] = snapshot.get_book(isbn)
+            if book is None:
+                del self._snapshot_books[isbn]
+            return book
+
+    def _notify_many(self, changes):
+        """
+        Report several changes to every observer at once, so each can persist
+        them together (one journal write or one database transaction).
+
+        Args:
+            changes (list): (op, key, record) tuples, as for _notify.
+        """
+        if changes:
+            self.version += 1
+            for observer in self.observers:
+                observer.record_changes("books", changes)
+
+    def _invalidate_search_indexes(self):
+        """
+        Drop the search indexes so they are rebuilt in one pass on next use,
+        along with every cached search result.
+        """
+        self._search_index.clear()
+        self._title_index.clear()
+        self._author_index.clear()
+        self._search_indexes_ready = False
+        self.query_cache.clear()
+        self.catalog_version += 1
+
+    def _invalidate_cached_searches(self, title, author):
+        """
+        Drop the cached title and author searches that match a book's title
+        or author, i.e. whose results include (or now should include) it.
+        Results hold the Book objects themselves, so availability changes
+        never make them stale.
+
+        Args:
+            title (str): The book's title (call again with the old one after a change).
+            author (str): The book's author.
+        """
+        self.query_cache.invalidate("title", title.lower())
+        self.query_cache.invalidate("author", author.lower())
+        self.catalog_version += 1
+
+    def _ensure_search_indexes(self):
+        """
+        Rebuild the token and trigram indexes if they were invalidated.
+        """
+        self._ensure_loaded()
+        if self._search_indexes_ready:
+            return
+        with self._rebuild_lock:
+            if self._search_indexes_ready:
+                return  # Another reader rebuilt them while we waited
+            for book in self._books.values():
+                self._add_to_search_indexes(book)
+            self._search_indexes_ready = True
+
+    def _assign_id(self, book):
+        """
+        Give a newly stored book the next dense ID and record its availability bit.
+
+        Args:
+            book (Book): The book being stored.
+        """
+        self._ids[book.isbn] = len(self._isbn_by_id)
+        self._isbn_by_id.append(book.isbn)
+        self._available.append(book.available)
+
+    def _notify(self, op, key, record=None):
         """
-        self.books = []  # List to store all Book objects
+        Report a change to every registered observer (e.g. a journaled storage).
+
+        Args:
+            op (str): Either "put" (added or updated) or "delete".
+            key (int): The ISBN of the changed book.
+            record: The changed object for "put", None for "delete".
+        """
+        self.version += 1
+        for observer in self.observers:
+            observer.record_change("books", op, key, record)
+
+    def _index_book(self, book):
+        """
+        Add or refresh a book's title and author in the search indexes.
+        Does nothing while the indexes await a full rebuild.
+
+        Args:
+            book (Book): The book to index.
+        """
+        if self._search_indexes_ready:
+            self._add_to_search_indexes(book)
+
+    def _add_to_search_indexes(self, book):
+        """
+        Add or refresh a book's title and author in the token and trigram indexes.
+
+        Args:
+            book (Book): The book to index.
+        """
+        self._search_index.add(book.isbn, f"{book.title} {book.author}")
+        self._title_index.add(book.isbn, book.title)
+        self._author_index.add(book.isbn, book.author)
+
+    def _unindex_book(self, isbn):
+        """
+        Remove a book from the search indexes.
+
+        Args:
+            isbn (int): The ISBN of the book to remove.
+        """
+        if not self._search_indexes_ready:
+            return
+        self._search_index.remove(isbn)
+        self._title_index.remove(isbn)
+        self._author_index.remove(isbn)
     
+    def get_book(self, isbn):
+        """
+        Return the book with the given ISBN straight from the index, without
+        validation or logging. Intended for other managers' hot paths.
+
+        Args:
+            isbn (int): The ISBN number of the book.
+
+        Returns:
+            Book: The book object if found, None otherwise.
+        """
+        if self._snapshot is not None:
+            return self._snapshot_book(isbn)
+        if self._loader is not None:
+            self._ensure_loaded()
+        return self._books.get(isbn)
+
+    @timed
+    @writes
     def add_book(self, title, author, isbn):
         """
         Add a new book to the collection.
@@ -61,23 +373,99 @@ class BookManager:
             # Ensure ISBN is an integer
             if not isinstance(isbn, int):
                 raise ValueError("ISBN must be an integer.")
+            self._ensure_loaded()
             
             # Check for duplicate ISBNs
-            if any(book.isbn == isbn for book in self.books):
+            if isbn in self._books:
                 print(f"A book with ISBN {isbn} already exists.")
                 return
 
             # Add new book to collection
             new_book = Book(title, author, isbn)
-            self.books.append(new_book)
-            logging.info(f"Book added: {new_book}")
+            self._books[isbn] = new_book
+            self._assign_id(new_book)
+            self._index_book(new_book)
+            self._invalidate_cached_searches(title, author)
+            self._notify("put", isbn, new_book)
+            logger.info("Book added: %s", new_book, extra={"event": "book.add", "isbn": isbn})
         except ValueError as ve:
-            logging.error(f"Value error when adding book: {ve}")
+            logger.error("Value error when adding book: %s", ve)
             raise  
         except Exception as e:
-            logging.error(f"Error adding book with Title: {title}, Author: {author}, isbn: {isbn} : {e}")
+            logger.error("Error adding book with Title: %s, Author: %s, isbn: %s : %s", title, author, isbn, e)
             raise  
     
+    @timed
+    @writes
+    def bulk_add_books(self, records, batch_size=10000):
+        """
+        Add many books in one pass, e.g. when importing a catalog.
+
+        Records are validated batch by batch and deduplicated against the
+        collection with set lookups. A batch is only inserted once all of its
+        records have been validated, so an error leaves every earlier batch
+        fully added and nothing of the failing one. The search indexes are
+        rebuilt once, on the next search, instead of after every insert, and
+        a single summary line is logged instead of one line per book.
+
+        Args:
+            records (iterable): Mappings with "title", "author" and "isbn" keys
+                and an optional boolean "available" key (a string such as
+                "false" makes the record invalid rather than available).
+            batch_size (int): Number of records validated at a time. Defaults to 10000.
+
+        Returns:
+            dict: Counts of books "added" and records skipped as "duplicates" or "invalid".
+        """
+        added = duplicates = invalid = 0
+        records = iter(records)
+        self._ensure_loaded()
+        try:
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                new_books = {}  # ISBN -> Book for the batch's valid, new records
+                for record in batch:
+                    if not isinstance(record, dict):
+                        invalid += 1
+                        continue
+                    isbn = record.get("isbn")
+                    title = record.get("title")
+                    author = record.get("author")
+                    available = record.get("available", True)
+                    if type(isbn) is not int or not isinstance(title, str) or not isinstance(author, str) \
+                            or type(available) is not bool:
+                        invalid += 1
+                    elif isbn in self._books or isbn in new_books:
+                        duplicates += 1
+                    else:
+                        new_books[isbn] = Book(title, author, isbn, available)
+                new_books = list(new_books.values())
+                for book in new_books:
+                    self._books[book.isbn] = book
+                    self._assign_id(book)
+                added += len(new_books)
+                self._notify_many([("put", book.isbn, book) for book in new_books])
+        finally:
+            if added:
+                self._invalidate_search_indexes()
+            logger.info("Bulk import: %s books added, %s duplicates and %s invalid records skipped", added, duplicates, invalid)
+        return {"added": added, "duplicates": duplicates, "invalid": invalid}
+
+    @reads
+    def copy_books(self):
+        """
+        Copy the collection, consistently with the version it was taken at.
+
+        Returns:
+            tuple: (version, list of every Book object in insertion order).
+        """
+        self._ensure_loaded()
+        return self.version, list(self._books.values())
+
+    @timed
+    @reads
     def list_books(self):
         """
         List all books in the collection. If no books are available, notify the user.
@@ -92,9 +480,10 @@ class BookManager:
                 for book in self.books:
                     print(book)
         except Exception as e:
-            logging.error(f"Error listing books: {e}")
+            logger.error("Error listing books: %s", e)
             raise
 
+    @timed
     def find_books_by_isbn(self, isbn):
         """
         Find a book in the collection by its ISBN.
@@ -112,24 +501,30 @@ class BookManager:
             if not isinstance(isbn, int):
                 raise ValueError("ISBN must be an integer.")
             
-            # Search for book by ISBN
-            for book in self.books:
-                if book.isbn == isbn:
-                    logging.info(f"Book found by ISBN: {book}")
-                    return book
+            # Look up book in the ISBN index
+            book = self.get_book(isbn)
+            if book:
+                if should_log(logger, "book.lookup"):
+                    logger.info("Book found by ISBN: %s", book, extra={"event": "book.lookup", "isbn": isbn})
+                return book
             
-            logging.warning(f"Book not found by ISBN: {isbn}")
+            if should_log(logger, "book.lookup", logging.WARNING):
+                logger.warning("Book not found by ISBN: %s", isbn, extra={"event": "book.lookup", "isbn": isbn})
             return None
         except ValueError as ve:
-            logging.error(f"Value error when finding book: {ve}")
+            logger.error("Value error when finding book: %s", ve)
             raise  
         except Exception as e:
-            logging.error(f"Error searching books by ISBN: {isbn} : {e}")
+            logger.error("Error searching books by ISBN: %s : %s", isbn, e)
             raise
     
+    @timed
+    @reads
     def find_books_by_title(self, title):
         """
         Find books in the collection by title.
+        Results are cached by lowercased title (see query_cache) until a
+        change touches a matching book.
 
         Args:
             title (str): The title of the book to search for.
@@ -138,16 +533,28 @@ class BookManager:
             list: A list of books that match the search title.
         """
         try:
-            results =  [book for book in self.books if title.lower() in book.title.lower()]
-            logging.info(f"Found {len(results)} books with title as: '{title}'")
+            key = ("title", title.lower())
+            cached = self.query_cache.get(key)
+            if cached is not None:
+                return list(cached)
+            self._ensure_search_indexes()
+            results = [self._books[isbn] for isbn in self._title_index.search(title)]
+            self.query_cache.put(key, tuple(results))
+            if should_log(logger, "book.search"):
+                logger.info("Found %s books with title as: '%s'", len(results), title,
+                            extra={"event": "book.search", "field": "title", "query": title, "results": len(results)})
             return results
         except Exception as e:
-            logging.error(f"Error searching books by title: {title} : {e}")
+            logger.error("Error searching books by title: %s : %s", title, e)
             raise
     
+    @timed
+    @reads
     def find_books_by_author(self, author):
         """
         Find books in the collection by author.
+        Results are cached by lowercased author (see query_cache) until a
+        change touches a matching book.
 
         Args:
             author (str): The author of the book to search for.
@@ -156,13 +563,51 @@ class BookManager:
             list: A list of books that match the search author.
         """
         try:
-            results = [book for book in self.books if author.lower() in book.author.lower()]
-            logging.info(f"Found {len(results)} books with author as: '{author}'")
+            key = ("author", author.lower())
+            cached = self.query_cache.get(key)
+            if cached is not None:
+                return list(cached)
+            self._ensure_search_indexes()
+            results = [self._books[isbn] for isbn in self._author_index.search(author)]
+            self.query_cache.put(key, tuple(results))
+            if should_log(logger, "book.search"):
+                logger.info("Found %s books with author as: '%s'", len(results), author,
+                            extra={"event": "book.search", "field": "author", "query": author, "results": len(results)})
             return results
         except Exception as e:
-            logging.error(f"Error searching books by author: {author} : {e}")
+            logger.error("Error searching books by author: %s : %s", author, e)
             raise
 
+    @timed
+    @reads
+    def search_books(self, query, prefix=True):
+        """
+        Search books by title and author tokens using the inverted index.
+
+        Every term in the query must match a word of the book's title or author.
+        Unlike find_books_by_title, terms match whole words (or word prefixes),
+        not arbitrary substrings.
+
+        Args:
+            query (str): One or more search terms, e.g. "orwell 198".
+            prefix (bool): Whether terms match as word prefixes. Defaults to True.
+
+        Returns:
+            list: A list of matching books, ordered by ISBN.
+        """
+        try:
+            self._ensure_search_indexes()
+            results = [self._books[isbn] for isbn in sorted(self._search_index.search(query, prefix))]
+            if should_log(logger, "book.search"):
+                logger.info("Found %s books matching query: '%s'", len(results), query,
+                            extra={"event": "book.search", "field": "keywords", "query": query, "results": len(results)})
+            return results
+        except Exception as e:
+            logger.error("Error searching books by query: %s : %s", query, e)
+            raise
+
+    @timed
+    @writes
     def remove_book(self, isbn):
         """
         Remove a book from the collection by its ISBN.
@@ -180,22 +625,30 @@ class BookManager:
             if not isinstance(isbn, int):
                 raise ValueError("ISBN must be an integer.")
             
-            # Find book to remove
-            book_to_remove = self.find_books_by_isbn(isbn)
+            # Remove book from the ISBN index
+            self._ensure_loaded()
+            book_to_remove = self._books.pop(isbn, None)
             if book_to_remove:
-                self.books.remove(book_to_remove)
-                logging.info(f"Book removed: {book_to_remove}")
+                self._unindex_book(isbn)
+                self._invalidate_cached_searches(book_to_remove.title, book_to_remove.author)
+                book_id = self._ids.pop(isbn)
+                self._isbn_by_id[book_id] = None
+                self._available[book_id] = False
+                self._notify("delete", isbn)
+                logger.info("Book removed: %s", book_to_remove, extra={"event": "book.remove", "isbn": isbn})
                 return True
 
-            logging.warning(f"Failed to remove book: ISBN {isbn} not found")
+            logger.warning("Failed to remove book: ISBN %s not found", isbn)
             return False
         except ValueError as ve:
-            logging.error(f"Value error when removing book: {ve}")
+            logger.error("Value error when removing book: %s", ve)
             raise 
         except Exception as e:
-            logging.error(f"Error removing book by ISBN: {isbn} : {e}")
+            logger.error("Error removing book by ISBN: %s : %s", isbn, e)
             raise
     
+    @timed
+    @writes
     def update_books(self, isbn, title=None, author=None):
         """
         Update a book's information in the collection.
@@ -216,24 +669,30 @@ class BookManager:
                 raise ValueError("ISBN must be an integer.")
             
             # Find book to update
-            book_to_update = self.find_books_by_isbn(isbn)
+            self._ensure_loaded()
+            book_to_update = self._books.get(isbn)
             if book_to_update:
+                self._invalidate_cached_searches(book_to_update.title, book_to_update.author)
                 if title:
                     book_to_update.title = title
                 if author:
-                    book_to_update.author = author
-                logging.info(f"Book updated: {book_to_update}")
+                    book_to_update.author = intern_author(author)
+                self._index_book(book_to_update)
+                self._invalidate_cached_searches(book_to_update.title, book_to_update.author)
+                self._notify("put", isbn, book_to_update)
+                logger.info("Book updated: %s", book_to_update, extra={"event": "book.update", "isbn": isbn})
                 return True
             
-            logging.warning(f"Failed to update book: ISBN {isbn} not found")
+            logger.warning("Failed to update book: ISBN %s not found", isbn)
             return False
         except ValueError as ve:
-            logging.error(f"Value error when updating book: {ve}")
+            logger.error("Value error when updating book: %s", ve)
             raise 
         except Exception as e:
-            logging.error(f"Error updating book by ISBN: {isbn} : {e}")
+            logger.error("Error updating book by ISBN: %s : %s", isbn, e)
             raise
 
+    @timed
     def update_book_availability(self, isbn, available):
         """
         Update the availability status of a book in the collection.
@@ -245,8 +704,65 @@ class BookManager:
         Returns:
             bool: True if the book's availability was updated, False otherwise.
         """
-        for book in self.books:
-            if book.isbn == isbn:
-                book.available = available
-                return True
+        book = self.get_book(isbn)
+        if book:
+            self.set_book_available(book, available)
+            return True
         return False
+
+    @writes
+    def set_book_available(self, book, available):
+        """
+        Flip the availability of a book the caller already holds, in O(1).
+
+        Updates the book and its bit in the availability bitmap without
+        another ISBN lookup. Used by CheckoutManager on checkout and return.
+
+        Args:
+            book (Book): A book stored in this manager.
+            available (bool): The new availability status of the book.
+        """
+        self._ensure_loaded()
+        book.available = available
+        self._available[self._ids[book.isbn]] = available
+        self._notify("put", book.isbn, book)
+
+    @writes
+    def set_books_available(self, updates):
+        """
+        Flip the availability of several books and notify observers once.
+
+        Args:
+            updates (iterable): (book, available) pairs for books stored in this manager.
+        """
+        self._ensure_loaded()
+        changes = []
+        for book, available in updates:
+            book.available = available
+            self._available[self._ids[book.isbn]] = available
+            changes.append(("put", book.isbn, book))
+        self._notify_many(changes)
+
+    @reads
+    def count_available(self):
+        """
+        Count the books currently available for checkout, using the bitmap.
+
+        Returns:
+            int: The number of available books.
+        """
+        if self._snapshot is not None:
+            return self._snapshot.count_available()
+        self._ensure_loaded()
+        return self._available.count()
+
+    def iter_available(self):
+        """
+        Iterate over the books currently available for checkout.
+
+        Yields:
+            Book: Each available book, in the order it was added.
+        """
+        self._ensure_loaded()
+        for book_id in self._available.iter_set():
+            yield self._books[self._isbn_by_id[book_id]]
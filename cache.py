@@ -0,0 +1,136 @@
+import threading
+from collections import OrderedDict
+
+# Class for a bounded least-recently-used cache of search results
+class QueryCache:
+    def __init__(self, maxsize=1024):
+        """
+        Initialize an empty LRU cache.
+
+        Entries are evicted least recently used first once `maxsize` is
+        reached. The cache has its own lock, so concurrent readers of a
+        manager can share it.
+
+        Keys are (field, query) pairs with a lowercased query. Each key is
+        also filed under its field and the first three characters of its
+        query, so invalidate() only looks at the entries whose query could
+        be a substring of the changed text instead of scanning the whole cache.
+
+        Args:
+            maxsize (int): Maximum number of cached results. Defaults to 1024;
+                0 disables caching.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # Maps each key to its result, least recently used first
+        self._buckets = {}  # Maps (field, first three characters of the query) to the set of cached keys
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """
+        Number of cached results.
+
+        Returns:
+            int: The number of entries.
+        """
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Look up a cached result and mark it as recently used.
+
+        Args:
+            key (tuple): The field and the lowercased query.
+
+        Returns:
+            The cached result, or None on a miss.
+        """
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        """
+        Cache a result, evicting the least recently used entry if full.
+
+        Args:
+            key (tuple): The field and the lowercased query.
+            result: The result to cache (must not be None).
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if key not in self._entries:
+                field, query = key
+                self._buckets.setdefault((field, query[:3]), set()).add(key)
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._discard(self._entries.popitem(last=False)[0])
+
+    def _discard(self, key):
+        """
+        Remove an evicted or invalidated key from its bucket (lock held).
+
+        Args:
+            key (tuple): The field and the lowercased query.
+        """
+        field, query = key
+        bucket = self._buckets[(field, query[:3])]
+        bucket.discard(key)
+        if not bucket:
+            del self._buckets[(field, query[:3])]
+
+    def invalidate(self, field, text):
+        """
+        Drop the entries for a field whose query is a substring of text, i.e.
+        the searches whose results include (or now should include) the
+        record that text belongs to.
+
+        A query can only be a substring if its first three characters (or
+        the whole query, when shorter) occur in text, so only the buckets
+        for the at most 4 * len(text) substrings of up to three characters
+        are checked.
+
+        Args:
+            field (str): The searched field, as in the keys.
+            text (str): The changed text, lowercased like the queries.
+
+        Returns:
+            int: The number of entries dropped.
+        """
+        with self._lock:
+            if not self._buckets:
+                return 0
+            stale = []
+            for prefix in {text[start:start + length] for length in range(4) for start in range(len(text) - length + 1)}:
+                bucket = self._buckets.get((field, prefix))
+                if bucket is not None:
+                    stale.extend(key for key in bucket if key[1] in text)
+            for key in stale:
+                del self._entries[key]
+                self._discard(key)
+            return len(stale)
+
+    def clear(self):
+        """
+        Drop every entry. The hit and miss counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self):
+        """
+        Hit and miss counters and current size.
+
+        Returns:
+            dict: "hits", "misses", "size" and "maxsize".
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
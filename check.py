@@ -4,9 +4,17 @@
 #     checkouts.append({"user_id": user_id, "isbn": isbn})
 
 import logging
+import threading
+from contextlib import nullcontext
+from locks import RWLock, StripedLock, reads, writes
+from metrics import timed
+
+logger = logging.getLogger(__name__)
 
 # Class representing a checkout transaction in the library system
 class Checkout:
+    __slots__ = ('user_id', 'isbn')  # No per-instance __dict__, to keep large checkout lists small
+
     def __init__(self, user_id, isbn):
         """
         Initialize a new Checkout object.
@@ -18,6 +26,15 @@ class Checkout:
         self.user_id = user_id
         self.isbn = isbn
 
+    def to_dict(self):
+        """
+        Dictionary of the checkout's fields, as stored in checkouts.json.
+
+        Returns:
+            dict: The user_id and isbn fields.
+        """
+        return {"user_id": self.user_id, "isbn": self.isbn}
+
     def __str__(self):
         """
         String representation of the Checkout object.
@@ -29,17 +46,167 @@ class Checkout:
 
 # Class for managing checkout transactions
 class CheckoutManager:
-    def __init__(self, user_manager, book_manager):
+    def __init__(self, user_manager, book_manager, concurrent=False):
         """
         Initialize a new CheckoutManager object to manage checkout transactions.
 
+        In concurrent mode, checkout and return hold a striped per-ISBN lock
+        for their whole check-then-act sequence, so two threads cannot check
+        out the same book while operations on other books proceed in
+        parallel. The checkout indexes themselves are guarded by a
+        reader-writer lock that is only held briefly for each change.
+
         Args:
             user_manager (UserManager): The manager responsible for user operations.
             book_manager (BookManager): The manager responsible for book operations.
+            concurrent (bool): Enable locking so the manager can be shared between threads.
+                Defaults to False.
         """
         self.user_manager = user_manager
         self.book_manager = book_manager
-        self.checkouts = []  # List to store all Checkout objects
+        self._checkouts = {}  # Maps ISBN to its active Checkout, kept in checkout order
+        self._user_checkouts = {}  # Maps user ID to the set of ISBNs they have checked out
+        self.observers = []  # Objects notified of every mutation via record_change()
+        self.lock = RWLock() if concurrent else None  # Guards the checkout indexes in concurrent mode
+        self._isbn_locks = StripedLock() if concurrent else None  # Serializes checkout/return per ISBN
+        self._loader = None  # Callable returning the checkouts, run on first use (see load_lazily)
+        self._load_lock = threading.Lock()  # Lets only one reader run the lazy load
+
+    @property
+    def checkouts(self):
+        """
+        View of all active Checkout objects, in checkout order.
+
+        Returns:
+            dict_values: An iterable view over the active checkouts.
+        """
+        self._ensure_loaded()
+        return self._checkouts.values()
+
+    @checkouts.setter
+    @writes
+    def checkouts(self, checkouts):
+        """
+        Replace the active checkouts and rebuild the ISBN and user indexes.
+
+        Args:
+            checkouts (iterable): An iterable of Checkout objects.
+        """
+        self._replace_checkouts(checkouts)
+
+    def _replace_checkouts(self, checkouts):
+        """
+        Replace the active checkouts and rebuild the indexes (the checkouts
+        setter, without taking the write lock).
+
+        Args:
+            checkouts (iterable): An iterable of Checkout objects.
+        """
+        by_isbn = {}
+        by_user = {}
+        for checkout in checkouts:
+            by_isbn[checkout.isbn] = checkout
+            by_user.setdefault(checkout.user_id, set()).add(checkout.isbn)
+        self._checkouts = by_isbn
+        self._user_checkouts = by_user
+        self._loader = None
+
+    @writes
+    def load_lazily(self, loader):
+        """
+        Empty the checkouts and defer loading them until they are first used.
+
+        Args:
+            loader (callable): Returns an iterable of Checkout objects, e.g. a
+                storage's iter_checkouts method.
+        """
+        self._replace_checkouts(())
+        self._loader = loader
+
+    def is_loaded(self):
+        """
+        Check whether the checkouts are in memory (no lazy load pending).
+
+        Returns:
+            bool: True if the checkouts have been loaded.
+        """
+        return self._loader is None
+
+    def _ensure_loaded(self):
+        """
+        Run a pending lazy load.
+        """
+        if self._loader is None:
+            return
+        with self._load_lock:
+            if self._loader is not None:
+                self._replace_checkouts(self._loader())
+                logger.info("Loaded %s checkouts on first use", len(self._checkouts))
+
+    def _notify(self, op, key, record=None):
+        """
+        Report a change to every registered observer (e.g. a journaled storage).
+        Called without the write lock held, so an observer writing to disk
+        does not block readers; the ISBN's stripe lock keeps changes to one
+        book reported in order.
+
+        Args:
+            op (str): Either "put" (added or updated) or "delete".
+            key (int): The ISBN of the changed checkout.
+            record: The changed object for "put", None for "delete".
+        """
+        for observer in self.observers:
+            observer.record_change("checkouts", op, key, record)
+
+    def _notify_many(self, changes):
+        """
+        Report several changes to every observer at once, so each can persist
+        them together (one journal write or one database transaction). Like
+        _notify, called without the write lock held.
+
+        Args:
+            changes (list): (op, key, record) tuples, as for _notify.
+        """
+        if changes:
+            for observer in self.observers:
+                observer.record_changes("checkouts", changes)
+
+    @writes
+    def _add_checkout(self, checkout):
+        """
+        Record a checkout in the ISBN and user indexes.
+
+        Args:
+            checkout (Checkout): The checkout to record.
+        """
+        self._checkouts[checkout.isbn] = checkout
+        self._user_checkouts.setdefault(checkout.user_id, set()).add(checkout.isbn)
+
+    @writes
+    def _remove_checkout(self, checkout):
+        """
+        Drop a checkout from the ISBN and user indexes.
+
+        Args:
+            checkout (Checkout): The checkout to drop.
+        """
+        del self._checkouts[checkout.isbn]
+        isbns = self._user_checkouts[checkout.user_id]
+        isbns.discard(checkout.isbn)
+        if not isbns:
+            del self._user_checkouts[checkout.user_id]
+
+    def _isbn_locked(self, *isbns):
+        """
+        Lock the given ISBNs' stripes in concurrent mode; a no-op context otherwise.
+
+        Args:
+            *isbns (int): The ISBNs about to be checked out or returned.
+
+        Returns:
+            A context manager holding the locks.
+        """
+        return self._isbn_locks.locked(*isbns) if self._isbn_locks else nullcontext()
 
     def is_book_checked_out(self, isbn):
         """
@@ -51,8 +218,10 @@ class CheckoutManager:
         Returns:
             bool: True if the book is checked out, False otherwise.
         """
-        return any(checkout.isbn == isbn for checkout in self.checkouts)
+        self._ensure_loaded()
+        return isbn in self._checkouts
     
+    @timed
     def checkout_book(self, user_id, isbn):
         """
         Process the checkout of a book to a user.
@@ -71,33 +240,37 @@ class CheckoutManager:
             if not isinstance(user_id, int) or not isinstance(isbn, int):
                 raise ValueError("Values must be integers.")
             
-            # Check if the user exists
-            if not any(user.user_id == user_id for user in self.user_manager.users):
-                print(f"No user with ID {user_id} found.")
-                return False
+            self._ensure_loaded()
+            with self._isbn_locked(isbn):
+                # Check if the user exists
+                if not self.user_manager.exists(user_id):
+                    print(f"No user with ID {user_id} found.")
+                    return False
             
-            # Check if the book exists and is available
-            book = next((book for book in self.book_manager.books if book.isbn == isbn), None)
-            if not book:
-                print(f"No book with ISBN {isbn} found.")
-                return False
-            if not book.available:
-                print(f"Book with ISBN {isbn} is already checked out.")
-                return False
+                # Check if the book exists and is available
+                book = self.book_manager.get_book(isbn)
+                if not book:
+                    print(f"No book with ISBN {isbn} found.")
+                    return False
+                if not book.available:
+                    print(f"Book with ISBN {isbn} is already checked out.")
+                    return False
             
-            # Proceed with checkout
-            new_checkout = Checkout(user_id, isbn)
-            self.checkouts.append(new_checkout)
-            self.book_manager.update_book_availability(isbn, available=False)
-            print(f"Book with ISBN {isbn} checked out by user {user_id}.")
-            return True
+                # Proceed with checkout
+                new_checkout = Checkout(user_id, isbn)
+                self._add_checkout(new_checkout)
+                self._notify("put", isbn, new_checkout)
+                self.book_manager.set_book_available(book, False)
+                print(f"Book with ISBN {isbn} checked out by user {user_id}.")
+                return True
         except ValueError as ve:
-            logging.error(f"Value error when checking out: {ve}")
+            logger.error("Value error when checking out: %s", ve)
             raise 
         except Exception as e:
-            logging.error(f"Error during checkout for book with ISBN: {isbn} : {e}")
+            logger.error("Error during checkout for book with ISBN: %s : %s", isbn, e)
             raise
 
+    @timed
     def find_checkout_by_isbn(self, isbn):
         """
         Find a checkout transaction by the book's ISBN.
@@ -108,11 +281,25 @@ class CheckoutManager:
         Returns:
             Checkout: The checkout object if found, None otherwise.
         """
-        for checkout in self.checkouts:
-            if checkout.isbn == isbn:
-                return checkout
-        return None
+        self._ensure_loaded()
+        return self._checkouts.get(isbn)
+
+    @timed
+    @reads
+    def find_checkouts_by_user(self, user_id):
+        """
+        Find all books a user currently has checked out.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            list: The user's Checkout objects, ordered by ISBN.
+        """
+        self._ensure_loaded()
+        return [self._checkouts[isbn] for isbn in sorted(self._user_checkouts.get(user_id, ()))]
 
+    @timed
     def return_book(self, isbn, user_id):
         """
         Process the return of a book.
@@ -131,26 +318,132 @@ class CheckoutManager:
             if not isinstance(isbn, int):
                 raise ValueError("ISBN must be an integer.")
             
-            # Check if the checkout record exists
-            checkout = next((co for co in self.checkouts if co.isbn == isbn and co.user_id == user_id), None)
-            checkout_to_remove = self.find_checkout_by_isbn(isbn)
-            if checkout_to_remove and checkout:
-                self.checkouts.remove(checkout_to_remove)
-                self.book_manager.update_book_availability(isbn, available=True)
-                print('Book returned successfully')
-                logging.info(f"Book returned: {checkout_to_remove}")
-                return True
+            self._ensure_loaded()
+            with self._isbn_locked(isbn):
+                # Check if the book is checked out by this user
+                checkout_to_remove = self._checkouts.get(isbn)
+                if checkout_to_remove and checkout_to_remove.user_id == user_id:
+                    self._remove_checkout(checkout_to_remove)
+                    self._notify("delete", isbn)
+                    book = self.book_manager.get_book(isbn)
+                    if book:
+                        self.book_manager.set_book_available(book, True)
+                    print('Book returned successfully')
+                    logger.info("Book returned: %s", checkout_to_remove, extra={"event": "checkout.return", "isbn": isbn})
+                    return True
             
-            print("Failed to return book. It may not be checked out.")
-            logging.warning(f"Failed to return book: ISBN {isbn} not found in checkouts")
-            return False
+                print("Failed to return book. It may not be checked out.")
+                logger.warning("Failed to return book: ISBN %s not found in checkouts", isbn)
+                return False
         except ValueError as ve:
-            logging.error(f"Value error when returning book: {ve}")
+            logger.error("Value error when returning book: %s", ve)
             raise 
         except Exception as e:
-            logging.error(f"Error during return of book with ISBN : {isbn} : {e}")
+            logger.error("Error during return of book with ISBN : %s : %s", isbn, e)
             raise
     
+    @timed
+    def apply_batch(self, ops):
+        """
+        Apply a batch of checkouts and returns atomically: all of them or none.
+
+        Every operation is validated first, in order, against the user and book
+        indexes plus the effect of the earlier operations in the batch (so a
+        return followed by a checkout of the same book is valid). If any
+        operation fails validation, nothing is changed. Otherwise all changes
+        are applied, and observers are notified once per manager with the net
+        change per ISBN, so the batch is persisted in one write.
+
+        Args:
+            ops (iterable): Mappings like {"op": "checkout" or "return", "user_id": int, "isbn": int}.
+
+        Returns:
+            dict: "applied" (bool), "count" (number of operations) and "errors",
+                a list of {"index", "error"} entries for the operations that failed.
+        """
+        ops = list(ops)
+        self._ensure_loaded()
+        with self._isbn_locked(*(op.get("isbn") for op in ops if isinstance(op, dict) and type(op.get("isbn")) is int)):
+            result, checkout_changes, availability_updates = self._apply_batch(ops)
+            # Observers run after the write lock is released, while the ISBNs are still locked
+            self._notify_many(checkout_changes)
+            self.book_manager.set_books_available(availability_updates)
+        return result
+
+    @writes
+    def _apply_batch(self, ops):
+        """
+        Validate and apply a batch (see apply_batch) to the checkout indexes,
+        with its ISBNs already locked.
+
+        Returns:
+            tuple: The result for apply_batch, the (op, key, record) checkout
+                changes to report and the (book, available) updates to make.
+        """
+        errors = []
+        pending = {}  # ISBN -> user ID holding it after the ops so far, or None if on the shelf
+        count = 0
+        for index, op in enumerate(ops):
+            count += 1
+            if not isinstance(op, dict):
+                errors.append({"index": index, "error": f"Operation must be an object, not {type(op).__name__}."})
+                continue
+            kind, user_id, isbn = op.get("op"), op.get("user_id"), op.get("isbn")
+            if type(user_id) is not int or type(isbn) is not int:
+                errors.append({"index": index, "error": "Values must be integers."})
+                continue
+            if isbn in pending:
+                holder = pending[isbn]
+            else:
+                checkout = self._checkouts.get(isbn)
+                holder = checkout.user_id if checkout else None
+
+            if kind == "checkout":
+                book = self.book_manager.get_book(isbn)
+                if not self.user_manager.exists(user_id):
+                    errors.append({"index": index, "error": f"No user with ID {user_id} found."})
+                elif not book:
+                    errors.append({"index": index, "error": f"No book with ISBN {isbn} found."})
+                elif holder is not None or (isbn not in pending and not book.available):
+                    errors.append({"index": index, "error": f"Book with ISBN {isbn} is already checked out."})
+                else:
+                    pending[isbn] = user_id
+            elif kind == "return":
+                if holder != user_id:
+                    errors.append({"index": index, "error": f"Book with ISBN {isbn} is not checked out by user {user_id}."})
+                else:
+                    pending[isbn] = None
+            else:
+                errors.append({"index": index, "error": f"Unknown operation: {kind!r}"})
+
+        if errors:
+            logger.warning("Batch of %s operations rejected: %s invalid", count, len(errors))
+            return {"applied": False, "count": count, "errors": errors}, [], []
+
+        checkout_changes = []
+        availability_updates = []
+        for isbn, user_id in pending.items():
+            existing = self._checkouts.get(isbn)
+            if existing:
+                if existing.user_id == user_id:
+                    continue  # Returned and checked out again by the same user: no net change
+                self._remove_checkout(existing)
+            if user_id is None:
+                if existing:
+                    checkout_changes.append(("delete", isbn, None))
+            else:
+                new_checkout = Checkout(user_id, isbn)
+                self._add_checkout(new_checkout)
+                checkout_changes.append(("put", isbn, new_checkout))
+            book = self.book_manager.get_book(isbn)
+            if book and book.available != (user_id is None):
+                availability_updates.append((book, user_id is None))
+
+        logger.info("Batch of %s operations applied: %s checkout records changed", count, len(checkout_changes))
+        return {"applied": True, "count": count, "errors": []}, checkout_changes, availability_updates
+
+    @timed
+    @reads
     def list_checkouts(self):
         """
         List all checkout transactions.
@@ -162,5 +455,5 @@ class CheckoutManager:
             for checkout in self.checkouts:
                 print(checkout)
         except Exception as e:
-            logging.error(f"Error listing checkouts: {e}")
+            logger.error("Error listing checkouts: %s", e)
             raise
@@ -0,0 +1,258 @@
+import contextlib
+import io
+import json
+import logging
+from metrics import metrics
+from parallel_search import scan_books
+
+logger = logging.getLogger(__name__)
+
+# Operations that only read state; all others modify the managers
+READ_OPERATIONS = frozenset({
+    "find_book", "search_title", "search_author", "search", "search_regex", "list_books", "count_available",
+    "find_user", "search_users", "list_checkouts", "user_checkouts", "stats",
+})
+
+# Class mapping named operations (as sent by scripts or clients) onto the managers
+class CommandExecutor:
+    def __init__(self, book_manager, user_manager, checkout_manager, searcher=None):
+        """
+        Initialize a command executor over the three managers.
+
+        Each command is a dict with an "op" name and the operation's arguments,
+        e.g. {"op": "checkout", "user_id": 1, "isbn": 2}. An optional "id" is
+        echoed back in the response so callers can match answers to requests.
+
+        Args:
+            book_manager (BookManager): The manager responsible for book operations.
+            user_manager (UserManager): The manager responsible for user operations.
+            checkout_manager (CheckoutManager): The manager responsible for checkouts.
+            searcher (ParallelSearcher, optional): Runs "search_regex" in worker
+                processes; without it the catalog is scanned in this process.
+        """
+        self.book_manager = book_manager
+        self.user_manager = user_manager
+        self.checkout_manager = checkout_manager
+        self.searcher = searcher
+        # Operation name -> handler method
+        self.handlers = {
+            "add_book": self._add_book,
+            "update_book": self._update_book,
+            "remove_book": self._remove_book,
+            "find_book": self._find_book,
+            "search_title": self._search_title,
+            "search_author": self._search_author,
+            "search": self._search,
+            "search_regex": self._search_regex,
+            "list_books": self._list_books,
+            "count_available": self._count_available,
+            "add_user": self._add_user,
+            "update_user": self._update_user,
+            "remove_user": self._remove_user,
+            "find_user": self._find_user,
+            "search_users": self._search_users,
+            "checkout": self._checkout,
+            "return": self._return,
+            "batch": self._batch,
+            "list_checkouts": self._list_checkouts,
+            "user_checkouts": self._user_checkouts,
+            "stats": self._stats,
+        }
+
+    def is_read_only(self, command):
+        """
+        Check whether a command only reads state and can run alongside other reads.
+
+        Args:
+            command (dict): The command to inspect.
+
+        Returns:
+            bool: True if the command's operation is in READ_OPERATIONS.
+        """
+        return isinstance(command, dict) and command.get("op") in READ_OPERATIONS
+
+    def execute(self, command):
+        """
+        Run a single command and build its response.
+
+        The managers report some failures by printing; that output is captured
+        and returned as the error message instead of reaching stdout.
+
+        Args:
+            command (dict): The command to run.
+
+        Returns:
+            dict: {"ok": True, "result": ...} on success, or {"ok": False, "error": "..."},
+                plus the command's "id" if it had one.
+        """
+        response = {}
+        if isinstance(command, dict) and "id" in command:
+            response["id"] = command["id"]
+        handler = self.handlers.get(command.get("op")) if isinstance(command, dict) else None
+        if handler is None:
+            op = command.get("op") if isinstance(command, dict) else None
+            response.update(ok=False, error=f"Unknown operation: {op!r}")
+            return response
+
+        messages = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(messages):
+                result = handler(command)
+        except (KeyError, TypeError, ValueError) as e:
+            response.update(ok=False, error=f"Invalid command: {e}")
+            return response
+        except Exception as e:
+            logger.error("Error executing command %s: %s", command.get('op'), e)
+            response.update(ok=False, error=str(e))
+            return response
+
+        if result is False:
+            response.update(ok=False, error=messages.getvalue().strip() or "Operation failed.")
+        else:
+            response.update(ok=True, result=result)
+        return response
+
+    def _add_book(self, command):
+        """Add a book: "title", "author", "isbn". Returns the new book."""
+        if self.book_manager.get_book(command["isbn"]) is not None:
+            print(f"A book with ISBN {command['isbn']} already exists.")
+            return False
+        self.book_manager.add_book(command["title"], command["author"], command["isbn"])
+        return self.book_manager.get_book(command["isbn"]).to_dict()
+
+    def _update_book(self, command):
+        """Update a book: "isbn", optional "title" and "author". Returns the updated book."""
+        if not self.book_manager.update_books(command["isbn"], command.get("title"), command.get("author")):
+            print(f"No book with ISBN {command['isbn']} found.")
+            return False
+        return self.book_manager.get_book(command["isbn"]).to_dict()
+
+    def _remove_book(self, command):
+        """Remove a book: "isbn"."""
+        if not self.book_manager.remove_book(command["isbn"]):
+            print(f"No book with ISBN {command['isbn']} found.")
+            return False
+        return None
+
+    def _find_book(self, command):
+        """Look up a book: "isbn". Returns the book or null."""
+        book = self.book_manager.find_books_by_isbn(command["isbn"])
+        return book.to_dict() if book else None
+
+    def _search_title(self, command):
+        """Substring search on titles: "title". Returns matching books."""
+        return [book.to_dict() for book in self.book_manager.find_books_by_title(command["title"])]
+
+    def _search_author(self, command):
+        """Substring search on authors: "author". Returns matching books."""
+        return [book.to_dict() for book in self.book_manager.find_books_by_author(command["author"])]
+
+    def _search(self, command):
+        """Keyword search on title and author words: "query", optional "prefix"."""
+        return [book.to_dict() for book in self.book_manager.search_books(command["query"], command.get("prefix", True))]
+
+    def _search_regex(self, command):
+        """Regular-expression search (case-insensitive): "pattern", optional "field" ("title", "author" or "any")."""
+        field = command.get("field", "title")
+        if self.searcher is not None:
+            books = self.searcher.search(command["pattern"], field)
+        else:
+            books = scan_books(self.book_manager.copy_books()[1], command["pattern"], field)
+        return [book.to_dict() for book in books]
+
+    def _list_books(self, command):
+        """Return every book."""
+        return [book.to_dict() for book in self.book_manager.books]
+
+    def _count_available(self, command):
+        """Return the number of books available for checkout."""
+        return self.book_manager.count_available()
+
+    def _add_user(self, command):
+        """Add a user: "name", "user_id". Returns the new user."""
+        if self.user_manager.exists(command["user_id"]):
+            print(f"A user with ID {command['user_id']} already exists.")
+            return False
+        self.user_manager.add_user(command["name"], command["user_id"])
+        return {"name": command["name"], "user_id": command["user_id"]}
+
+    def _update_user(self, command):
+        """Update a user: "user_id", optional "name". Returns the updated user."""
+        if not self.user_manager.update_user(command["user_id"], command.get("name")):
+            print(f"No user with ID {command['user_id']} found.")
+            return False
+        return self.user_manager.find_user_by_id(command["user_id"]).to_dict()
+
+    def _remove_user(self, command):
+        """Remove a user: "user_id"."""
+        if not self.user_manager.remove_user(command["user_id"]):
+            print(f"No user with ID {command['user_id']} found.")
+            return False
+        return None
+
+    def _find_user(self, command):
+        """Look up a user: "user_id". Returns the user or null."""
+        user = self.user_manager.find_user_by_id(command["user_id"])
+        return user.to_dict() if user else None
+
+    def _search_users(self, command):
+        """Substring search on user names: "name". Returns matching users."""
+        return [user.to_dict() for user in self.user_manager.find_users_by_name(command["name"])]
+
+    def _checkout(self, command):
+        """Check out a book: "user_id", "isbn"."""
+        if not self.checkout_manager.checkout_book(command["user_id"], command["isbn"]):
+            return False
+        return {"user_id": command["user_id"], "isbn": command["isbn"]}
+
+    def _return(self, command):
+        """Return a book: "user_id", "isbn"."""
+        if not self.checkout_manager.return_book(command["isbn"], command["user_id"]):
+            return False
+        return {"user_id": command["user_id"], "isbn": command["isbn"]}
+
+    def _batch(self, command):
+        """Apply checkouts and returns atomically: "ops", a list of checkout/return commands."""
+        return self.checkout_manager.apply_batch(command["ops"])
+
+    def _list_checkouts(self, command):
+        """Return every active checkout."""
+        return [checkout.to_dict() for checkout in self.checkout_manager.checkouts]
+
+    def _user_checkouts(self, command):
+        """Return the active checkouts of a user: "user_id"."""
+        return [checkout.to_dict() for checkout in self.checkout_manager.find_checkouts_by_user(command["user_id"])]
+
+    def _stats(self, command):
+        """Return operation and storage metrics: optional "format", "json" (default) or "prometheus" (as text)."""
+        if command.get("format", "json") == "prometheus":
+            return metrics.to_prometheus()
+        return metrics.snapshot()
+
+def run_jsonl(executor, lines, output):
+    """
+    Execute JSON-lines commands and write one JSON-lines response per command.
+
+    Blank lines are skipped; lines that are not valid JSON get an error response.
+
+    Args:
+        executor (CommandExecutor): The executor to run commands with.
+        lines (iterable): Lines of JSON text, one command each.
+        output: A writable text stream for the responses.
+
+    Returns:
+        int: The number of commands processed.
+    """
+    count = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        count += 1
+        try:
+            command = json.loads(line)
+        except json.JSONDecodeError as e:
+            response = {"ok": False, "error": f"Invalid JSON: {e}"}
+        else:
+            response = executor.execute(command)
+        output.write(json.dumps(response) + "\n")
+    return count
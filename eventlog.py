@@ -0,0 +1,173 @@
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import time
+
+# Lookup and search events, logged on every read; the ones worth sampling under load
+LOOKUP_EVENTS = ("book.lookup", "book.search", "user.lookup", "user.search")
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_sample_every = {}  # Maps event name to N: log one event in N
+_sample_counters = {}  # Maps event name to the count of events seen, for sampling
+_listener = None  # The running QueueListener, if setup_logging was called
+
+def set_sampling(every, events=LOOKUP_EVENTS):
+    """
+    Log only one in `every` occurrences of the given events.
+
+    Args:
+        every (int): Keep one event in this many; 1 or less logs them all.
+        events (iterable): Event names to sample. Defaults to LOOKUP_EVENTS.
+    """
+    for event in events:
+        if every > 1:
+            _sample_every[event] = every
+            _sample_counters[event] = itertools.count()
+        else:
+            _sample_every.pop(event, None)
+            _sample_counters.pop(event, None)
+
+def should_log(logger, event, level=logging.INFO):
+    """
+    Level and sampling guard for hot paths: check it before building a log
+    call, so disabled or sampled-out events cost one dict lookup.
+
+    Args:
+        logger (logging.Logger): The logger the event would go to.
+        event (str): The event name, e.g. "book.lookup".
+        level (int): The level the event would be logged at. Defaults to INFO.
+
+    Returns:
+        bool: True if the event should be logged.
+    """
+    if not logger.isEnabledFor(level):
+        return False
+    every = _sample_every.get(event)
+    return every is None or next(_sample_counters[event]) % every == 0
+
+# Formatter rendering each record as one JSON object per line
+class JsonFormatter(logging.Formatter):
+    def __init__(self):
+        """
+        Initialize the formatter.
+        """
+        super().__init__()
+        self._second = None  # Whole second of the last record, and its rendered timestamp
+        self._stamp = ""
+
+    def format(self, record):
+        """
+        Render a record as a JSON line with its time, level, logger and
+        message, plus any structured fields passed through `extra` (such as
+        "event" and "isbn"). Sampled events also carry "sample_every".
+
+        Args:
+            record (logging.LogRecord): The record to render.
+
+        Returns:
+            str: The JSON line, without a trailing newline.
+        """
+        second = int(record.created)
+        if second != self._second:
+            self._second, self._stamp = second, time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(second))
+        entry = {
+            "time": f"{self._stamp}.{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+        event = entry.get("event")
+        if event in _sample_every:
+            entry["sample_every"] = _sample_every[event]
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+# Queue handler doing the least work possible on the logging thread
+class EventQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        """
+        Merge the message with its arguments in place and return the record.
+
+        The message is rendered here, not in the listener, because its
+        arguments (e.g. a Book) may change after the call returns. Unlike the
+        base class, the record is not run through a formatter or copied: the
+        queue handler is the root logger's only handler, so nothing else sees it.
+
+        Args:
+            record (logging.LogRecord): The record being logged.
+
+        Returns:
+            logging.LogRecord: The record, ready for the listener thread.
+        """
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def setup_logging(path='library_system.log', level=logging.INFO, sample_every=1):
+    """
+    Send log records to a JSON-lines file without blocking the caller.
+
+    The root logger gets an EventQueueHandler, so logging a record only
+    merges its message and puts it on an in-memory queue; a QueueListener
+    thread renders the JSON and writes the file. The listener is stopped (and the
+    queue drained) by stop_logging(), which also runs at interpreter exit.
+    Calling setup_logging again replaces the previous configuration.
+
+    Args:
+        path (str): The log file to append to. Defaults to library_system.log.
+        level (int): Minimum level logged, or None to disable logging. Defaults to INFO.
+        sample_every (int): Log one in this many lookup and search events
+            (see LOOKUP_EVENTS). Defaults to 1 (all of them).
+
+    Returns:
+        logging.handlers.QueueListener: The running listener, or None if logging is disabled.
+    """
+    global _listener
+    stop_logging()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    set_sampling(sample_every)
+    if level is None:
+        root.setLevel(logging.CRITICAL + 1)
+        return None
+
+    records = queue.SimpleQueue()
+    file_handler = logging.FileHandler(path, encoding='utf-8')
+    file_handler.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(records, file_handler)
+    root.addHandler(EventQueueHandler(records))
+    root.setLevel(level)
+    _listener.start()
+    return _listener
+
+@atexit.register
+def stop_logging():
+    """
+    Detach the queue from the root logger, write out the queued records and
+    stop the listener thread, if running.
+    """
+    global _listener
+    if _listener is not None:
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            if isinstance(handler, logging.handlers.QueueHandler):
+                root.removeHandler(handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
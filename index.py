@@ -0,0 +1,345 @@
+import re
+from bisect import bisect_left, insort
+
+# Pattern used to split text into searchable tokens
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text):
+    """
+    Split text into normalized (lowercased) tokens.
+
+    Args:
+        text (str): The text to tokenize.
+
+    Returns:
+        list: The lowercased word tokens found in the text.
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+# Class for an incrementally maintained inverted index (token -> keys)
+class TokenIndex:
+    def __init__(self):
+        """
+        Initialize an empty inverted index.
+        """
+        self._postings = {}  # Maps each token to the set of keys containing it
+        self._vocabulary = []  # Sorted list of tokens, used for prefix lookups
+        self._key_tokens = {}  # Maps each key to the tokens it was indexed under
+
+    def __len__(self):
+        """
+        Number of keys currently indexed.
+
+        Returns:
+            int: The number of indexed keys.
+        """
+        return len(self._key_tokens)
+
+    def add(self, key, text):
+        """
+        Index text under the given key, replacing any previous entry for that key.
+
+        Args:
+            key: The identifier to store in the posting sets (e.g. an ISBN).
+            text (str): The text to index.
+        """
+        if key in self._key_tokens:
+            self.remove(key)
+        tokens = frozenset(tokenize(text))
+        self._key_tokens[key] = tokens
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                insort(self._vocabulary, token)
+            postings.add(key)
+
+    def remove(self, key):
+        """
+        Remove a key and all of its postings from the index.
+
+        Args:
+            key: The identifier to remove.
+
+        Returns:
+            bool: True if the key was indexed, False otherwise.
+        """
+        tokens = self._key_tokens.pop(key, None)
+        if tokens is None:
+            return False
+        for token in tokens:
+            postings = self._postings[token]
+            postings.discard(key)
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+        return True
+
+    def clear(self):
+        """
+        Remove every entry from the index.
+        """
+        self._postings.clear()
+        self._vocabulary.clear()
+        self._key_tokens.clear()
+
+    def _lookup(self, term, prefix):
+        """
+        Collect the posting set for a single query term.
+
+        Args:
+            term (str): A normalized query token.
+            prefix (bool): Whether to match every token starting with the term.
+
+        Returns:
+            set: The keys matching the term.
+        """
+        if not prefix:
+            return self._postings.get(term, set())
+        start = bisect_left(self._vocabulary, term)
+        end = bisect_left(self._vocabulary, term + "\uffff", start)
+        if end - start == 1:
+            return self._postings[self._vocabulary[start]]
+        matches = set()
+        for token in self._vocabulary[start:end]:
+            matches |= self._postings[token]
+        return matches
+
+    def search(self, query, prefix=True):
+        """
+        Find the keys whose text contains every term of the query.
+
+        Args:
+            query (str): One or more search terms; all of them must match (AND).
+            prefix (bool): Whether terms match as token prefixes. Defaults to True.
+
+        Returns:
+            set: The keys matching all query terms. Empty if the query has no terms.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return set()
+        postings = sorted((self._lookup(term, prefix) for term in terms), key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            if not result:
+                break
+            result &= posting
+        return result
+
+def trigrams(text):
+    """
+    Compute the set of three-character substrings of a string.
+
+    Args:
+        text (str): The (already normalized) text.
+
+    Returns:
+        set: The distinct trigrams of the text. Empty if it is shorter than three characters.
+    """
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+# Class for a trigram index answering case-insensitive substring queries
+class TrigramIndex:
+    def __init__(self):
+        """
+        Initialize an empty trigram index.
+
+        Results are returned in the order keys were first added, so a collection
+        that appends new records and updates existing ones in place gets the
+        same ordering as a scan over the collection.
+        """
+        self._postings = {}  # Maps each trigram to the set of keys containing it
+        self._texts = {}  # Maps each key to its lowercased text, in insertion order
+        self._order = {}  # Maps each key to its insertion sequence number
+        self._next_order = 0
+
+    def __len__(self):
+        """
+        Number of keys currently indexed.
+
+        Returns:
+            int: The number of indexed keys.
+        """
+        return len(self._texts)
+
+    def add(self, key, text):
+        """
+        Index text under the given key. Re-adding an existing key updates its
+        text but keeps its original position in the result ordering.
+
+        Args:
+            key: The identifier to return from searches (must be hashable).
+            text (str): The text to index.
+        """
+        text = text.lower()
+        old_text = self._texts.get(key)
+        if old_text is not None:
+            if old_text == text:
+                return
+            for gram in trigrams(old_text) - trigrams(text):
+                self._discard(gram, key)
+        else:
+            self._order[key] = self._next_order
+            self._next_order += 1
+        self._texts[key] = text
+        for gram in trigrams(text):
+            self._postings.setdefault(gram, set()).add(key)
+
+    def _discard(self, gram, key):
+        """
+        Remove a key from one trigram's posting set, dropping the set when empty.
+        """
+        postings = self._postings[gram]
+        postings.discard(key)
+        if not postings:
+            del self._postings[gram]
+
+    def remove(self, key):
+        """
+        Remove a key from the index.
+
+        Args:
+            key: The identifier to remove.
+
+        Returns:
+            bool: True if the key was indexed, False otherwise.
+        """
+        text = self._texts.pop(key, None)
+        if text is None:
+            return False
+        del self._order[key]
+        for gram in trigrams(text):
+            self._discard(gram, key)
+        return True
+
+    def clear(self):
+        """
+        Remove every entry from the index.
+        """
+        self._postings.clear()
+        self._texts.clear()
+        self._order.clear()
+        self._next_order = 0
+
+    def search(self, query):
+        """
+        Find every key whose text contains the query as a case-insensitive substring.
+
+        Queries shorter than three characters cannot use trigrams and fall back
+        to a scan over the stored texts.
+
+        Args:
+            query (str): The substring to search for.
+
+        Returns:
+            list: The matching keys, in insertion order.
+        """
+        query = query.lower()
+        if len(query) < 3:
+            return [key for key, text in self._texts.items() if query in text]
+
+        postings = []
+        for gram in trigrams(query):
+            posting = self._postings.get(gram)
+            if not posting:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        candidates = postings[0].intersection(*postings[1:])
+
+        # Trigram overlap is necessary but not sufficient; confirm the substring
+        texts = self._texts
+        matches = [key for key in candidates if query in texts[key]]
+        matches.sort(key=self._order.__getitem__)
+        return matches
+
+# Class for a growable array of bits, one per dense integer ID
+class Bitmap:
+    __slots__ = ('_bits', '_size')
+
+    def __init__(self, size=0, value=False):
+        """
+        Initialize a bitmap with `size` bits, all set to `value`.
+
+        Args:
+            size (int): Initial number of bits. Defaults to 0.
+            value (bool): Initial value of every bit. Defaults to False.
+        """
+        self._bits = bytearray(b'\xff' if value else b'\x00') * ((size + 7) // 8)
+        self._size = size
+        if value and size % 8:
+            self._bits[-1] = (1 << (size % 8)) - 1  # Keep padding bits clear so counts stay exact
+
+    def __len__(self):
+        """
+        Number of bits in the bitmap.
+
+        Returns:
+            int: The number of bits.
+        """
+        return self._size
+
+    def __getitem__(self, index):
+        """
+        Read one bit.
+
+        Args:
+            index (int): The bit position.
+
+        Returns:
+            bool: The bit's value.
+        """
+        if not 0 <= index < self._size:
+            raise IndexError("Bitmap index out of range")
+        return bool(self._bits[index >> 3] & (1 << (index & 7)))
+
+    def __setitem__(self, index, value):
+        """
+        Set or clear one bit.
+
+        Args:
+            index (int): The bit position.
+            value (bool): The new value.
+        """
+        if not 0 <= index < self._size:
+            raise IndexError("Bitmap index out of range")
+        if value:
+            self._bits[index >> 3] |= 1 << (index & 7)
+        else:
+            self._bits[index >> 3] &= ~(1 << (index & 7))
+
+    def append(self, value):
+        """
+        Add one bit at the end.
+
+        Args:
+            value (bool): The value of the new bit.
+        """
+        if self._size % 8 == 0:
+            self._bits.append(0)
+        self._size += 1
+        if value:
+            self[self._size - 1] = True
+
+    def count(self):
+        """
+        Count the set bits (population count).
+
+        Returns:
+            int: The number of bits that are set.
+        """
+        return int.from_bytes(self._bits, 'little').bit_count()
+
+    def iter_set(self):
+        """
+        Iterate over the positions of set bits in ascending order.
+
+        Yields:
+            int: Each position whose bit is set.
+        """
+        for byte_index, byte in enumerate(self._bits):
+            while byte:
+                low_bit = byte & -byte
+                yield (byte_index << 3) + low_bit.bit_length() - 1
+                byte ^= low_bit
@@ -0,0 +1,177 @@
+import functools
+import threading
+from contextlib import contextmanager
+
+# Class for a reader-writer lock: many concurrent readers or one writer
+class RWLock:
+    def __init__(self):
+        """
+        Initialize an unlocked reader-writer lock.
+
+        Writers are preferred: once a writer is waiting, new readers wait too,
+        so a steady stream of searches cannot starve checkouts. The lock is
+        reentrant for the thread holding it: a writer may take the read or
+        write lock again, and a reader may take the read lock again. A reader
+        cannot upgrade to the write lock.
+        """
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0  # Number of read acquisitions currently held
+        self._writer = None  # Thread ID of the writer, if any
+        self._writer_depth = 0  # Nested acquisitions held by the writer
+        self._waiting_writers = 0
+        self._local = threading.local()  # Per-thread count of read acquisitions
+
+    def acquire_read(self):
+        """
+        Acquire the lock for reading, waiting while a writer holds or awaits it.
+        """
+        me = threading.get_ident()
+        if self._writer == me:
+            self._writer_depth += 1
+            return
+        held = getattr(self._local, 'reads', 0)
+        with self._condition:
+            if not held:
+                while self._writer is not None or self._waiting_writers:
+                    self._condition.wait()
+            self._readers += 1
+        self._local.reads = held + 1
+
+    def release_read(self):
+        """
+        Release one read acquisition.
+        """
+        if self._writer == threading.get_ident():
+            self._writer_depth -= 1
+            return
+        self._local.reads -= 1
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        """
+        Acquire the lock for writing, waiting until no other thread holds it.
+
+        Raises:
+            RuntimeError: If the calling thread holds only the read lock.
+        """
+        me = threading.get_ident()
+        if self._writer == me:
+            self._writer_depth += 1
+            return
+        if getattr(self._local, 'reads', 0):
+            raise RuntimeError("Cannot upgrade a read lock to a write lock.")
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer is not None or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self):
+        """
+        Release one write acquisition; the lock is freed when the outermost one is released.
+        """
+        self._writer_depth -= 1
+        if not self._writer_depth:
+            with self._condition:
+                self._writer = None
+                self._condition.notify_all()
+
+    @contextmanager
+    def read_locked(self):
+        """
+        Hold the read lock for the duration of a with-block.
+        """
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self):
+        """
+        Hold the write lock for the duration of a with-block.
+        """
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+# Class for a fixed set of mutexes shared out among keys by hash
+class StripedLock:
+    def __init__(self, stripes=64):
+        """
+        Initialize a striped lock.
+
+        Operations on different keys usually take different stripes and run
+        concurrently; operations on the same key always take the same stripe
+        and are serialized. Memory stays fixed however many keys there are.
+
+        Args:
+            stripes (int): Number of underlying locks. Defaults to 64.
+        """
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    @contextmanager
+    def locked(self, *keys):
+        """
+        Hold the stripes of all the given keys for the duration of a with-block.
+
+        Stripes are always taken in ascending order, so two callers locking
+        overlapping key sets cannot deadlock.
+
+        Args:
+            *keys: The keys to lock (e.g. ISBNs).
+        """
+        stripes = sorted({hash(key) % len(self._locks) for key in keys})
+        for stripe in stripes:
+            self._locks[stripe].acquire()
+        try:
+            yield
+        finally:
+            for stripe in reversed(stripes):
+                self._locks[stripe].release()
+
+def reads(method):
+    """
+    Decorate a manager method to run under the manager's read lock.
+
+    Managers created without concurrent mode have `lock` set to None and
+    call the method directly.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        lock = self.lock
+        if lock is None:
+            return method(self, *args, **kwargs)
+        lock.acquire_read()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            lock.release_read()
+    return wrapper
+
+def writes(method):
+    """
+    Decorate a manager method to run under the manager's write lock.
+
+    Managers created without concurrent mode have `lock` set to None and
+    call the method directly.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        lock = self.lock
+        if lock is None:
+            return method(self, *args, **kwargs)
+        lock.acquire_write()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            lock.release_write()
+    return wrapper
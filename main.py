@@ -47,47 +47,359 @@
 from book import BookManager
 from user import UserManager
 from check import CheckoutManager
-from storage import StorageManager
+from storage import StorageManager, JournalStorageManager, check_layout, iter_book_records
+from sqlite_storage import SQLiteStorageManager
+from sharded_storage import ShardedStorageManager, ShardedBooks
+from persister import WriteBehindPersister
+from snapshot import BookSnapshot, write_snapshot
+from commands import CommandExecutor, run_jsonl
+from parallel_search import ParallelSearcher
+from eventlog import setup_logging
+from metrics import ProfileSession, metrics
 
+import argparse
 import logging
+import os
+import sys
 
-# Set up logging configuration
-logging.basicConfig(
-    filename='library_system.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(message)s'
-)
+logger = logging.getLogger(__name__)
 
-def main():
+# File paths for storage
+BOOK_FILE = 'books.json'  # File to store book data
+USER_FILE = 'user.json'  # File to store user data
+CHECKOUT_FILE = 'checkouts.json'  # File to store checkout data
+
+# Values accepted by --log-level; None turns logging off
+LOG_LEVELS = {'debug': logging.DEBUG, 'info': logging.INFO, 'warning': logging.WARNING,
+              'error': logging.ERROR, 'off': None}
+
+def parse_args(argv=None):
+    """
+    Parse command-line options.
+
+    Args:
+        argv (list, optional): Arguments to parse. Defaults to sys.argv[1:].
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Library Management System")
+    parser.add_argument('--journal', action='store_true',
+                        help="Append every change to a journal next to each data file instead of "
+                             "only saving on exit")
+    parser.add_argument('--db', metavar='PATH',
+                        help="Store books, users and checkouts in a SQLite database at PATH instead of "
+                             "the JSON files; changes are written as they happen")
+    parser.add_argument('--checksum', action='store_true',
+                        help="Write a checksum footer on the JSON data files and verify it when loading")
+    parser.add_argument('--write-behind', action='store_true',
+                        help="Write changes to storage from a background thread as they happen, "
+                             "batched and coalesced, with a final flush on exit")
+    parser.add_argument('--flush-interval', type=float, default=1.0, metavar='SECONDS',
+                        help="Maximum delay before write-behind changes are written (default: 1)")
+    parser.add_argument('--snapshot', metavar='PATH',
+                        help="Keep books in a binary snapshot at PATH (see snapshot.py) instead of "
+                             "books.json; it is memory-mapped at startup and books are read on demand")
+    parser.add_argument('--shards', type=int, metavar='N',
+                        help="Split each data file into N shard files by ISBN or user ID (see sharded_storage.py); "
+                             "shards load in parallel and only changed shards are rewritten")
+    parser.add_argument('--search-workers', type=int, metavar='N',
+                        help="Run batch 'search_regex' commands in N worker processes over a memory-mapped "
+                             "export of the catalog (see parallel_search.py)")
+    parser.add_argument('--log-level', choices=LOG_LEVELS, default='info',
+                        help="Minimum level written to library_system.log (default: info)")
+    parser.add_argument('--log-sample', type=int, default=1, metavar='N',
+                        help="Log only one in N book and user lookups and searches (default: 1, all)")
+    parser.add_argument('--metrics', action='store_true',
+                        help="Collect per-operation call counts and latencies and storage I/O counters "
+                             "(shown by the Show Statistics menu option and the batch 'stats' command)")
+    parser.add_argument('--metrics-out', metavar='PATH',
+                        help="Write the metrics to PATH when the session ends, in Prometheus text format "
+                             "if PATH ends in .prom and as JSON otherwise (implies --metrics)")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="Profile the session with cProfile and dump the statistics to PATH")
+    parser.add_argument('--tracemalloc', metavar='PATH',
+                        help="Trace memory allocations and write the top allocation sites to PATH on exit")
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    import_parser = subparsers.add_parser('import', help="Bulk-import books from a CSV or JSON-lines file and exit")
+    import_parser.add_argument('file', help="File with title, author and isbn columns/keys")
+    import_parser.add_argument('--format', choices=['csv', 'jsonl'],
+                               help="Input format (default: inferred from the file extension)")
+    batch_parser = subparsers.add_parser('batch', help="Run JSON-lines commands non-interactively and exit")
+    batch_parser.add_argument('file', nargs='?', default='-',
+                              help="File of JSON-lines commands (default: read from stdin)")
+    batch_parser.add_argument('--no-save', action='store_true', help="Do not save the data after the batch")
+    args = parser.parse_args(argv)
+    if args.write_behind and args.db:
+        parser.error("--write-behind cannot be combined with --db (database changes are already written as they happen)")
+    if args.snapshot and (args.journal or args.db or args.write_behind):
+        parser.error("--snapshot cannot be combined with --journal, --db or --write-behind "
+                     "(the snapshot is only written on save)")
+    if args.shards is not None and (args.shards < 1 or args.journal or args.db or args.snapshot):
+        parser.error("--shards must be at least 1 and cannot be combined with --journal, --db or --snapshot")
+    if not args.db:
+        # Refuse to start on data split into a different number of shards than requested
+        try:
+            for file_path in (BOOK_FILE, USER_FILE, CHECKOUT_FILE):
+                check_layout(file_path, args.shards)
+        except ValueError as e:
+            parser.error(str(e))
+    return args
+
+def open_storages(args):
+    """
+    Create the book, user and checkout storages selected by the command-line options.
+
+    Args:
+        args (argparse.Namespace): The parsed options.
+
+    Returns:
+        tuple: The book, user and checkout storage managers.
+    """
+    if args.db:
+        storage = SQLiteStorageManager(args.db)
+        return storage, storage, storage
+    if args.journal:
+        return (JournalStorageManager(BOOK_FILE, 'isbn', checksum=args.checksum),
+                JournalStorageManager(USER_FILE, 'user_id', checksum=args.checksum),
+                JournalStorageManager(CHECKOUT_FILE, 'isbn', checksum=args.checksum))
+    if args.shards:
+        return (ShardedStorageManager(BOOK_FILE, 'isbn', args.shards, args.checksum),
+                ShardedStorageManager(USER_FILE, 'user_id', args.shards, args.checksum),
+                ShardedStorageManager(CHECKOUT_FILE, 'isbn', args.shards, args.checksum))
+    return (StorageManager(BOOK_FILE, args.checksum), StorageManager(USER_FILE, args.checksum),
+            StorageManager(CHECKOUT_FILE, args.checksum))
+
+def load_managers(book_storage, user_storage, checkout_storage, lazy=False, snapshot_path=None):
+    """
+    Build the data managers and populate them from storage.
+
+    With `lazy`, each manager only reads its storage the first time it is
+    used, so startup does not pay for data the session never touches. With
+    `snapshot_path` (if the file exists), books are mapped from a binary
+    snapshot instead and built one at a time as they are looked up; lazily
+    loaded sharded books are read one shard at a time the same way.
+
+    Args:
+        book_storage: The storage to load books from.
+        user_storage: The storage to load users from.
+        checkout_storage: The storage to load checkouts from.
+        lazy (bool): Defer loading each manager until first use. Defaults to False.
+        snapshot_path (str, optional): Binary book snapshot to load books from.
+
+    Returns:
+        tuple: The book, user and checkout managers.
+    """
+    book_manager = BookManager()
+    user_manager = UserManager()
+    checkout_manager = CheckoutManager(user_manager, book_manager)
+
+    if snapshot_path and os.path.exists(snapshot_path):
+        book_manager.load_snapshot(BookSnapshot(snapshot_path))
+    elif lazy and isinstance(book_storage, ShardedStorageManager) and book_storage.has_shards():
+        book_manager.load_snapshot(ShardedBooks(book_storage))
+    elif lazy:
+        book_manager.load_lazily(book_storage.iter_books)
+    if lazy:
+        user_manager.load_lazily(user_storage.iter_users)
+        checkout_manager.load_lazily(checkout_storage.iter_checkouts)
+        return book_manager, user_manager, checkout_manager
+
+    # Populate managers by streaming records from the files, one object at a time
+    if book_manager.is_loaded():
+        book_manager.books = book_storage.iter_books()
+    user_manager.users = user_storage.iter_users()
+    checkout_manager.checkouts = checkout_storage.iter_checkouts()
+    return book_manager, user_manager, checkout_manager
+
+def save_books(args, book_storage, book_manager):
+    """
+    Save the books to the snapshot file with --snapshot, to the book storage otherwise.
+
+    Args:
+        args (argparse.Namespace): The parsed options.
+        book_storage: The book storage.
+        book_manager (BookManager): The manager holding the books.
+    """
+    if args.snapshot:
+        write_snapshot(args.snapshot, book_manager.books)
+    else:
+        book_storage.save_books(book_manager.books)
+
+def attach_observers(args, storages, managers):
+    """
+    Register the storages (or a write-behind persister over them) as observers
+    of the managers, so changes are persisted as they happen. With --shards
+    alone, the observers only note which shards changed (see
+    ShardedStorageManager.track_changes), for the save at exit.
+
+    Args:
+        args (argparse.Namespace): The parsed options.
+        storages (tuple): The book, user and checkout storages.
+        managers (tuple): The book, user and checkout managers.
+
+    Returns:
+        WriteBehindPersister: The persister in write-behind mode (close it to
+            write the remaining changes), None otherwise.
+    """
+    if args.write_behind:
+        persister = WriteBehindPersister(dict(zip(('books', 'users', 'checkouts'), storages)), args.flush_interval)
+        for manager in managers:
+            manager.observers.append(persister)
+        return persister
+    # In journaled and database modes every change is persisted as it happens
+    if args.journal or args.db:
+        for manager, storage in zip(managers, storages):
+            manager.observers.append(storage)
+    # With shards, changes are only noted, so saving rewrites just the shards holding them
+    elif args.shards:
+        for manager, storage in zip(managers, storages):
+            manager.observers.append(storage.track_changes())
+    return None
+
+def save_all(args, storages, managers):
+    """
+    Persist all data for the session ("Save and Exit").
+
+    In database mode every change has already been written, so the database
+    is just closed; otherwise each storage saves its full collection. Managers
+    that were never loaded (see load_managers) are unchanged and are skipped.
+
+    Args:
+        args (argparse.Namespace): The parsed options.
+        storages (tuple): The book, user and checkout storages.
+        managers (tuple): The book, user and checkout managers.
+    """
+    book_storage, user_storage, checkout_storage = storages
+    book_manager, user_manager, checkout_manager = managers
+    if args.db:
+        book_storage.close()
+        return
+    if book_manager.is_loaded():
+        save_books(args, book_storage, book_manager)
+    if user_manager.is_loaded():
+        user_storage.save_users(user_manager.users)
+    if checkout_manager.is_loaded():
+        checkout_storage.save_checkouts(checkout_manager.checkouts)
+
+def run_batch(args):
+    """
+    Run JSON-lines commands from a file or stdin and write JSON-lines results to stdout.
+
+    State is loaded once, no menu is printed, responses are written through
+    a buffered stream, and data is saved once at the end (unless --no-save).
+
+    Args:
+        args (argparse.Namespace): The parsed options.
+
+    Returns:
+        int: The process exit status.
+    """
+    persister = searcher = None
+    try:
+        storages = open_storages(args)
+        managers = load_managers(*storages, lazy=True, snapshot_path=args.snapshot)
+        persister = attach_observers(args, storages, managers)
+        if args.search_workers:
+            searcher = ParallelSearcher(managers[0], args.search_workers)
+        executor = CommandExecutor(*managers, searcher=searcher)
+        output = open(sys.stdout.fileno(), 'w', buffering=1 << 16, closefd=False)
+        with output:
+            if args.file == '-':
+                count = run_jsonl(executor, sys.stdin, output)
+            else:
+                with open(args.file, 'r') as commands:
+                    count = run_jsonl(executor, commands, output)
+        if persister:
+            persister.close()
+        if not args.no_save:
+            save_all(args, storages, managers)
+        logger.info("Batch mode processed %s commands", count)
+        return 0
+    except Exception as e:
+        logger.critical("Critical error in batch mode: %s", e)
+        print(f"Batch mode failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if persister:
+            persister.close()
+        if searcher:
+            searcher.close()
+
+def main(argv=None):
     """
     Main function to run the Library Management System CLI.
     Handles initialization, user inputs, and program execution.
+
+    Args:
+        argv (list, optional): Command-line arguments. Defaults to sys.argv[1:].
     """
+    args = parse_args(argv)
+    setup_logging(level=LOG_LEVELS[args.log_level], sample_every=args.log_sample)
+    if args.metrics or args.metrics_out:
+        metrics.enable()
     try:
-        # File paths for storage
-        book_file = 'books.json'  # File to store book data
-        user_file = 'user.json'  # File to store user data
-        checkout_file = 'checkouts.json'  # File to store checkout data
+        with ProfileSession(args.profile, args.tracemalloc):
+            if args.command == 'batch':
+                return run_batch(args)
+            return run_interactive(args)
+    finally:
+        if args.metrics_out:
+            write_metrics(args.metrics_out)
+
+def write_metrics(path):
+    """
+    Write the collected metrics to a file: Prometheus text format if the path
+    ends in .prom, JSON otherwise.
+
+    Args:
+        path (str): The file to write.
+    """
+    with open(path, 'w') as file:
+        file.write(metrics.to_prometheus() if path.endswith('.prom') else metrics.to_json())
+
+def show_statistics():
+    """
+    Print the collected metrics ("Show Statistics" menu option): one line per
+    operation with its call count and latency percentiles, then the storage counters.
+    """
+    if not metrics.enabled:
+        print("Metrics are disabled; start the program with --metrics to collect them.")
+        return
+    snapshot = metrics.snapshot()
+    print(f"{'operation':<40} {'calls':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for operation, stats in snapshot["operations"].items():
+        print(f"{operation:<40} {stats['count']:>8} {stats['errors']:>7} {stats['p50'] * 1e3:>9.3f} "
+              f"{stats['p95'] * 1e3:>9.3f} {stats['p99'] * 1e3:>9.3f}")
+    for path, counters in snapshot["storage"].items():
+        print(f"{path}: " + ", ".join(f"{name} {value:.6g}" for name, value in counters.items()))
 
+def run_interactive(args):
+    """
+    Run the interactive menu (or the import command) until the user exits.
+
+    Args:
+        args (argparse.Namespace): The parsed options.
+    """
+    persister = None
+    try:
         # Initializing the storage managers for books, users, and checkouts
-        book_storage = StorageManager(book_file)
-        user_storage = StorageManager(user_file)
-        checkout_storage = StorageManager(checkout_file)
+        storages = open_storages(args)
+        book_storage, user_storage, checkout_storage = storages
 
-        # Load the data from the files
-        books = book_storage.load_books()
-        users = user_storage.load_users()
-        checkouts = checkout_storage.load_checkouts()
+        # Initialize the data managers; each reads its data on first use
+        managers = load_managers(*storages, lazy=True, snapshot_path=args.snapshot)
+        book_manager, user_manager, checkout_manager = managers
 
-        # Initialize the data managers with loaded data
-        book_manager = BookManager()
-        user_manager = UserManager()
-        checkout_manager = CheckoutManager(user_manager, book_manager)
+        if args.command == 'import':
+            # Bulk-import books, save once, and exit without starting the menu
+            summary = book_manager.bulk_add_books(iter_book_records(args.file, args.format))
+            save_books(args, book_storage, book_manager)
+            print(f"Imported {summary['added']} books ({summary['duplicates']} duplicates and "
+                  f"{summary['invalid']} invalid records skipped).")
+            return
 
-        # Populate managers with the data
-        book_manager.books = books
-        user_manager.users = users
-        checkout_manager.checkouts = checkouts
+        persister = attach_observers(args, storages, managers)
 
         # CLI Menu loop
         while True:
@@ -107,6 +419,7 @@ def main():
             print("13: List Checkouts")
             print("14: Save and Exit")
             print("15: Exit without Saving")
+            print("16: Show Statistics")
             
             choice = input("Enter your choice: ")
 
@@ -127,7 +440,7 @@ def main():
 
             elif choice == '3':
                 # Search for books by title, author, or ISBN
-                search_choice = input("Search by (1) Title, (2) Author, (3) ISBN: ")
+                search_choice = input("Search by (1) Title, (2) Author, (3) ISBN, (4) Keywords: ")
                 if search_choice == '1':
                     title = input("Enter title to search: ")
                     books = book_manager.find_books_by_title(title)
@@ -148,6 +461,11 @@ def main():
                             print("Book not found.")
                     except ValueError:
                         print("Invalid input. ISBN must be an integer. Please try again.")
+                elif search_choice == '4':
+                    query = input("Enter keywords to search (title and author words): ")
+                    books = book_manager.search_books(query)
+                    for book in books:
+                        print(book)
 
             elif choice == '4':
                 # Update book information by ISBN
@@ -252,31 +570,45 @@ def main():
                 # Save all data and exit the program
                 print("Saving data and exiting...")
                 try:
-                    book_storage.save_books(book_manager.books)
-                    user_storage.save_users(user_manager.users)
-                    checkout_storage.save_checkouts(checkout_manager.checkouts)
+                    if persister:
+                        persister.close()  # Finish background writes before the full save
+                    save_all(args, storages, managers)
                     print("Data saved successfully.")
                 except Exception as save_error:
-                    logging.error(f"Error saving data: {save_error}")
+                    logger.error("Error saving data: %s", save_error)
                     print("An error occurred while saving the data. Please check the logs.")
                 break  # Exit the loop after saving
 
             elif choice == '15':
                 # Exit the program without saving
-                print("Exiting without saving.")
+                if args.db:
+                    book_storage.close()
+                    print("Exiting. Changes are already stored in the database.")
+                elif args.write_behind:
+                    print("Exiting. Changes are written in the background; flushing the last ones.")
+                elif args.journal:
+                    print("Exiting. Changes are already journaled and will be compacted on the next save.")
+                else:
+                    print("Exiting without saving.")
                 break  # Exit the loop without saving
 
+            elif choice == '16':
+                # Show operation timings and storage counters
+                show_statistics()
+
             else:
                 # Invalid choice handling
                 print("Invalid choice, please try again.")
 
     except Exception as e:
-        logging.critical(f"Critical error in main application: {e}")
+        logger.critical("Critical error in main application: %s", e)
         print("A critical error occurred. Please check the log file for details.")
 
     finally:
+        if persister:
+            persister.close()  # Final flush of write-behind changes, however the session ends
         # Message to indicate session end
         print("Session ended.")
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,278 @@
+import cProfile
+import json
+import linecache
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from functools import wraps
+
+# Upper bounds (in seconds) of the latency histogram buckets, from 1 microsecond to 10 seconds
+BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+           1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Class for a fixed-bucket latency histogram
+class Histogram:
+    __slots__ = ('counts', 'count', 'sum', 'max')
+
+    def __init__(self):
+        """
+        Initialize an empty histogram over BUCKETS (plus an overflow bucket).
+        """
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        """
+        Record one duration.
+
+        Args:
+            seconds (float): The duration to record.
+        """
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        """
+        Estimate a percentile by linear interpolation within its bucket, as
+        Prometheus' histogram_quantile() does.
+
+        Args:
+            fraction (float): The percentile as a fraction, e.g. 0.99.
+
+        Returns:
+            float: The estimated duration in seconds (0.0 if nothing was recorded).
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = BUCKETS[index - 1] if index else 0.0
+                upper = BUCKETS[index] if index < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+# Class holding the process-wide operation timings and storage counters
+class Metrics:
+    def __init__(self):
+        """
+        Initialize an empty, disabled registry.
+
+        While disabled, timed() methods skip all bookkeeping and storage
+        counters are not updated, so instrumentation costs one attribute check.
+        """
+        self.enabled = False
+        self._lock = threading.Lock()  # Guards the histograms and counters
+        self._histograms = {}  # Maps operation name to its Histogram
+        self._errors = {}  # Maps operation name to the number of calls that raised
+        self._counters = {}  # Maps (name, file) to a running total
+
+    def enable(self):
+        """
+        Start collecting metrics.
+        """
+        self.enabled = True
+
+    def disable(self):
+        """
+        Stop collecting metrics. Collected values are kept.
+        """
+        self.enabled = False
+
+    def reset(self):
+        """
+        Drop every collected value.
+        """
+        with self._lock:
+            self._histograms.clear()
+            self._errors.clear()
+            self._counters.clear()
+
+    def observe(self, operation, seconds, failed=False):
+        """
+        Record one call of an operation.
+
+        Args:
+            operation (str): The operation name, e.g. "BookManager.add_book".
+            seconds (float): How long the call took.
+            failed (bool): Whether the call raised. Defaults to False.
+        """
+        with self._lock:
+            histogram = self._histograms.get(operation)
+            if histogram is None:
+                histogram = self._histograms[operation] = Histogram()
+            histogram.observe(seconds)
+            if failed:
+                self._errors[operation] = self._errors.get(operation, 0) + 1
+
+    def record_io(self, kind, path, size, seconds):
+        """
+        Count one storage read or write.
+
+        Args:
+            kind (str): "load", "save" or "journal".
+            path (str): The file read or written.
+            size (int): Number of bytes read or written.
+            seconds (float): How long it took.
+        """
+        with self._lock:
+            for name, value in ((f"storage_{kind}s", 1), (f"storage_{kind}_bytes", size),
+                                (f"storage_{kind}_seconds", seconds)):
+                self._counters[name, path] = self._counters.get((name, path), 0) + value
+
+    def snapshot(self):
+        """
+        Copy out every collected value.
+
+        Returns:
+            dict: "operations" maps each operation to its call count, errors,
+                total seconds and p50/p95/p99 latency in seconds; "storage" maps
+                each file to its load, save and journal counters.
+        """
+        with self._lock:
+            operations = {
+                operation: {
+                    "count": histogram.count,
+                    "errors": self._errors.get(operation, 0),
+                    "total_seconds": histogram.sum,
+                    "p50": histogram.percentile(0.50),
+                    "p95": histogram.percentile(0.95),
+                    "p99": histogram.percentile(0.99),
+                    "max": histogram.max,
+                }
+                for operation, histogram in sorted(self._histograms.items())
+            }
+            storage = {}
+            for (name, path), value in sorted(self._counters.items()):
+                storage.setdefault(path, {})[name[len("storage_"):]] = value
+        return {"enabled": self.enabled, "operations": operations, "storage": storage}
+
+    def to_json(self):
+        """
+        Render the snapshot as JSON.
+
+        Returns:
+            str: The JSON document.
+        """
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """
+        Render every value in the Prometheus text exposition format.
+
+        Returns:
+            str: One histogram per operation (library_operation_seconds),
+                an error counter per operation, and the storage counters.
+        """
+        lines = ["# TYPE library_operation_seconds histogram"]
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            errors = dict(self._errors)
+            counters = sorted(self._counters.items())
+            for operation, histogram in histograms:
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS + ("+Inf",), histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'library_operation_seconds_bucket{{op="{operation}",le="{bound}"}} {cumulative}')
+                lines.append(f'library_operation_seconds_sum{{op="{operation}"}} {histogram.sum}')
+                lines.append(f'library_operation_seconds_count{{op="{operation}"}} {histogram.count}')
+        lines.append("# TYPE library_operation_errors_total counter")
+        for operation, _ in histograms:
+            lines.append(f'library_operation_errors_total{{op="{operation}"}} {errors.get(operation, 0)}')
+        names = sorted({name for (name, _), _ in counters})
+        for name in names:
+            lines.append(f"# TYPE library_{name}_total counter")
+            for (counter_name, path), value in counters:
+                if counter_name == name:
+                    escaped = path.replace('\\', '\\\\').replace('"', '\\"')
+                    lines.append(f'library_{name}_total{{file="{escaped}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()  # The registry every instrumented method reports to
+
+def timed(method):
+    """
+    Decorator recording the call count and latency of a method in `metrics`,
+    under its qualified name (e.g. "BookManager.add_book"). Calls that raise
+    are counted as errors. When metrics are disabled the method is called
+    directly.
+    """
+    name = method.__qualname__
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        if not metrics.enabled:
+            return method(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        except BaseException:
+            metrics.observe(name, time.perf_counter() - start, failed=True)
+            raise
+        metrics.observe(name, time.perf_counter() - start)
+        return result
+    return wrapper
+
+# Class for an opt-in cProfile and/or tracemalloc session
+class ProfileSession:
+    def __init__(self, profile_path=None, tracemalloc_path=None, top=25):
+        """
+        Initialize a profiling session; nothing is enabled until start().
+
+        Args:
+            profile_path (str, optional): Where to dump cProfile statistics
+                (readable with pstats or snakeviz).
+            tracemalloc_path (str, optional): Where to write the top allocation
+                sites, by size, still allocated when the session stops.
+            top (int): Number of allocation sites to write. Defaults to 25.
+        """
+        self.profile_path = profile_path
+        self.tracemalloc_path = tracemalloc_path
+        self.top = top
+        self._profiler = None
+
+    def start(self):
+        """
+        Start the requested profilers.
+        """
+        if self.tracemalloc_path:
+            tracemalloc.start()
+        if self.profile_path:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self):
+        """
+        Stop the profilers and write their reports. Safe to call more than once.
+        """
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self.tracemalloc_path and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(self.tracemalloc_path, 'w') as report:
+                report.write(f"Traced memory: {current / 2**20:.1f} MiB current, {peak / 2**20:.1f} MiB peak\n")
+                for stat in snapshot.statistics('lineno')[:self.top]:
+                    frame = stat.traceback[0]
+                    source = linecache.getline(frame.filename, frame.lineno).strip()
+                    report.write(f"{stat.size / 1024:>10.1f} KiB {stat.count:>9} blocks  "
+                                 f"{frame.filename}:{frame.lineno}  {source}\n")
+        if self._profiler is not None:
+            self._profiler.dump_stats(self.profile_path)
+            self._profiler = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,239 @@
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from book import Book
+from snapshot import BookSnapshot, update_availability, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Fields a pattern can be matched against; "any" matches the title or the author
+FIELDS = ("title", "author", "any")
+
+# Number of row ranges handed to each worker per search, so uneven ranges balance out
+CHUNKS_PER_WORKER = 4
+
+_open_snapshot = None  # (path, BookSnapshot) mapped by this worker process
+
+def _worker_snapshot(path):
+    """
+    Map a snapshot in a worker process, reusing the mapping across searches
+    and closing the previous one when the catalog has been re-exported.
+    """
+    global _open_snapshot
+    if _open_snapshot is None or _open_snapshot[0] != path:
+        if _open_snapshot is not None:
+            _open_snapshot[1].close()
+        _open_snapshot = (path, BookSnapshot(path))
+    return _open_snapshot[1]
+
+def match_rows(path, start, stop, pattern, field, flags, predicate):
+    """
+    Scan a range of snapshot rows for books matching a query (runs in a worker).
+
+    Titles are decoded a range at a time, each distinct author is matched
+    once per range, and a Book is only built for rows that reach the predicate.
+
+    Args:
+        path (str): The snapshot file.
+        start (int): First row to scan.
+        stop (int): Row after the last one to scan.
+        pattern (str): Regular expression searched for in `field`, or None.
+        field (str): One of FIELDS.
+        flags (int): re flags for the pattern.
+        predicate (callable): Picklable function taking a Book and returning
+            whether it matches, or None.
+
+    Returns:
+        array: The matching row numbers, in ascending order.
+    """
+    snapshot = _worker_snapshot(path)
+    search = re.compile(pattern, flags).search if pattern is not None else None
+    titles = snapshot.titles(start, stop) if predicate is not None or field != "author" else None
+    author, isbns, is_available = snapshot.author, snapshot.isbns, snapshot.is_available
+    author_matches = {}  # Author -> whether the pattern matches it
+    rows = array('q')
+    for row in range(start, stop):
+        if search is not None:
+            if field == "title":
+                matched = search(titles[row - start]) is not None
+            else:
+                name = author(row)
+                matched = author_matches.get(name)
+                if matched is None:
+                    matched = author_matches[name] = search(name) is not None
+                if not matched and field == "any":
+                    matched = search(titles[row - start]) is not None
+            if not matched:
+                continue
+        if predicate is None or predicate(Book(titles[row - start], author(row), isbns[row], is_available(row))):
+            rows.append(row)
+    return rows
+
+def scan_books(books, pattern=None, field="title", flags=re.IGNORECASE, predicate=None):
+    """
+    Find matching books in a single process, in the order given.
+
+    Args:
+        books (iterable): The Book objects to scan.
+        pattern, field, flags, predicate: As for ParallelSearcher.search.
+
+    Returns:
+        list: The matching books.
+
+    Raises:
+        ValueError: If the field is unknown.
+    """
+    if field not in FIELDS:
+        raise ValueError(f"Unknown search field: {field!r}")
+    search = re.compile(pattern, flags).search if pattern is not None else None
+    results = []
+    for book in books:
+        if search is not None:
+            if field == "title":
+                matched = search(book.title)
+            elif field == "author":
+                matched = search(book.author)
+            else:
+                matched = search(book.author) or search(book.title)
+            if matched is None:
+                continue
+        if predicate is None or predicate(book):
+            results.append(book)
+    return results
+
+# Class for regex and predicate searches over a BookManager's catalog, spread over worker processes
+class ParallelSearcher:
+    def __init__(self, book_manager, workers=None, directory=None):
+        """
+        Initialize a searcher for ad-hoc, unindexed queries over every book.
+
+        The catalog is exported once to a binary snapshot (snapshot.py) that
+        each worker maps with mmap, so no Book is pickled: workers scan row
+        ranges and send back row numbers, which are mapped to the manager's
+        own Book objects and merged in catalog order. The export is redone
+        on the first search after a book is added or removed or a title or
+        author changes (see BookManager.catalog_version). After checkouts
+        and returns only its availability bits are rewritten, in place. With
+        one worker the catalog is scanned in this process and nothing is
+        exported.
+
+        Call close() (or use a with-block) to stop the workers and remove the export.
+
+        Args:
+            book_manager (BookManager): The manager whose books are searched.
+            workers (int, optional): Worker processes. Defaults to os.cpu_count().
+            directory (str, optional): Where to write the export. Defaults to a
+                new temporary directory.
+        """
+        self.book_manager = book_manager
+        self.workers = workers or os.cpu_count() or 1
+        self._owns_directory = directory is None
+        self._directory = directory
+        self._lock = threading.Lock()  # Serializes exports; searches on one export run concurrently
+        self._pool = None
+        self._path = None  # Current export
+        self._version = None  # BookManager.version the export's availability bits were taken at
+        self._catalog_version = None  # BookManager.catalog_version the export was taken at
+        self._books = []  # The manager's books, by export row
+
+    def _export(self):
+        """
+        Re-export the catalog if a title, author or ISBN changed since the
+        last export, or only refresh its availability bits if nothing else did.
+
+        Returns:
+            tuple: The export path and the books by row.
+        """
+        with self._lock:
+            # Versions are read before the books, so a change made meanwhile is caught by the next search
+            version = self.book_manager.version
+            if version == self._version:
+                return self._path, self._books
+            catalog_version = self.book_manager.catalog_version
+            if catalog_version == self._catalog_version:
+                update_availability(self._path, self._books)  # The rows still hold the manager's live books
+                self._version = version
+                logger.info("Refreshed availability of %s exported books in %s", len(self._books), self._path)
+                return self._path, self._books
+            version, books = self.book_manager.copy_books()
+            if self._directory is None:
+                self._directory = tempfile.mkdtemp(prefix="library-search-")
+            # A new name per version, so workers notice the change and remap (see _worker_snapshot)
+            path = os.path.join(self._directory, f"catalog-{version}.bin")
+            write_snapshot(path, books)
+            if self._path is not None:
+                try:
+                    os.remove(self._path)
+                except OSError:
+                    pass
+            self._path, self._books, self._version, self._catalog_version = path, books, version, catalog_version
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers)
+            logger.info("Exported %s books to %s for parallel search", len(books), path)
+            return path, books
+
+    def search(self, pattern=None, field="title", flags=re.IGNORECASE, predicate=None):
+        """
+        Find the books matching a regular expression and/or a predicate.
+
+        Args:
+            pattern (str, optional): Regular expression searched for (re.search)
+                in the field.
+            field (str): "title", "author" or "any". Defaults to "title".
+            flags (int): re flags. Defaults to re.IGNORECASE.
+            predicate (callable, optional): Function taking a Book and returning
+                whether it matches. It must be picklable (a module-level function)
+                to run in the workers, where it sees a copy of each book.
+
+        Returns:
+            list: The manager's matching Book objects, in catalog order.
+
+        Raises:
+            ValueError: If the field is unknown or neither a pattern nor a predicate is given.
+            re.error: If the pattern is not a valid regular expression.
+        """
+        if field not in FIELDS:
+            raise ValueError(f"Unknown search field: {field!r}")
+        if pattern is None and predicate is None:
+            raise ValueError("A pattern or a predicate is required.")
+        re.compile(pattern or "", flags)  # Report a bad pattern here, not from a worker
+        if self.workers <= 1:
+            return scan_books(self.book_manager.copy_books()[1], pattern, field, flags, predicate)
+        path, books = self._export()
+        step = max(1, -(-len(books) // (self.workers * CHUNKS_PER_WORKER)))
+        starts = range(0, len(books), step)
+        chunks = self._pool.map(match_rows, [path] * len(starts), starts, [min(start + step, len(books)) for start in starts],
+                                [pattern] * len(starts), [field] * len(starts), [flags] * len(starts),
+                                [predicate] * len(starts))
+        results = [books[row] for rows in chunks for row in rows]
+        logger.info("Parallel search over %s books in %s workers: %s matches", len(books), self.workers, len(results))
+        return results
+
+    def close(self):
+        """
+        Stop the worker processes and remove the export. Safe to call more than once.
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._path is not None:
+            try:
+                os.remove(self._path)
+            except OSError:
+                pass
+            self._path = self._version = self._catalog_version = None
+            self._books = []
+        if self._owns_directory and self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
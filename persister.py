@@ -0,0 +1,127 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Class for write-behind persistence: changes are queued in memory and written by a background thread
+class WriteBehindPersister:
+    def __init__(self, storages, flush_interval=1.0, max_pending=1000):
+        """
+        Initialize a write-behind persister over one storage per kind of record.
+
+        Register the persister as an observer of the managers. Reported changes
+        are only recorded in memory, keyed by ISBN or user ID, so repeated
+        updates to the same record coalesce into one write and the caller never
+        waits on disk. A background thread passes the pending changes to each
+        storage's record_changes() every `flush_interval` seconds, or sooner
+        once `max_pending` records are dirty. close() writes whatever is left.
+
+        Records are serialized when they are flushed, so a flush always writes
+        the latest state of each dirty record.
+
+        Args:
+            storages (dict): Maps "books", "users" and "checkouts" to the storage
+                that persists them (StorageManager, JournalStorageManager, ...).
+            flush_interval (float): Maximum seconds between flushes. Defaults to 1.0.
+            max_pending (int): Number of dirty records that triggers an early flush.
+                Defaults to 1000.
+        """
+        self.storages = storages
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {entity: {} for entity in storages}  # entity -> key -> (op, record)
+        self._pending_count = 0
+        self._lock = threading.Lock()  # Guards _pending; never held during disk writes
+        self._flush_lock = threading.Lock()  # Keeps flushes (background and final) from overlapping
+        self._wake = threading.Event()
+        self._stopped = False
+        self.records_written = 0  # Total records written, after coalescing
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def record_change(self, entity, op, key, record=None):
+        """
+        Queue a single change. Called by the managers' observers hook.
+
+        Args:
+            entity (str): The kind of record changed ("books", "users" or "checkouts").
+            op (str): Either "put" or "delete".
+            key (int): The key of the changed record.
+            record: The changed object for "put", None for "delete".
+        """
+        self.record_changes(entity, [(op, key, record)])
+
+    def record_changes(self, entity, changes):
+        """
+        Queue several changes, replacing any pending change to the same keys.
+
+        Args:
+            entity (str): The kind of record changed ("books", "users" or "checkouts").
+            changes (list): (op, key, record) tuples, as for record_change.
+        """
+        with self._lock:
+            pending = self._pending[entity]
+            for op, key, record in changes:
+                if key not in pending:
+                    self._pending_count += 1
+                pending[key] = (op, record)
+            full = self._pending_count >= self.max_pending
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        """
+        Background loop: flush on the interval or when woken, until closed.
+        """
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """
+        Write all pending changes to their storages now.
+
+        If a storage fails, its changes are queued again (unless newer ones
+        arrived meanwhile) and retried on the next flush.
+
+        Returns:
+            int: The number of records written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batches = self._pending
+                self._pending = {entity: {} for entity in self.storages}
+                self._pending_count = 0
+
+            written = 0
+            for entity, pending in batches.items():
+                if not pending:
+                    continue
+                changes = [(op, key, record) for key, (op, record) in pending.items()]
+                try:
+                    self.storages[entity].record_changes(entity, changes)
+                    written += len(changes)
+                except Exception as e:
+                    logger.error("Write-behind flush of %s %s failed, will retry: %s", len(changes), entity, e)
+                    with self._lock:
+                        newer = self._pending[entity]
+                        for key, change in pending.items():
+                            if key not in newer:
+                                newer[key] = change
+                                self._pending_count += 1
+            self.records_written += written
+            if written:
+                logger.info("Write-behind flush: %s records written", written)
+            return written
+
+    def close(self):
+        """
+        Stop the background thread and write any remaining changes.
+        Safe to call more than once.
+        """
+        if not self._stopped:
+            self._stopped = True
+            self._wake.set()
+            self._thread.join()
+        self.flush()
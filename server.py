@@ -0,0 +1,267 @@
+import argparse
+import asyncio
+import json
+import logging
+import signal
+from urllib.parse import parse_qsl, urlsplit
+from commands import CommandExecutor
+from eventlog import setup_logging
+from metrics import metrics
+from main import load_managers
+from storage import StorageManager
+
+logger = logging.getLogger(__name__)
+
+# Status line text for the HTTP status codes the server sends
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+# Query-string parameters converted to int before the command runs; others stay strings (except "prefix")
+INTEGER_PARAMETERS = frozenset({"isbn", "user_id"})
+# Accepted spellings of the boolean "prefix" parameter
+BOOLEAN_VALUES = {"true": True, "1": True, "false": False, "0": False}
+
+def parse_query(query):
+    """
+    Build command arguments from a query string. Only the known integer
+    parameters (ISBN and user ID) are converted, so a title such as "1984"
+    stays a string; "prefix" accepts true/false or 1/0.
+
+    Args:
+        query (str): The raw query string.
+
+    Returns:
+        dict: The arguments by name.
+
+    Raises:
+        ValueError: If an integer or boolean parameter has an invalid value.
+    """
+    command = {}
+    for name, value in parse_qsl(query):
+        if name in INTEGER_PARAMETERS:
+            try:
+                value = int(value)
+            except ValueError:
+                raise ValueError(f"{name} must be an integer, got {value!r}") from None
+        elif name == "prefix":
+            if value.lower() not in BOOLEAN_VALUES:
+                raise ValueError(f"prefix must be true or false, got {value!r}")
+            value = BOOLEAN_VALUES[value.lower()]
+        command[name] = value
+    return command
+
+# Class serving the library managers as JSON endpoints over HTTP, using asyncio
+class LibraryServer:
+    def __init__(self, executor, storages, save_interval=5.0):
+        """
+        Initialize the server around an executor whose managers hold all state in memory.
+
+        Read operations run directly on the event loop as requests arrive.
+        Mutations go through a queue to a single writer task, so they are
+        applied one at a time in arrival order. A persister task saves the
+        collections through the storages from a worker thread every
+        `save_interval` seconds when something has changed.
+
+        Args:
+            executor (CommandExecutor): Executes commands against the managers.
+            storages (tuple): The book, user and checkout StorageManagers.
+            save_interval (float): Seconds between background saves. Defaults to 5.0.
+        """
+        self.executor = executor
+        self.storages = storages
+        self.save_interval = save_interval
+        self.dirty = False  # True when a mutation has happened since the last save
+        self._queue = None  # Pending (command, future) mutations for the writer task
+        self._save_lock = None  # Ensures only one save runs at a time
+
+    async def dispatch(self, command):
+        """
+        Execute a command: reads immediately, mutations through the writer task.
+
+        Args:
+            command (dict): The command to run.
+
+        Returns:
+            dict: The executor's response.
+        """
+        if self.executor.is_read_only(command) or command.get("op") not in self.executor.handlers:
+            return self.executor.execute(command)
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((command, future))
+        return await future
+
+    async def _writer(self):
+        """
+        Apply queued mutations one at a time, in arrival order.
+        """
+        while True:
+            command, future = await self._queue.get()
+            response = self.executor.execute(command)
+            if response["ok"]:
+                self.dirty = True
+            if not future.cancelled():
+                future.set_result(response)
+
+    async def _persister(self):
+        """
+        Save changed data periodically in the background.
+        """
+        while True:
+            await asyncio.sleep(self.save_interval)
+            await self.save()
+
+    async def save(self):
+        """
+        Save all collections if anything changed, without blocking the event loop.
+
+        The collections are converted to plain dicts on the event loop,
+        where no mutation can interleave (the writer task runs there too), so
+        the three files agree with each other. Only the JSON encoding and the
+        writes run in a worker thread.
+        """
+        async with self._save_lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+            books = [book.to_dict() for book in self.executor.book_manager.books]
+            users = [user.to_dict() for user in self.executor.user_manager.users]
+            checkouts = [checkout.to_dict() for checkout in self.executor.checkout_manager.checkouts]
+            try:
+                await asyncio.to_thread(self._write, books, users, checkouts)
+            except Exception as e:
+                self.dirty = True  # Retry on the next interval
+                logger.error("Background save failed: %s", e)
+
+    def _write(self, books, users, checkouts):
+        """
+        Write the collections' records to storage (runs in a worker thread).
+
+        Args:
+            books, users, checkouts (list): The records, as dicts.
+        """
+        book_storage, user_storage, checkout_storage = self.storages
+        book_storage.save_data(books, 'isbn')
+        user_storage.save_data(users, 'user_id')
+        checkout_storage.save_data(checkouts, 'isbn')
+        logger.info("Background save: %s books, %s users, %s checkouts", len(books), len(users), len(checkouts))
+
+    async def _handle_connection(self, reader, writer):
+        """
+        Serve HTTP/1.1 requests on one connection until the client closes it.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, response = await self._route(method, target, body)
+                payload = json.dumps(response).encode()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            logger.warning("Dropping connection: %s", e)
+        finally:
+            writer.close()
+
+    async def _route(self, method, target, body):
+        """
+        Turn an HTTP request into a command and run it.
+
+        GET /<op>?name=value runs a read operation with query parameters as
+        arguments; POST /<op> takes its arguments as a JSON object body.
+
+        Returns:
+            tuple: The HTTP status code and the JSON response.
+        """
+        url = urlsplit(target)
+        op = url.path.strip('/')
+        if method == 'GET':
+            try:
+                command = parse_query(url.query)
+            except ValueError as e:
+                return 400, {"ok": False, "error": str(e)}
+            if op in self.executor.handlers and not self.executor.is_read_only({"op": op}):
+                return 405, {"ok": False, "error": f"Use POST for {op!r}"}
+        elif method == 'POST':
+            try:
+                command = json.loads(body) if body else {}
+            except json.JSONDecodeError as e:
+                return 400, {"ok": False, "error": f"Invalid JSON: {e}"}
+            if not isinstance(command, dict):
+                return 400, {"ok": False, "error": "Request body must be a JSON object."}
+        else:
+            return 405, {"ok": False, "error": f"Unsupported method: {method}"}
+
+        command["op"] = op
+        if op not in self.executor.handlers:
+            return 404, {"ok": False, "error": f"Unknown operation: {op!r}"}
+        response = await self.dispatch(command)
+        return (200 if response["ok"] else 400), response
+
+    async def serve(self, host, port):
+        """
+        Run the server until cancelled, then save any remaining changes.
+
+        Args:
+            host (str): Interface to listen on.
+            port (int): TCP port to listen on.
+        """
+        self._queue = asyncio.Queue()
+        self._save_lock = asyncio.Lock()
+        tasks = [asyncio.create_task(self._writer()), asyncio.create_task(self._persister())]
+        try:
+            # Stop gracefully (with a final save) on SIGTERM as well as Ctrl+C
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except NotImplementedError:
+            pass  # Signal handlers are unavailable on Windows event loops
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        logger.info("Library server listening on %s:%s", host, port)
+        print(f"Library server listening on http://{host}:{port}/")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await self.save()
+            print("Library server stopped; data saved.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the library over HTTP with JSON endpoints.")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument('--save-interval', type=float, default=5.0,
+                        help="Seconds between background saves (default: 5)")
+    parser.add_argument('--metrics', action='store_true',
+                        help="Collect operation latencies and storage counters, served by GET /stats "
+                             "(add ?format=prometheus for the Prometheus text format)")
+    args = parser.parse_args()
+    setup_logging()
+    if args.metrics:
+        metrics.enable()
+
+    try:
+        storages = (StorageManager('books.json'), StorageManager('user.json'), StorageManager('checkouts.json'))
+    except ValueError as e:
+        parser.error(str(e))  # Data split into shards by main.py --shards
+    library_server = LibraryServer(CommandExecutor(*load_managers(*storages)), storages, args.save_interval)
+    try:
+        asyncio.run(library_server.serve(args.host, args.port))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
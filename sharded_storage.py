@@ -0,0 +1,521 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from book import Book
+from metrics import metrics
+from storage import (KEY_FIELDS, StorageManager, atomic_write, fsync_directory, merge_changes, read_footer,
+                     read_shard_manifest, shard_manifest_path)
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of threads reading or writing shard files at once
+MAX_WORKERS = 16
+
+def shard_paths(file_path, shards):
+    """
+    Name the shard files of a data file: books.json with 4 shards is stored as
+    books-00-of-04.json ... books-03-of-04.json.
+
+    Args:
+        file_path (str): The unsharded data file.
+        shards (int): The number of shards.
+
+    Returns:
+        list: The path of each shard, by shard number.
+    """
+    root, extension = os.path.splitext(file_path)
+    return [f"{root}-{index:02d}-of-{shards:02d}{extension}" for index in range(shards)]
+
+# Class for a JSON data file split into several shard files by key
+class ShardedStorageManager(StorageManager):
+    def __init__(self, file_path, key_field, shards=16, checksum=False, workers=None):
+        """
+        Initialize a storage that spreads records over `shards` JSON files.
+
+        A record lives in shard `key % shards` (its integer key, e.g. the ISBN
+        or user ID, hashed by modulo, so the layout is stable across runs).
+        Books and checkouts are both keyed by ISBN, so a book and its checkout
+        land in the same shard number.
+
+        Each shard is an ordinary StorageManager file (atomic writes, optional
+        checksum footer). Loading reads the shards from a thread pool, and
+        record_changes() rewrites just the shards holding the changed keys.
+        A full save rewrites every shard, unless the managers report their
+        changes through the observer returned by track_changes(): then only
+        the shards holding changed records are serialized and written.
+
+        The shard count is recorded in a manifest next to the data file
+        (books.json.shards), and opening the data with another layout is
+        refused (see storage.check_layout). Until the manifest exists,
+        records are read from the unsharded file; the first write splits
+        them into shards, writes the manifest and removes the unsharded file,
+        so no stale copy is left behind.
+
+        Args:
+            file_path (str): The unsharded data file, used to name the shards
+                (see shard_paths).
+            key_field (str): The field that uniquely identifies a record (e.g. 'isbn').
+            shards (int): The number of shard files. Defaults to 16.
+            checksum (bool): Write a checksum footer on each shard. Defaults to False.
+            workers (int, optional): Threads used to read and write shards.
+                Defaults to min(shards, MAX_WORKERS).
+
+        Raises:
+            ValueError: If the data has been split into a different number of shards.
+        """
+        self.shards = shards
+        super().__init__(file_path, checksum)
+        self.key_field = key_field
+        self.paths = shard_paths(file_path, shards)
+        self.workers = workers or min(shards, MAX_WORKERS)
+        self.tracking = False  # Whether changes are reported through track_changes()
+        self._dirty = set()  # Shards holding records changed since they were last written
+        self._split = read_shard_manifest(file_path) == shards  # True once the manifest has been written
+
+    def shard_of(self, key):
+        """
+        Find the shard a key belongs to.
+
+        Args:
+            key (int): The record key.
+
+        Returns:
+            int: The shard number.
+        """
+        return key % self.shards
+
+    def track_changes(self):
+        """
+        Start tracking changed shards, so full saves only write those.
+
+        Register the returned observer on the manager whose collection this
+        storage saves, before its first change.
+
+        Returns:
+            ShardChangeTracker: The observer that records changed keys.
+        """
+        self.tracking = True
+        return ShardChangeTracker(self)
+
+    def mark_dirty(self, key):
+        """
+        Record that the shard holding a key must be written on the next save.
+
+        Args:
+            key (int): The key of a changed record.
+        """
+        self._dirty.add(key % self.shards)
+
+    def has_shards(self):
+        """
+        Check whether the data has been split into shards (its manifest exists).
+
+        Returns:
+            bool: True if the shard files hold the data, False while it is
+                still in the unsharded file.
+        """
+        return self._split
+
+    def _finish_split(self):
+        """
+        After the first complete write of the shards, record the layout in the
+        manifest and remove the unsharded file, which is now stale.
+        """
+        if self._split:
+            return
+        with atomic_write(shard_manifest_path(self.file_path)) as manifest:
+            manifest.write(json.dumps({"shards": self.shards, "key_field": self.key_field}).encode('utf-8'))
+        self._split = True
+        try:
+            os.remove(self.file_path)
+            logger.info("Split %s into %s shards and removed the unsharded file", self.file_path, self.shards)
+        except FileNotFoundError:
+            pass
+        fsync_directory(os.path.dirname(os.path.abspath(self.file_path)))
+
+    def remove_shards(self):
+        """
+        Delete the manifest and then the shard files, returning the data file
+        to the unsharded layout. Write the unsharded file first (see join).
+        """
+        try:
+            os.remove(shard_manifest_path(self.file_path))
+        except FileNotFoundError:
+            pass
+        self._split = False
+        for path in self.paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._dirty.clear()
+
+    def load_shard(self, index):
+        """
+        Read every record of one shard, checking its checksum footer if it has one.
+
+        Args:
+            index (int): The shard number.
+
+        Returns:
+            list: The shard's records, in file order; empty if the file is missing.
+
+        Raises:
+            IOError: If the shard's checksum footer does not match.
+            json.JSONDecodeError: If the shard is not a JSON array.
+        """
+        path = self.paths[index]
+        start = time.perf_counter()
+        try:
+            with open(path, 'rb') as raw:
+                length, expected_crc = read_footer(raw)
+                data = raw.read(length) if length is not None else raw.read()
+        except FileNotFoundError:
+            return []
+        if expected_crc is not None and zlib.crc32(data) != expected_crc:
+            raise IOError(f"Checksum mismatch: shard {path} is corrupt")
+        records = json.loads(data) if data else []
+        if expected_crc is None and self.checksum and data:
+            logger.warning("Shard %s has no checksum footer; it will be added on the next save.", path)
+            self._dirty.add(index)  # Makes the next save rewrite the shard, with its footer
+        if metrics.enabled:
+            metrics.record_io("load", path, len(data), time.perf_counter() - start)
+        return records
+
+    def write_shard(self, index, data):
+        """
+        Atomically replace one shard with already-serialized JSON text.
+
+        Args:
+            index (int): The shard number.
+            data (bytes): The UTF-8 JSON array to write.
+        """
+        path = self.paths[index]
+        start = time.perf_counter()
+        with atomic_write(path) as raw:
+            raw.write(data)
+            if self.checksum:
+                raw.write(f"\n#crc32={zlib.crc32(data):08x} length={len(data)}\n".encode('ascii'))
+            size = raw.tell()
+        if metrics.enabled:
+            metrics.record_io("save", path, size, time.perf_counter() - start)
+
+    def iter_data(self):
+        """
+        Stream the records of every shard, reading shards ahead from a thread pool.
+
+        At most `workers` shards are held in memory at once. Records come
+        shard by shard, in file order within each shard, so the overall order
+        differs from an unsharded file. Until the data has been split, the
+        unsharded file is streamed instead.
+
+        Yields:
+            dict: Each stored record.
+
+        Raises:
+            Exception: If a shard cannot be read or parsed.
+        """
+        if not self.has_shards():
+            yield from super().iter_data()
+            return
+        logger.info("Reading %s shards of %s", self.shards, self.file_path)
+        try:
+            with ThreadPoolExecutor(self.workers, thread_name_prefix="shard-load") as pool:
+                pending = [pool.submit(self.load_shard, index) for index in range(min(self.workers, self.shards))]
+                for index in range(self.shards):
+                    records = pending[index].result()
+                    if index + self.workers < self.shards:
+                        pending.append(pool.submit(self.load_shard, index + self.workers))
+                    pending[index] = None
+                    yield from records
+        except (IOError, json.JSONDecodeError, UnicodeDecodeError) as e:
+            logger.error("Error loading shards of %s: %s", self.file_path, e)
+            raise
+
+    def _shards_to_write(self):
+        """
+        Take the shards the next full save must write: the changed ones when
+        changes are tracked, every shard otherwise or before the first split.
+
+        Returns:
+            set: The shard numbers, no longer marked dirty.
+        """
+        dirty, self._dirty = self._dirty, set()
+        if self.tracking and self._split:
+            return dirty
+        return set(range(self.shards))
+
+    def write_data(self, data):
+        """
+        Partition records by shard and rewrite the shards that need it.
+
+        When changes are tracked (see track_changes), only the records of the
+        shards holding changes are serialized and written; otherwise every
+        shard is. The first write also records the layout (see _finish_split).
+
+        Args:
+            data (list): A list of dictionaries to write (unique keys); with
+                tracking, records of unchanged shards may be left out.
+
+        Raises:
+            IOError: If a shard cannot be written.
+        """
+        indexes = self._shards_to_write()
+        partitions = {index: [] for index in sorted(indexes)}
+        try:
+            for item in data:
+                partition = partitions.get(item[self.key_field] % self.shards)
+                if partition is not None:
+                    partition.append(item)
+            self._write_partitions(partitions)
+        except BaseException:
+            self._dirty |= indexes  # Still unwritten: retry them on the next save
+            raise
+        self._finish_split()
+
+    def _write_partitions(self, partitions):
+        """
+        Serialize the given shards and write them in parallel.
+
+        Args:
+            partitions (dict): Maps shard number to its complete list of records.
+        """
+        encoded = {index: json.dumps(records).encode('utf-8') for index, records in partitions.items()}
+        if len(encoded) > 1:
+            with ThreadPoolExecutor(min(self.workers, len(encoded)), thread_name_prefix="shard-save") as pool:
+                for future in [pool.submit(self.write_shard, index, data) for index, data in encoded.items()]:
+                    future.result()
+        else:
+            for index, data in encoded.items():
+                self.write_shard(index, data)
+        logger.info("Wrote %s of %s shards of %s", len(encoded), self.shards, self.file_path)
+
+    def _changed_only(self, objects, key_field):
+        """
+        Leave out the objects of shards the next full save will not write, so
+        they are not converted to dicts for nothing.
+
+        Args:
+            objects (iterable): Books, users or checkouts.
+            key_field (str): The key attribute of the objects.
+
+        Returns:
+            iterable: The objects, filtered when changes are tracked.
+        """
+        if not (self.tracking and self._split):
+            return objects
+        dirty = set(self._dirty)
+        return [item for item in objects if getattr(item, key_field) % self.shards in dirty]
+
+    def save_books(self, books):
+        """
+        Save the books, converting only those in shards the save will write.
+        """
+        super().save_books(self._changed_only(books, 'isbn'))
+
+    def save_users(self, users):
+        """
+        Save the users, converting only those in shards the save will write.
+        """
+        super().save_users(self._changed_only(users, 'user_id'))
+
+    def save_checkouts(self, checkouts):
+        """
+        Save the checkouts, converting only those in shards the save will write.
+        """
+        super().save_checkouts(self._changed_only(checkouts, 'isbn'))
+
+    def record_changes(self, entity, changes):
+        """
+        Apply several changes by rewriting only the shards they fall in.
+
+        Args:
+            entity (str): The kind of record changed ("books", "users" or "checkouts").
+            changes (list): (op, key, record) tuples, as for record_change.
+
+        Raises:
+            IOError: If a shard cannot be read or written.
+        """
+        latest = {}
+        for op, key, record in changes:
+            latest.pop(key, None)  # Re-inserting moves the key to the end, preserving the order of additions
+            latest[key] = record.to_dict() if op == "put" else None
+        key_field = KEY_FIELDS[entity]
+        try:
+            if not self.has_shards():
+                self.write_data(list(merge_changes(self.iter_data(), latest, key_field)))
+                return
+            by_shard = {}
+            for key, item in latest.items():
+                by_shard.setdefault(key % self.shards, {})[key] = item
+            self._write_partitions({index: list(merge_changes(self.load_shard(index), shard_changes, key_field))
+                                    for index, shard_changes in by_shard.items()})
+        except IOError as e:
+            logger.error("Error saving changes to shards of %s: %s", self.file_path, e)
+            raise
+
+    def find_record(self, key):
+        """
+        Look up one record by key, reading only its shard.
+
+        Args:
+            key (int): The record key.
+
+        Returns:
+            dict: The stored record, or None if not found.
+        """
+        for item in self.load_shard(self.shard_of(key)):
+            if item[self.key_field] == key:
+                return item
+        return None
+
+# Class for a manager observer that marks the shards of changed records dirty
+class ShardChangeTracker:
+    def __init__(self, storage):
+        """
+        Initialize an observer for one sharded storage (see
+        ShardedStorageManager.track_changes).
+
+        Args:
+            storage (ShardedStorageManager): The storage to mark.
+        """
+        self.storage = storage
+
+    def record_change(self, entity, op, key, record=None):
+        """
+        Mark the shard of a changed record. Nothing is written until the next save.
+        """
+        self.storage.mark_dirty(key)
+
+    def record_changes(self, entity, changes):
+        """
+        Mark the shards of several changed records.
+        """
+        for _, key, _ in changes:
+            self.storage.mark_dirty(key)
+
+# Class giving BookManager.load_snapshot() on-demand access to a sharded book storage
+class ShardedBooks:
+    def __init__(self, storage):
+        """
+        Wrap a sharded book storage so BookManager can answer ISBN lookups
+        by reading only the shard the ISBN belongs to.
+
+        Shards are read on first use and kept as records until the manager
+        materializes the whole collection by iterating over this object.
+
+        Args:
+            storage (ShardedStorageManager): The book storage (keyed by ISBN).
+        """
+        self.storage = storage
+        self.path = storage.file_path
+        self._shards = {}  # Maps shard number to {isbn: record} for the shards read so far
+        self._lock = threading.Lock()  # Keeps two lookups from reading the same shard
+
+    def _shard(self, index):
+        """
+        Return one shard's records by ISBN, reading the shard on first use.
+        """
+        records = self._shards.get(index)
+        if records is None:
+            with self._lock:
+                records = self._shards.get(index)
+                if records is None:
+                    records = self._shards[index] = {item['isbn']: item for item in self.storage.load_shard(index)}
+        return records
+
+    def __iter__(self):
+        """
+        Materialize every book, shard by shard, reading the shards not yet
+        looked up from the storage's thread pool.
+
+        Yields:
+            Book: A new Book object for each stored book.
+        """
+        if len(self._shards) == self.storage.shards:
+            for index in range(self.storage.shards):
+                for item in self._shards[index].values():
+                    yield Book(**item)
+            return
+        for item in self.storage.iter_data():
+            yield Book(**item)
+
+    def get_book(self, isbn):
+        """
+        Look up a book by ISBN, reading its shard if needed.
+
+        Args:
+            isbn (int): The ISBN number of the book.
+
+        Returns:
+            Book: A new Book object if found, None otherwise.
+        """
+        item = self._shard(self.storage.shard_of(isbn)).get(isbn)
+        return Book(**item) if item is not None else None
+
+    def count_available(self):
+        """
+        Count the available books, reading every shard not read yet.
+
+        Returns:
+            int: The number of available books.
+        """
+        for index in range(self.storage.shards):
+            self._shard(index)
+        return sum(1 for records in self._shards.values() for item in records.values() if item.get('available', True))
+
+def split(file_path, key_field, shards, checksum=False):
+    """
+    Split an unsharded JSON data file into shard files and a manifest; the
+    unsharded file is removed once they are written.
+
+    Returns:
+        int: The number of records written.
+    """
+    storage = ShardedStorageManager(file_path, key_field, shards, checksum)
+    data = storage.load_data()
+    storage.save_data(data, key_field)
+    return len(data)
+
+def join(file_path, key_field, shards, checksum=False):
+    """
+    Merge shard files back into an unsharded JSON data file.
+
+    The unsharded file is written in full before the manifest and then the
+    shards are removed, so an interrupted join leaves the sharded layout intact.
+
+    Returns:
+        int: The number of records written.
+
+    Raises:
+        ValueError: If the data has not been split into `shards` shards.
+    """
+    sharded = ShardedStorageManager(file_path, key_field, shards)
+    if not sharded.has_shards():
+        raise ValueError(f"{file_path} has not been split into {shards} shards.")
+    data = sharded.load_data()
+    joined = StorageManager(file_path + '.joined', checksum)
+    joined.write_data(data)
+    os.replace(joined.file_path, file_path)
+    fsync_directory(os.path.dirname(os.path.abspath(file_path)))
+    sharded.remove_shards()
+    return len(data)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split a JSON data file into shards by key, or join shards back.")
+    parser.add_argument('direction', choices=['split', 'join'])
+    parser.add_argument('file', help="Unsharded data file, e.g. books.json")
+    parser.add_argument('--shards', type=int, default=16, help="Number of shards (default: 16)")
+    parser.add_argument('--key', choices=sorted(set(KEY_FIELDS.values())), default='isbn',
+                        help="Key field the records are sharded by (default: isbn)")
+    parser.add_argument('--checksum', action='store_true', help="Write a checksum footer on the written files")
+    args = parser.parse_args()
+    convert = split if args.direction == 'split' else join
+    count = convert(args.file, args.key, args.shards, args.checksum)
+    print(f"{'Split' if args.direction == 'split' else 'Joined'} {count} records of {args.file} "
+          f"({args.shards} shards)")
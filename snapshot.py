@@ -0,0 +1,316 @@
+import argparse
+import logging
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from book import Book, intern_author
+from storage import StorageManager, atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Binary book snapshot layout (little-endian, every section 8-byte aligned):
+#   header          magic, row count, author count, then the offset of each section below
+#   isbns           int64 per row, in catalog order
+#   order           uint32 row numbers sorted by ISBN, for binary search
+#   title_offsets   uint64 per row + 1: byte range of each title in the string table
+#   author_ids      uint32 per row: index into the author table
+#   author_offsets  uint64 per author + 1: byte range of each author in the string table
+#   available       one bit per row
+#   strings         UTF-8 titles followed by UTF-8 authors (each author stored once)
+MAGIC = b'LIBBOOK1'
+HEADER = struct.Struct('<8sQQ7Q')
+
+def align(offset):
+    """
+    Round an offset up to the next multiple of 8.
+    """
+    return (offset + 7) & ~7
+
+def write_snapshot(path, books):
+    """
+    Write books to a binary snapshot file, atomically.
+
+    Args:
+        path (str): The snapshot file to create or replace.
+        books (iterable): Book objects (or anything with title, author, isbn and available).
+
+    Returns:
+        int: The number of books written.
+
+    Raises:
+        ValueError: If two books share an ISBN.
+    """
+    isbns = array('q')
+    available = bytearray()
+    title_offsets = array('Q', [0])
+    author_ids = array('I')
+    author_index = {}  # Author -> ID, in first-seen order
+    titles = []
+    size = 0
+    for row, book in enumerate(books):
+        isbns.append(book.isbn)
+        if row % 8 == 0:
+            available.append(0)
+        if book.available:
+            available[-1] |= 1 << (row % 8)
+        title = book.title.encode('utf-8')
+        titles.append(title)
+        size += len(title)
+        title_offsets.append(size)
+        author_ids.append(author_index.setdefault(book.author, len(author_index)))
+
+    order = array('I', sorted(range(len(isbns)), key=isbns.__getitem__))
+    for previous, current in zip(order, order[1:]):
+        if isbns[previous] == isbns[current]:
+            raise ValueError(f"Duplicate ISBN {isbns[current]} in snapshot.")
+
+    author_offsets = array('Q', [size])
+    authors = []
+    for author in author_index:
+        encoded = author.encode('utf-8')
+        authors.append(encoded)
+        size += len(encoded)
+        author_offsets.append(size)
+
+    sections = [isbns.tobytes(), order.tobytes(), title_offsets.tobytes(), author_ids.tobytes(),
+                author_offsets.tobytes(), bytes(available), b''.join(titles + authors)]
+    offsets = []
+    position = align(HEADER.size)
+    for section in sections:
+        offsets.append(position)
+        position = align(position + len(section))
+
+    with atomic_write(path) as file:
+        file.write(HEADER.pack(MAGIC, len(isbns), len(author_index), *offsets))
+        for offset, section in zip(offsets, sections):
+            file.write(b'\0' * (offset - file.tell()))
+            file.write(section)
+    logger.info("Wrote binary snapshot of %s books to %s", len(isbns), path)
+    return len(isbns)
+
+def update_availability(path, books):
+    """
+    Rewrite the availability bits of a snapshot in place, e.g. after
+    checkouts and returns, instead of writing the whole file again.
+    Processes that have the snapshot mapped see the new bits.
+
+    Args:
+        path (str): The snapshot file.
+        books (sequence): The snapshot's books (or anything with an available
+            attribute), one per row, in row order.
+
+    Raises:
+        ValueError: If the file is not a book snapshot of len(books) rows.
+    """
+    available = bytearray((len(books) + 7) // 8)
+    for row, book in enumerate(books):
+        if book.available:
+            available[row >> 3] |= 1 << (row & 7)
+    with open(path, 'r+b') as file:
+        magic, count, author_count, *offsets = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC or count != len(books):
+            raise ValueError(f"{path} is not a book snapshot of {len(books)} books.")
+        file.seek(offsets[5])
+        file.write(available)
+
+# Class giving read access to a binary book snapshot through mmap
+class BookSnapshot:
+    def __init__(self, path):
+        """
+        Map a binary snapshot file into memory.
+
+        Nothing is parsed up front: the columns are typed views over the
+        mapped pages, so opening is near-instant whatever the catalog size,
+        and pages are only read from disk as lookups touch them. Book objects
+        are built on access. Call close() (or use a with-block) to unmap.
+
+        Args:
+            path (str): The snapshot file to open.
+
+        Raises:
+            ValueError: If the file is not a book snapshot or is truncated.
+        """
+        self.path = path
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < HEADER.size:
+                raise ValueError(f"{path} is too short to be a book snapshot.")
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, author_count, *offsets = HEADER.unpack_from(self._map)
+        lengths = [8 * count, 4 * count, 8 * (count + 1), 4 * count, 8 * (author_count + 1), (count + 7) // 8]
+        if magic != MAGIC or any(offset + length > len(self._map) for offset, length in zip(offsets, lengths)):
+            self._map.close()
+            raise ValueError(f"{path} is not a book snapshot, or is truncated.")
+
+        buffer = self._buffer = memoryview(self._map)
+        self.isbns = buffer[offsets[0]:offsets[0] + lengths[0]].cast('q')  # ISBN per row
+        self._order = buffer[offsets[1]:offsets[1] + lengths[1]].cast('I')
+        self._title_offsets = buffer[offsets[2]:offsets[2] + lengths[2]].cast('Q')
+        self._author_ids = buffer[offsets[3]:offsets[3] + lengths[3]].cast('I')
+        self._author_offsets = buffer[offsets[4]:offsets[4] + lengths[4]].cast('Q')
+        self._available = buffer[offsets[5]:offsets[5] + lengths[5]]
+        self._strings = buffer[offsets[6]:]
+        if self._author_offsets[author_count] > len(self._strings):
+            self.close()
+            raise ValueError(f"{path} is not a book snapshot, or is truncated.")
+        self._count = count
+        self._authors = [None] * author_count  # Decoded (interned) authors, filled on first use
+
+    def __len__(self):
+        """
+        Number of books in the snapshot.
+
+        Returns:
+            int: The number of rows.
+        """
+        return self._count
+
+    def __iter__(self):
+        """
+        Materialize every book, in catalog order.
+
+        Yields:
+            Book: A new Book object for each row.
+        """
+        for row in range(self._count):
+            yield self.book(row)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def find_row(self, isbn):
+        """
+        Find the row of a book by binary search over the ISBN order.
+
+        Args:
+            isbn (int): The ISBN to look up.
+
+        Returns:
+            int: The row number, or -1 if the ISBN is not in the snapshot.
+        """
+        order, isbns = self._order, self.isbns
+        position = bisect_left(order, isbn, key=isbns.__getitem__)
+        if position < len(order) and isbns[order[position]] == isbn:
+            return order[position]
+        return -1
+
+    def title(self, row):
+        """
+        Decode the title of a row.
+        """
+        return str(self._strings[self._title_offsets[row]:self._title_offsets[row + 1]], 'utf-8')
+
+    def titles(self, start, stop):
+        """
+        Decode the titles of a range of rows at once, which is cheaper than
+        one title() call per row since titles are stored contiguously.
+
+        Args:
+            start (int): First row.
+            stop (int): Row after the last one.
+
+        Returns:
+            list: The titles, by row.
+        """
+        offsets = self._title_offsets
+        base = offsets[start]
+        data = self._strings[base:offsets[stop]]
+        text = str(data, 'utf-8')
+        if len(text) != len(data):
+            return [self.title(row) for row in range(start, stop)]  # Multi-byte text: byte offsets are not str offsets
+        return [text[offsets[row] - base:offsets[row + 1] - base] for row in range(start, stop)]
+
+    def author(self, row):
+        """
+        Decode the author of a row; each distinct author is decoded once.
+        """
+        author_id = self._author_ids[row]
+        author = self._authors[author_id]
+        if author is None:
+            start, end = self._author_offsets[author_id], self._author_offsets[author_id + 1]
+            author = self._authors[author_id] = intern_author(str(self._strings[start:end], 'utf-8'))
+        return author
+
+    def is_available(self, row):
+        """
+        Read the availability bit of a row.
+        """
+        return bool(self._available[row >> 3] & (1 << (row & 7)))
+
+    def book(self, row):
+        """
+        Build a Book object for one row.
+
+        Args:
+            row (int): The row number.
+
+        Returns:
+            Book: A new Book object.
+        """
+        return Book(self.title(row), self.author(row), self.isbns[row], self.is_available(row))
+
+    def get_book(self, isbn):
+        """
+        Look up a book by ISBN and materialize it.
+
+        Args:
+            isbn (int): The ISBN number of the book.
+
+        Returns:
+            Book: A new Book object if found, None otherwise.
+        """
+        row = self.find_row(isbn)
+        return self.book(row) if row >= 0 else None
+
+    def count_available(self):
+        """
+        Count the available books straight from the mapped bitmap.
+
+        Returns:
+            int: The number of available books.
+        """
+        return int.from_bytes(self._available, 'little').bit_count()
+
+    def close(self):
+        """
+        Release the views and unmap the file. Books already built stay valid.
+        """
+        for name in ('isbns', '_order', '_title_offsets', '_author_ids', '_author_offsets',
+                     '_available', '_strings', '_buffer'):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        self._map.close()
+
+def json_to_snapshot(json_path, snapshot_path):
+    """
+    Convert a JSON book file (as written by StorageManager) to a binary snapshot.
+
+    Returns:
+        int: The number of books converted.
+    """
+    return write_snapshot(snapshot_path, StorageManager(json_path).iter_books())
+
+def snapshot_to_json(snapshot_path, json_path):
+    """
+    Convert a binary snapshot back to a JSON book file.
+
+    Returns:
+        int: The number of books converted.
+    """
+    with BookSnapshot(snapshot_path) as snapshot:
+        StorageManager(json_path).write_data([book.to_dict() for book in snapshot])
+        return len(snapshot)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert book data between JSON and the binary snapshot format.")
+    parser.add_argument('direction', choices=['to-binary', 'to-json'])
+    parser.add_argument('source', help="File to read (books.json for to-binary, e.g. books.bin for to-json)")
+    parser.add_argument('target', help="File to write")
+    args = parser.parse_args()
+    convert = json_to_snapshot if args.direction == 'to-binary' else snapshot_to_json
+    print(f"Converted {convert(args.source, args.target)} books from {args.source} to {args.target}")
@@ -0,0 +1,311 @@
+import argparse
+import logging
+import sqlite3
+from book import Book
+from user import User
+from check import Checkout
+from storage import StorageManager
+
+logger = logging.getLogger(__name__)
+
+# Table layouts: table name -> (primary key column, all columns in insert order)
+TABLES = {
+    'books': ('isbn', ('isbn', 'title', 'author', 'available')),
+    'users': ('user_id', ('user_id', 'name')),
+    'checkouts': ('isbn', ('isbn', 'user_id')),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    isbn INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    available INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS books_title ON books (title);
+CREATE INDEX IF NOT EXISTS books_author ON books (author);
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_name ON users (name);
+CREATE TABLE IF NOT EXISTS checkouts (
+    isbn INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS checkouts_user_id ON checkouts (user_id);
+"""
+
+def insert_statement(table):
+    """
+    Build the INSERT OR REPLACE statement for a table, with columns in TABLES order.
+
+    Args:
+        table (str): One of "books", "users" or "checkouts".
+
+    Returns:
+        str: The parameterized SQL statement.
+    """
+    columns = TABLES[table][1]
+    return f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+
+# Class for storing books, users and checkouts in a single SQLite database
+class SQLiteStorageManager:
+    def __init__(self, file_path):
+        """
+        Open (or create) a SQLite database for library data.
+
+        Provides the same load_*/save_* methods as StorageManager, so one
+        instance can stand in for the book, user and checkout storages. It also
+        implements record_change()/record_changes(), so registering it as a manager observer
+        persists each change as a point update instead of a full rewrite.
+
+        Args:
+            file_path (str): The path of the database file.
+        """
+        self.file_path = file_path
+        self.connection = sqlite3.connect(file_path)
+        self.connection.execute("PRAGMA journal_mode=WAL")  # Readers don't block the writer
+        self.connection.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints; safe with WAL
+        self.connection.executescript(SCHEMA)
+
+    def _rows(self, table):
+        """
+        Stream every row of a table in primary key order.
+
+        Args:
+            table (str): The table to read.
+
+        Yields:
+            tuple: Each row, with columns in the order given by TABLES.
+        """
+        key_column, columns = TABLES[table]
+        try:
+            yield from self.connection.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY {key_column}")
+        except sqlite3.Error as e:
+            logger.error("Error loading %s from %s: %s", table, self.file_path, e)
+            raise
+
+    def _replace_all(self, table, rows):
+        """
+        Replace the full contents of a table in a single transaction.
+
+        Args:
+            table (str): The table to replace.
+            rows (iterable): Tuples with columns in the order given by TABLES.
+        """
+        try:
+            with self.connection:
+                self.connection.execute(f"DELETE FROM {table}")
+                self.connection.executemany(insert_statement(table), rows)
+        except sqlite3.Error as e:
+            logger.error("Error saving %s to %s: %s", table, self.file_path, e)
+            raise
+
+    def iter_books(self):
+        """
+        Stream all books from the database.
+
+        Yields:
+            Book: Each stored book.
+        """
+        for isbn, title, author, available in self._rows('books'):
+            yield Book(title, author, isbn, bool(available))
+
+    def load_books(self):
+        """
+        Load all books from the database.
+
+        Returns:
+            list: A list of Book objects.
+        """
+        return list(self.iter_books())
+
+    def save_books(self, books):
+        """
+        Replace all stored books with the given ones.
+
+        Args:
+            books (iterable): The Book objects to save.
+        """
+        self._replace_all('books', ((book.isbn, book.title, book.author, book.available) for book in books))
+
+    def iter_users(self):
+        """
+        Stream all users from the database.
+
+        Yields:
+            User: Each stored user.
+        """
+        for user_id, name in self._rows('users'):
+            yield User(name, user_id)
+
+    def load_users(self):
+        """
+        Load all users from the database.
+
+        Returns:
+            list: A list of User objects.
+        """
+        return list(self.iter_users())
+
+    def save_users(self, users):
+        """
+        Replace all stored users with the given ones.
+
+        Args:
+            users (iterable): The User objects to save.
+        """
+        self._replace_all('users', ((user.user_id, user.name) for user in users))
+
+    def iter_checkouts(self):
+        """
+        Stream all checkout transactions from the database.
+
+        Yields:
+            Checkout: Each stored checkout.
+        """
+        for isbn, user_id in self._rows('checkouts'):
+            yield Checkout(user_id, isbn)
+
+    def load_checkouts(self):
+        """
+        Load all checkout transactions from the database.
+
+        Returns:
+            list: A list of Checkout objects.
+        """
+        return list(self.iter_checkouts())
+
+    def save_checkouts(self, checkouts):
+        """
+        Replace all stored checkout transactions with the given ones.
+
+        Args:
+            checkouts (iterable): The Checkout objects to save.
+        """
+        self._replace_all('checkouts', ((checkout.isbn, checkout.user_id) for checkout in checkouts))
+
+    def upsert(self, table, record):
+        """
+        Insert or update a single record.
+
+        Args:
+            table (str): One of "books", "users" or "checkouts".
+            record: The Book, User or Checkout object to store.
+        """
+        try:
+            with self.connection:
+                self.connection.execute(insert_statement(table), [getattr(record, column) for column in TABLES[table][1]])
+        except sqlite3.Error as e:
+            logger.error("Error saving record to %s in %s: %s", table, self.file_path, e)
+            raise
+
+    def delete(self, table, key):
+        """
+        Delete a single record by primary key.
+
+        Args:
+            table (str): One of "books", "users" or "checkouts".
+            key (int): The ISBN or user ID of the record.
+
+        Returns:
+            bool: True if a record was deleted, False otherwise.
+        """
+        try:
+            with self.connection:
+                cursor = self.connection.execute(f"DELETE FROM {table} WHERE {TABLES[table][0]} = ?", (key,))
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            logger.error("Error deleting record %s from %s in %s: %s", key, table, self.file_path, e)
+            raise
+
+    def find_book(self, isbn):
+        """
+        Look up a single book by ISBN without loading the catalog.
+
+        Args:
+            isbn (int): The ISBN number of the book.
+
+        Returns:
+            Book: The book object if found, None otherwise.
+        """
+        row = self.connection.execute(
+            "SELECT title, author, isbn, available FROM books WHERE isbn = ?", (isbn,)).fetchone()
+        if row is None:
+            return None
+        title, author, isbn, available = row
+        return Book(title, author, isbn, bool(available))
+
+    def record_change(self, entity, op, key, record=None):
+        """
+        Persist a single change reported by a manager's observers hook.
+
+        Args:
+            entity (str): The table changed ("books", "users" or "checkouts").
+            op (str): Either "put" or "delete".
+            key (int): The key of the changed record.
+            record: The changed object for "put", None for "delete".
+        """
+        if op == "delete":
+            self.delete(entity, key)
+        else:
+            self.upsert(entity, record)
+
+    def record_changes(self, entity, changes):
+        """
+        Persist several changes to one table in a single transaction.
+
+        Args:
+            entity (str): The table changed ("books", "users" or "checkouts").
+            changes (list): (op, key, record) tuples, as for record_change.
+        """
+        key_column, columns = TABLES[entity]
+        insert = insert_statement(entity)
+        try:
+            with self.connection:
+                for op, key, record in changes:
+                    if op == "delete":
+                        self.connection.execute(f"DELETE FROM {entity} WHERE {key_column} = ?", (key,))
+                    else:
+                        self.connection.execute(insert, [getattr(record, column) for column in columns])
+        except sqlite3.Error as e:
+            logger.error("Error saving changes to %s in %s: %s", entity, self.file_path, e)
+            raise
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self.connection.close()
+
+def migrate_from_json(db_path, book_file='books.json', user_file='user.json', checkout_file='checkouts.json'):
+    """
+    Copy the contents of the JSON data files into a SQLite database.
+
+    Records are streamed, so the JSON files never have to fit in memory.
+
+    Args:
+        db_path (str): The database to create or overwrite.
+        book_file (str): The JSON file holding books.
+        user_file (str): The JSON file holding users.
+        checkout_file (str): The JSON file holding checkouts.
+    """
+    database = SQLiteStorageManager(db_path)
+    try:
+        database.save_books(StorageManager(book_file).iter_books())
+        database.save_users(StorageManager(user_file).iter_users())
+        database.save_checkouts(StorageManager(checkout_file).iter_checkouts())
+        logger.info("Migrated %s, %s and %s into %s", book_file, user_file, checkout_file, db_path)
+    finally:
+        database.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate the library's JSON data files into a SQLite database.")
+    parser.add_argument('db_path', help="Database file to create, e.g. library.db")
+    parser.add_argument('--books', default='books.json', help="Book file (default: books.json)")
+    parser.add_argument('--users', default='user.json', help="User file (default: user.json)")
+    parser.add_argument('--checkouts', default='checkouts.json', help="Checkout file (default: checkouts.json)")
+    args = parser.parse_args()
+    migrate_from_json(args.db_path, args.books, args.users, args.checkouts)
+    print(f"Migrated data into {args.db_path}")
@@ -1,176 +1,804 @@
-import json
-import logging
-from book import Book
-from user import User
-from check import Checkout
-
-# Class for managing storage operations (loading and saving data)
-class StorageManager:
-    def __init__(self, file_path):
-        """
-        Initialize a new StorageManager object to handle data persistence.
-
-        Args:
-            file_path (str): The file path where data will be stored.
-        """
-        self.file_path = file_path
-
-    def load_data(self):
-        """
-        Load data from the specified file path.
-
-        Returns:
-            list: A list of dictionaries representing the stored data.
-
-        Raises:
-            Exception: If an error occurs while loading the data.
-        """
-        try:
-            with open(self.file_path, 'r') as file:
-                logging.info("Reading Existing File")
-                data = file.read().strip()
-                if not data:
-                    logging.warning(f"File {self.file_path} is empty. Returning empty list.")
-                    return []
-                return json.loads(data)  # Parse JSON data
-        except FileNotFoundError:
-            logging.warning(f"File not found: {self.file_path}. Returning empty list.")
-            return []
-        except (IOError, json.JSONDecodeError) as e:
-            logging.error(f"Error loading data from {self.file_path}: {e}")
-            raise
-
-    def save_data(self, data, key_field):
-        """
-        Save data to the specified file path, avoiding duplicates.
-
-        Args:
-            data (list): A list of dictionaries representing the data to save.
-            key_field (str): The field used as a unique identifier for merging data.
-
-        Raises:
-            IOError: If an error occurs while saving the data.
-        """
-        try:
-            # Load existing data
-            existing_data = self.load_data()
-            
-            # Convert existing data to a dictionary for fast lookup
-            existing_data_dict = {item[key_field]: item for item in existing_data}
-
-            # Update with new data, avoiding duplicates
-            for item in data:
-                existing_data_dict[item[key_field]] = item  # Update existing or add new entry
-
-            # Convert back to a list
-            merged_data = list(existing_data_dict.values())
-
-            # Write merged data back to the file
-            with open(self.file_path, 'w') as file:
-                json.dump(merged_data, file)
-        except IOError as e:
-            logging.error(f"Error saving data to {self.file_path}: {e}")
-            raise
-    
-    def load_books(self):
-        """
-        Load all books from the storage file.
-
-        Returns:
-            list: A list of Book objects.
-
-        Raises:
-            Exception: If an error occurs while loading the books.
-        """
-        try:
-            data = self.load_data()
-            return [Book(**book) for book in data]
-        except Exception as e:
-            logging.error(f"Error loading books: {e}")
-            raise
-
-    def save_books(self, books):
-        """
-        Save all books to the storage file.
-
-        Args:
-            books (list): A list of Book objects to save.
-
-        Raises:
-            Exception: If an error occurs while saving the books.
-        """
-        try:
-            # Convert Book objects to dictionaries and save
-            book_data = [book.__dict__ for book in books]
-            self.save_data(book_data, 'isbn')
-        except Exception as e:
-            logging.error(f"Error saving books: {e}")
-            raise
-
-    def load_users(self):
-        """
-        Load all users from the storage file.
-
-        Returns:
-            list: A list of User objects.
-
-        Raises:
-            Exception: If an error occurs while loading the users.
-        """
-        try:
-            data = self.load_data()
-            return [User(**user) for user in data]
-        except Exception as e:
-            logging.error(f"Error loading users: {e}")
-            raise
-
-    def save_users(self, users):
-        """
-        Save all users to the storage file.
-
-        Args:
-            users (list): A list of User objects to save.
-
-        Raises:
-            Exception: If an error occurs while saving the users.
-        """
-        try:
-            user_data = [user.__dict__ for user in users]
-            self.save_data(user_data, 'user_id')
-        except Exception as e:
-            logging.error(f"Error saving users: {e}")
-            raise
-
-    def load_checkouts(self):
-        """
-        Load all checkout transactions from the storage file.
-
-        Returns:
-            list: A list of Checkout objects.
-
-        Raises:
-            Exception: If an error occurs while loading the checkouts.
-        """
-        try:
-            data = self.load_data()
-            return [Checkout(**checkout) for checkout in data]
-        except Exception as e:
-            logging.error(f"Error loading checkouts: {e}")
-            raise
-    
-    def save_checkouts(self, checkouts):
-        """
-        Save all checkout transactions to the storage file.
-
-        Args:
-            checkouts (list): A list of Checkout objects to save.
-
-        Raises:
-            Exception: If an error occurs while saving the checkouts.
-        """
-        try:
-            checkout_data = [checkout.__dict__ for checkout in checkouts]
-            self.save_data(checkout_data, 'isbn')
-        except Exception as e:
-            logging.error(f"Error saving checkouts: {e}")
-            raise
+import codecs
+import csv
+import json
+import logging
+import os
+import re
+import time
+import zlib
+from contextlib import contextmanager
+from book import Book
+from user import User
+from check import Checkout
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Size of each read when streaming a JSON array from disk
+CHUNK_SIZE = 1 << 16
+WHITESPACE = re.compile(r'\s*')
+
+# Field that uniquely identifies a record of each kind, as reported by the managers' observers hook
+KEY_FIELDS = {'books': 'isbn', 'users': 'user_id', 'checkouts': 'isbn'}
+
+def iter_json_array(file, chunk_size=CHUNK_SIZE):
+    """
+    Incrementally parse a JSON array from a file, yielding one element at a time.
+
+    Only the current element and one chunk of text are held in memory, so
+    peak usage does not grow with the size of the file.
+
+    Args:
+        file: A text file object positioned at the start of the array.
+        chunk_size (int): Number of characters to read at a time.
+
+    Yields:
+        object: Each decoded element of the array, in order.
+
+    Raises:
+        json.JSONDecodeError: If the file is not a well-formed JSON array.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+    state = 'start'  # start -> first (value or ']') -> separator -> value -> separator ... -> done
+
+    while True:
+        pos = WHITESPACE.match(buffer, pos).end()
+        if pos == len(buffer):
+            if eof:
+                break
+            buffer = file.read(chunk_size)
+            eof = not buffer
+            pos = 0
+            continue
+
+        char = buffer[pos]
+        if state == 'start':
+            if char != '[':
+                raise json.JSONDecodeError("Expecting '['", buffer, pos)
+            pos += 1
+            state = 'first'
+        elif state == 'separator':
+            if char == ',':
+                state = 'value'
+            elif char == ']':
+                state = 'done'
+            else:
+                raise json.JSONDecodeError("Expecting ',' or ']'", buffer, pos)
+            pos += 1
+        elif state == 'first' and char == ']':
+            pos += 1
+            state = 'done'
+        elif state in ('first', 'value'):
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = None
+            if end is None or (end == len(buffer) and not eof):
+                # The element may continue in the next chunk; read more and retry
+                chunk = file.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield item
+            pos = end
+            state = 'separator'
+        else:
+            raise json.JSONDecodeError("Extra data", buffer, pos)
+
+    if state not in ('start', 'done'):
+        raise json.JSONDecodeError("Unexpected end of data", buffer, pos)
+
+# Optional checksum footer written after the JSON array: CRC-32 and byte length of the array text
+FOOTER_PATTERN = re.compile(rb'\n#crc32=([0-9a-f]{8}) length=(\d+)\n\Z')
+FOOTER_MAX_SIZE = 64
+
+def read_footer(file):
+    """
+    Look for a checksum footer at the end of a binary file and rewind it.
+
+    Args:
+        file: A binary file object opened for reading.
+
+    Returns:
+        tuple: (length, crc) of the JSON text the footer describes, or (None, None)
+            if the file has no footer.
+
+    Raises:
+        IOError: If the footer's length does not match the file size (a torn or
+            truncated file).
+    """
+    size = file.seek(0, os.SEEK_END)
+    file.seek(max(0, size - FOOTER_MAX_SIZE))
+    match = FOOTER_PATTERN.search(file.read())
+    file.seek(0)
+    if match is None:
+        return None, None
+    crc, length = int(match.group(1), 16), int(match.group(2))
+    if length + len(match.group(0)) != size:
+        raise IOError(f"File size does not match its checksum footer ({size} bytes, footer says {length}): torn write?")
+    return length, crc
+
+# Class wrapping a binary file to read a bounded run of UTF-8 text while computing its CRC-32
+class ChecksumReader:
+    def __init__(self, file, length=None):
+        """
+        Args:
+            file: A binary file object.
+            length (int, optional): Number of bytes to read; None reads to the end.
+        """
+        self.file = file
+        self.remaining = length
+        self.crc = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+
+    def read(self, size):
+        """
+        Read up to `size` bytes and return them decoded; '' at the end of the run.
+        """
+        if self.remaining is not None:
+            size = min(size, self.remaining)
+        data = self.file.read(size) if size else b''
+        if self.remaining is not None:
+            self.remaining -= len(data)
+        self.crc = zlib.crc32(data, self.crc)
+        return self._decoder.decode(data, final=not data)
+
+# Class wrapping a binary file to write UTF-8 text in large chunks while computing its CRC-32
+class ChecksumWriter:
+    def __init__(self, file):
+        """
+        Args:
+            file: A binary file object.
+        """
+        self.file = file
+        self.crc = 0
+        self.length = 0  # Bytes written so far
+        self._parts = []
+        self._buffered = 0
+
+    def write(self, text):
+        """
+        Buffer text (json.dump writes many small pieces) and write it out in chunks.
+        """
+        self._parts.append(text)
+        self._buffered += len(text)
+        if self._buffered >= CHUNK_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+        Encode and write the buffered text.
+        """
+        data = ''.join(self._parts).encode('utf-8')
+        self._parts = []
+        self._buffered = 0
+        self.crc = zlib.crc32(data, self.crc)
+        self.length += len(data)
+        self.file.write(data)
+
+def fsync_directory(directory):
+    """
+    Flush a directory entry to disk so a rename into it survives a crash.
+    Not supported on every platform; failures are ignored.
+
+    Args:
+        directory (str): The directory to sync.
+    """
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+@contextmanager
+def atomic_write(path):
+    """
+    Open "<path>.tmp" for binary writing and atomically move it over `path` on success.
+
+    The temporary file is fsynced before the rename and the directory after
+    it, so once the block exits the new contents are durable; if the block
+    raises, the temporary file is removed and `path` is left untouched.
+
+    Args:
+        path (str): The file to replace.
+
+    Yields:
+        file: The binary file object to write to.
+    """
+    temp_path = path + '.tmp'
+    try:
+        with open(temp_path, 'wb') as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+def shard_manifest_path(file_path):
+    """
+    Name the manifest recording that a data file has been split into shards
+    (see sharded_storage.py): books.json -> books.json.shards.
+    """
+    return file_path + '.shards'
+
+def read_shard_manifest(file_path):
+    """
+    Read how many shards a data file has been split into.
+
+    Args:
+        file_path (str): The unsharded data file.
+
+    Returns:
+        int: The number of shards, or None if the data is stored in the file itself.
+    """
+    try:
+        with open(shard_manifest_path(file_path), 'r') as manifest:
+            return json.load(manifest)["shards"]
+    except FileNotFoundError:
+        return None
+
+def check_layout(file_path, shards=None):
+    """
+    Refuse to open a data file whose layout on disk differs from the one
+    requested, instead of reading a stale copy.
+
+    Args:
+        file_path (str): The unsharded data file.
+        shards (int, optional): The number of shards requested; None for a single file.
+
+    Raises:
+        ValueError: If the data has been split into a different number of shards
+            (or into shards at all, when a single file is requested).
+    """
+    recorded = read_shard_manifest(file_path)
+    if recorded is None or recorded == shards:
+        return
+    if shards is None:
+        raise ValueError(f"{file_path} has been split into {recorded} shards: run with --shards {recorded}, "
+                         f"or merge them with 'python sharded_storage.py join {file_path} --shards {recorded}'")
+    raise ValueError(f"{file_path} has been split into {recorded} shards, not {shards}: run with --shards {recorded}, "
+                     f"or merge them with 'python sharded_storage.py join {file_path} --shards {recorded}' "
+                     f"and split again")
+
+def merge_changes(records, changes, key_field):
+    """
+    Apply collapsed changes on top of a stream of stored records.
+
+    Changed records are replaced in place and deleted ones dropped; records
+    that were not stored yet follow at the end, in the order they were added.
+
+    Args:
+        records (iterable): The stored records (dicts), in file order.
+        changes (dict): Maps each changed key to its latest record, or None if it
+            was deleted. Entries are removed as they are applied.
+        key_field (str): The field that uniquely identifies a record.
+
+    Yields:
+        dict: Each current record.
+    """
+    for item in records:
+        key = item[key_field]
+        if key in changes:
+            item = changes.pop(key)
+            if item is None:
+                continue
+        yield item
+    for item in changes.values():
+        if item is not None:
+            yield item
+
+def iter_book_records(path, file_format=None):
+    """
+    Stream book records from a CSV or JSON-lines file for bulk import.
+
+    CSV files need a header row with title, author and isbn columns (and
+    optionally available). ISBNs that are not integers are passed through
+    unchanged so the importer can count them as invalid.
+
+    Args:
+        path (str): The file to read.
+        file_format (str, optional): "csv" or "jsonl". Defaults to the file extension.
+
+    Yields:
+        dict: One record per book, with "title", "author" and "isbn" keys.
+
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    if file_format is None:
+        extension = os.path.splitext(path)[1].lower()
+        file_format = 'csv' if extension == '.csv' else 'jsonl' if extension in ('.jsonl', '.ndjson') else extension
+    try:
+        with open(path, 'r', newline='') as file:
+            if file_format == 'csv':
+                for row in csv.DictReader(file):
+                    isbn = (row.get('isbn') or '').strip()
+                    row['isbn'] = int(isbn) if isbn.isdigit() else isbn
+                    if 'available' in row:
+                        row['available'] = (row['available'] or '').strip().lower() not in ('false', '0', 'no', '')
+                    yield row
+            elif file_format == 'jsonl':
+                for line in file:
+                    if line.strip():
+                        yield json.loads(line)
+            else:
+                raise ValueError(f"Unsupported import format: {file_format}")
+    except (IOError, json.JSONDecodeError) as e:
+        logger.error("Error reading import file %s: %s", path, e)
+        raise
+
+# Class for managing storage operations (loading and saving data)
+class StorageManager:
+    shards = None  # Number of shard files the data is spread over; None for a single file
+
+    def __init__(self, file_path, checksum=False):
+        """
+        Initialize a new StorageManager object to handle data persistence.
+
+        Saves are atomic: data is written to "<file_path>.tmp", flushed to disk
+        and renamed over the file, so a crash leaves either the old or the new
+        contents, never a truncated file.
+
+        Args:
+            file_path (str): The file path where data will be stored.
+            checksum (bool): Write a CRC-32 footer after the data. Files with a
+                footer are verified on load either way, and refused if it does
+                not match; a file without one (e.g. written before checksums
+                were turned on) is loaded with a warning and gets its footer on
+                the next save. Defaults to False.
+
+        Raises:
+            ValueError: If the data has been split into shards (see check_layout).
+        """
+        self.file_path = file_path
+        self.checksum = checksum
+        check_layout(file_path, self.shards)
+
+    def iter_data(self):
+        """
+        Stream records from the specified file path one at a time.
+        With metrics enabled, each complete read is counted as a load; its
+        time includes whatever the consumer does between records.
+
+        Yields:
+            dict: Each stored record, in file order. Nothing if the file is missing or empty.
+
+        Raises:
+            Exception: If an error occurs while reading or parsing the data.
+        """
+        start = time.perf_counter()
+        try:
+            with open(self.file_path, 'rb') as raw:
+                logger.info("Reading Existing File")
+                length, expected_crc = read_footer(raw)
+                if expected_crc is None and self.checksum and os.fstat(raw.fileno()).st_size:
+                    logger.warning("File %s has no checksum footer; it will be added on the next save.", self.file_path)
+                file = ChecksumReader(raw, length)
+                empty = True
+                for item in iter_json_array(file):
+                    empty = False
+                    yield item
+                if expected_crc is not None and file.crc != expected_crc:
+                    raise IOError("Checksum mismatch: file is corrupt")
+                if metrics.enabled:
+                    metrics.record_io("load", self.file_path, os.fstat(raw.fileno()).st_size,
+                                      time.perf_counter() - start)
+                if empty:
+                    logger.warning("File %s is empty. Returning no records.", self.file_path)
+        except FileNotFoundError:
+            logger.warning("File not found: %s. Returning no records.", self.file_path)
+        except (IOError, json.JSONDecodeError, UnicodeDecodeError) as e:
+            logger.error("Error loading data from %s: %s", self.file_path, e)
+            raise
+
+    def load_data(self):
+        """
+        Load data from the specified file path.
+
+        Returns:
+            list: A list of dictionaries representing the stored data.
+
+        Raises:
+            Exception: If an error occurs while loading the data.
+        """
+        return list(self.iter_data())
+
+    def save_data(self, data, key_field):
+        """
+        Save data to the specified file path, replacing its contents.
+
+        The data is the complete set of records: nothing is merged from the
+        file on disk, so it is not re-read, and records deleted in memory are
+        removed from the file too. Duplicate keys in the data keep the last record.
+
+        Args:
+            data (list): A list of dictionaries representing the data to save.
+            key_field (str): The field used as a unique identifier for the records.
+
+        Raises:
+            IOError: If an error occurs while saving the data.
+        """
+        try:
+            self.write_data(list({item[key_field]: item for item in data}.values()))
+        except IOError as e:
+            logger.error("Error saving data to %s: %s", self.file_path, e)
+            raise
+
+    def write_data(self, data):
+        """
+        Atomically replace the storage file with exactly the given records.
+
+        The records are written through atomic_write(), so a crash leaves
+        either the old or the new file.
+
+        Args:
+            data (list): A list of dictionaries to write.
+
+        Raises:
+            IOError: If an error occurs while writing the file.
+        """
+        start = time.perf_counter()
+        with atomic_write(self.file_path) as raw:
+            file = ChecksumWriter(raw)
+            json.dump(data, file)
+            file.flush()
+            if self.checksum:
+                raw.write(f"\n#crc32={file.crc:08x} length={file.length}\n".encode('ascii'))
+            size = raw.tell()
+        if metrics.enabled:
+            metrics.record_io("save", self.file_path, size, time.perf_counter() - start)
+
+    def record_change(self, entity, op, key, record=None):
+        """
+        Persist a single change by rewriting the file. Prefer record_changes()
+        (or a WriteBehindPersister) to batch changes into fewer rewrites.
+
+        Args:
+            entity (str): The kind of record changed ("books", "users" or "checkouts").
+            op (str): Either "put" or "delete".
+            key (int): The key of the changed record.
+            record: The changed object for "put", None for "delete".
+        """
+        self.record_changes(entity, [(op, key, record)])
+
+    def record_changes(self, entity, changes):
+        """
+        Apply several changes to the file with a single rewrite.
+
+        Unlike save_data, deletions are applied too. Repeated changes to the
+        same key collapse to the last one.
+
+        Args:
+            entity (str): The kind of record changed ("books", "users" or "checkouts").
+            changes (list): (op, key, record) tuples, as for record_change.
+
+        Raises:
+            IOError: If the file cannot be read or written.
+        """
+        latest = {}
+        for op, key, record in changes:
+            latest.pop(key, None)  # Re-inserting moves the key to the end, preserving the order of additions
+            latest[key] = record.to_dict() if op == "put" else None
+        try:
+            self.write_data(list(merge_changes(self.iter_data(), latest, KEY_FIELDS[entity])))
+        except IOError as e:
+            logger.error("Error saving changes to %s: %s", self.file_path, e)
+            raise
+    
+    def iter_books(self):
+        """
+        Stream books from the storage file, building one Book at a time.
+
+        Yields:
+            Book: Each stored book, in file order.
+
+        Raises:
+            Exception: If an error occurs while loading the books.
+        """
+        try:
+            for book in self.iter_data():
+                yield Book(**book)
+        except Exception as e:
+            logger.error("Error loading books: %s", e)
+            raise
+
+    def load_books(self):
+        """
+        Load all books from the storage file.
+
+        Returns:
+            list: A list of Book objects.
+
+        Raises:
+            Exception: If an error occurs while loading the books.
+        """
+        return list(self.iter_books())
+
+    def save_books(self, books):
+        """
+        Save all books to the storage file.
+
+        Args:
+            books (list): A list of Book objects to save.
+
+        Raises:
+            Exception: If an error occurs while saving the books.
+        """
+        try:
+            # Convert Book objects to dictionaries and save
+            book_data = [book.to_dict() for book in books]
+            self.save_data(book_data, 'isbn')
+        except Exception as e:
+            logger.error("Error saving books: %s", e)
+            raise
+
+    def iter_users(self):
+        """
+        Stream users from the storage file, building one User at a time.
+
+        Yields:
+            User: Each stored user, in file order.
+
+        Raises:
+            Exception: If an error occurs while loading the users.
+        """
+        try:
+            for user in self.iter_data():
+                yield User(**user)
+        except Exception as e:
+            logger.error("Error loading users: %s", e)
+            raise
+
+    def load_users(self):
+        """
+        Load all users from the storage file.
+
+        Returns:
+            list: A list of User objects.
+
+        Raises:
+            Exception: If an error occurs while loading the users.
+        """
+        return list(self.iter_users())
+
+    def save_users(self, users):
+        """
+        Save all users to the storage file.
+
+        Args:
+            users (list): A list of User objects to save.
+
+        Raises:
+            Exception: If an error occurs while saving the users.
+        """
+        try:
+            user_data = [user.to_dict() for user in users]
+            self.save_data(user_data, 'user_id')
+        except Exception as e:
+            logger.error("Error saving users: %s", e)
+            raise
+
+    def iter_checkouts(self):
+        """
+        Stream checkout transactions from the storage file, building one Checkout at a time.
+
+        Yields:
+            Checkout: Each stored checkout, in file order.
+
+        Raises:
+            Exception: If an error occurs while loading the checkouts.
+        """
+        try:
+            for checkout in self.iter_data():
+                yield Checkout(**checkout)
+        except Exception as e:
+            logger.error("Error loading checkouts: %s", e)
+            raise
+
+    def load_checkouts(self):
+        """
+        Load all checkout transactions from the storage file.
+
+        Returns:
+            list: A list of Checkout objects.
+
+        Raises:
+            Exception: If an error occurs while loading the checkouts.
+        """
+        return list(self.iter_checkouts())
+    
+    def save_checkouts(self, checkouts):
+        """
+        Save all checkout transactions to the storage file.
+
+        Args:
+            checkouts (list): A list of Checkout objects to save.
+
+        Raises:
+            Exception: If an error occurs while saving the checkouts.
+        """
+        try:
+            checkout_data = [checkout.to_dict() for checkout in checkouts]
+            self.save_data(checkout_data, 'isbn')
+        except Exception as e:
+            logger.error("Error saving checkouts: %s", e)
+            raise
+
+
+# Class for journaled storage: a JSON snapshot plus an append-only change log
+class JournalStorageManager(StorageManager):
+    def __init__(self, file_path, key_field, compact_threshold=10000, checksum=False):
+        """
+        Initialize a journaled storage manager.
+
+        Mutations are appended to "<file_path>.journal" as JSON lines through
+        record_change(), so each change costs one small write instead of a full
+        file rewrite. Loading replays the journal on top of the snapshot, and
+        compaction folds the journal back into the snapshot.
+
+        Args:
+            file_path (str): The file path of the JSON snapshot.
+            key_field (str): The field that uniquely identifies a record (e.g. 'isbn').
+            compact_threshold (int): Number of journal entries after which the
+                journal is compacted automatically. Defaults to 10000.
+            checksum (bool): Write a checksum footer on the snapshot. Defaults to False.
+        """
+        super().__init__(file_path, checksum)
+        self.key_field = key_field
+        self.journal_path = file_path + '.journal'
+        self.compact_threshold = compact_threshold
+        self._journal = None  # Append-mode file handle, opened on first write
+        self._journal_entries = 0  # Entries written since the last compaction
+
+    def iter_data(self):
+        """
+        Stream the snapshot with the journal applied on top of it.
+
+        Only the journal is held in memory: snapshot records are streamed and
+        replaced or dropped as they go by, and records added since the snapshot
+        follow at the end. A torn final journal line (from a crash mid-append)
+        is cut off the file with a warning (see _repair_torn_tail).
+
+        Yields:
+            dict: Each current record.
+
+        Raises:
+            Exception: If the snapshot or journal cannot be read.
+        """
+        yield from merge_changes(super().iter_data(), self._read_journal(), self.key_field)
+
+    def _read_journal(self):
+        """
+        Collapse the journal into the latest change per key.
+
+        Returns:
+            dict: Maps each changed key to its latest record, or None if it was deleted.
+        """
+        changes = {}
+        self._journal_entries = 0
+        self._repair_torn_tail()
+        try:
+            with open(self.journal_path, 'r') as journal:
+                lines = journal.readlines()
+        except FileNotFoundError:
+            return changes
+
+        for line_number, line in enumerate(lines, 1):
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                logger.error("Corrupt entry at line %s of journal %s", line_number, self.journal_path)
+                raise
+            # Re-inserting moves the key to the end, preserving the order of additions
+            changes.pop(entry["key"], None)
+            changes[entry["key"]] = entry.get("data") if entry["op"] == "put" else None
+            self._journal_entries += 1
+        return changes
+
+    def _repair_torn_tail(self):
+        """
+        Make the journal end on a complete line, so the next append starts a
+        line of its own. A last line missing only its newline is completed;
+        a torn one (from a crash mid-append) is truncated away with a warning.
+        """
+        try:
+            with open(self.journal_path, 'r+b') as journal:
+                size = journal.seek(0, os.SEEK_END)
+                if size == 0:
+                    return
+                journal.seek(size - 1)
+                if journal.read(1) == b"\n":
+                    return
+                journal.seek(0)
+                start = journal.read().rfind(b"\n") + 1  # Start of the unterminated last line
+                journal.seek(start)
+                try:
+                    json.loads(journal.read())
+                except ValueError:
+                    journal.truncate(start)
+                    logger.warning("Dropped incomplete last entry of journal %s", self.journal_path)
+                else:
+                    journal.write(b"\n")
+        except FileNotFoundError:
+            pass
+
+    def record_changes(self, entity, changes):
+        """
+        Append several changes to the journal with a single write and flush.
+
+        Args:
+            entity (str): The kind of record changed ("books", "users" or "checkouts").
+            changes (list): (op, key, record) tuples, as for record_change.
+
+        Raises:
+            IOError: If the journal cannot be written.
+        """
+        lines = []
+        for op, key, record in changes:
+            entry = {"op": op, "key": key}
+            if record is not None:
+                entry["data"] = record.to_dict()
+            lines.append(json.dumps(entry) + "\n")
+        start = time.perf_counter()
+        try:
+            if self._journal is None:
+                self._repair_torn_tail()
+                self._journal = open(self.journal_path, 'a')
+            text = "".join(lines)
+            self._journal.write(text)
+            self._journal.flush()
+            if metrics.enabled:
+                metrics.record_io("journal", self.journal_path, len(text.encode('utf-8')), time.perf_counter() - start)
+        except IOError as e:
+            logger.error("Error writing journal %s: %s", self.journal_path, e)
+            raise
+        self._journal_entries += len(lines)
+        if self._journal_entries >= self.compact_threshold:
+            self.compact()
+
+    def compact(self):
+        """
+        Fold the journal into a fresh snapshot and truncate the journal.
+        """
+        self.write_data(self.load_data())
+        logger.info("Compacted journal %s into %s", self.journal_path, self.file_path)
+
+    def write_data(self, data):
+        """
+        Write a full snapshot and truncate the journal.
+
+        The snapshot is written before the journal is cleared, so a crash in
+        between only replays changes that the snapshot already contains.
+
+        Args:
+            data (list): A list of dictionaries to write.
+        """
+        super().write_data(data)
+        self.close()
+        open(self.journal_path, 'w').close()
+        self._journal_entries = 0
+
+    def close(self):
+        """
+        Close the journal file handle if it is open.
+        """
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
@@ -0,0 +1,9 @@
+import logging
+import os
+import sys
+
+# Make the library modules importable when running the tests from any directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The managers log every operation; keep test runs from writing log records
+logging.disable(logging.CRITICAL)
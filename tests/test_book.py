@@ -0,0 +1,48 @@
+import pytest
+
+from book import BookManager
+
+# Record that fails while it is being validated
+class Unreadable(dict):
+    def get(self, key, default=None):
+        raise TypeError("unreadable record")
+
+def records(count, start=1):
+    return [{"title": f"Title {isbn}", "author": "Author", "isbn": isbn} for isbn in range(start, start + count)]
+
+def assert_fully_added(book_manager):
+    """
+    Every stored book has an ID, an availability bit and is found by search.
+    """
+    books = list(book_manager.books)
+    assert len(book_manager._ids) == len(books)
+    assert book_manager.count_available() == sum(book.available for book in books)
+    assert book_manager.find_books_by_title("title") == books
+
+def test_bulk_add_counts_duplicates_and_invalid_records():
+    book_manager = BookManager()
+    book_manager.add_book("Existing", "Author", 1)
+    summary = book_manager.bulk_add_books(records(3) + records(1, start=3) + [None, [2], {"isbn": "4", "title": "T", "author": "A"}])
+    assert summary == {"added": 2, "duplicates": 2, "invalid": 3}
+    assert [book.isbn for book in book_manager.books] == [1, 2, 3]
+
+def test_bulk_add_requires_boolean_availability():
+    book_manager = BookManager()
+    summary = book_manager.bulk_add_books([{"title": "A", "author": "B", "isbn": 1, "available": False},
+                                           {"title": "A", "author": "B", "isbn": 2, "available": "false"},
+                                           {"title": "A", "author": "B", "isbn": 3, "available": 0}])
+    assert summary == {"added": 1, "duplicates": 0, "invalid": 2}
+    assert book_manager.get_book(1).available is False
+
+@pytest.mark.parametrize("batch_size", [2, 10])
+def test_bulk_add_error_leaves_no_half_inserted_books(batch_size):
+    book_manager = BookManager()
+    bad = Unreadable(title="Bad", author="Author", isbn=99)
+    with pytest.raises(TypeError):
+        book_manager.bulk_add_books(records(5) + [bad] + records(3, start=6), batch_size=batch_size)
+    # Batches before the failing one are added in full; nothing of the failing batch is
+    assert [book.isbn for book in book_manager.books] == list(range(1, 5 // batch_size * batch_size + 1))
+    assert_fully_added(book_manager)
+    present = len(book_manager.books)
+    assert book_manager.bulk_add_books(records(8)) == {"added": 8 - present, "duplicates": present, "invalid": 0}
+    assert_fully_added(book_manager)
@@ -0,0 +1,63 @@
+import contextlib
+import io
+
+import pytest
+
+from book import BookManager
+from check import CheckoutManager
+from user import UserManager
+
+@pytest.fixture
+def managers():
+    user_manager, book_manager = UserManager(), BookManager()
+    with contextlib.redirect_stdout(io.StringIO()):
+        user_manager.add_user("Alice", 1)
+        book_manager.add_book("Dune", "Frank Herbert", 10)
+        book_manager.add_book("Emma", "Jane Austen", 11)
+    return user_manager, book_manager, CheckoutManager(user_manager, book_manager)
+
+@pytest.mark.parametrize("bad_op", [1, None, "checkout", [10, 1]])
+def test_batch_reports_non_object_operations_by_index(managers, bad_op):
+    _, book_manager, checkout_manager = managers
+    result = checkout_manager.apply_batch([{"op": "checkout", "user_id": 1, "isbn": 10}, bad_op])
+    assert result["applied"] is False
+    assert result["count"] == 2
+    assert [error["index"] for error in result["errors"]] == [1]
+    assert list(checkout_manager.checkouts) == []
+    assert book_manager.get_book(10).available
+
+def test_batch_applies_all_operations(managers):
+    _, book_manager, checkout_manager = managers
+    result = checkout_manager.apply_batch([{"op": "checkout", "user_id": 1, "isbn": 10},
+                                           {"op": "checkout", "user_id": 1, "isbn": 11},
+                                           {"op": "return", "user_id": 1, "isbn": 11}])
+    assert result == {"applied": True, "count": 3, "errors": []}
+    assert [checkout.isbn for checkout in checkout_manager.checkouts] == [10]
+    assert not book_manager.get_book(10).available
+    assert book_manager.get_book(11).available
+
+# Observer recording whether the checkout manager's write lock was held when it was notified
+class LockProbe:
+    def __init__(self, checkout_manager):
+        self.checkout_manager = checkout_manager
+        self.locked = []
+
+    def record_change(self, entity, op, key, record=None):
+        self.record_changes(entity, [(op, key, record)])
+
+    def record_changes(self, entity, changes):
+        self.locked.append(self.checkout_manager.lock._writer is not None)
+
+def test_observers_run_outside_the_write_lock():
+    user_manager, book_manager = UserManager(), BookManager()
+    with contextlib.redirect_stdout(io.StringIO()):
+        user_manager.add_user("Alice", 1)
+        book_manager.add_book("Dune", "Frank Herbert", 10)
+        book_manager.add_book("Emma", "Jane Austen", 11)
+        checkout_manager = CheckoutManager(user_manager, book_manager, concurrent=True)
+        probe = LockProbe(checkout_manager)
+        checkout_manager.observers.append(probe)
+        assert checkout_manager.checkout_book(1, 10)
+        assert checkout_manager.return_book(10, 1)
+        assert checkout_manager.apply_batch([{"op": "checkout", "user_id": 1, "isbn": 11}])["applied"]
+    assert probe.locked == [False, False, False]
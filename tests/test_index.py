@@ -0,0 +1,119 @@
+"""
+Randomized equivalence checks: searches answered from the trigram indexes
+must return exactly what the original list comprehensions returned, e.g.
+[book for book in books if title.lower() in book.title.lower()], in the same
+order, after any sequence of additions, updates and removals.
+"""
+import contextlib
+import io
+import random
+
+import pytest
+
+from book import BookManager
+from index import TrigramIndex
+from user import UserManager
+
+# Small alphabet so random queries hit often; includes letters whose lowercase
+# form differs in length or script ('İ' lowers to two characters)
+ALPHABET = "abcdeABCDE  ÉéİßŒ"
+SEEDS = range(20)
+
+def random_text(rng, max_length=12):
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, max_length)))
+
+def random_queries(rng, texts, count=40):
+    """
+    Queries of every length from 0 to 5, half of them taken from existing
+    texts (with their case changed) so that most have matches.
+    """
+    queries = []
+    for _ in range(count):
+        text = rng.choice(texts) if texts else ""
+        if text and rng.random() < 0.5:
+            start = rng.randrange(len(text))
+            query = text[start:start + rng.randint(0, 5)]
+            query = query.upper() if rng.random() < 0.5 else query.swapcase()
+        else:
+            query = random_text(rng, 5)
+        queries.append(query)
+    return queries
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_trigram_index_matches_substring_scan(seed):
+    rng = random.Random(seed)
+    index = TrigramIndex()
+    texts = {}  # The scanned collection: key -> text, in insertion order
+    for _ in range(300):
+        key = rng.randrange(60)
+        action = rng.random()
+        if action < 0.6:
+            text = random_text(rng)
+            texts[key] = text  # Updating an existing key keeps its position, as in the managers
+            index.add(key, text)
+        elif action < 0.8:
+            assert index.remove(key) == (texts.pop(key, None) is not None)
+        else:
+            for query in random_queries(rng, list(texts.values()), count=5):
+                assert index.search(query) == [k for k, text in texts.items() if query.lower() in text.lower()]
+    assert len(index) == len(texts)
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_book_searches_match_list_comprehension(seed):
+    rng = random.Random(seed)
+    book_manager = BookManager(cache_size=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(250):
+            isbn = rng.randrange(1, 80)
+            action = rng.random()
+            if action < 0.5:
+                book_manager.add_book(random_text(rng) or "x", random_text(rng) or "y", isbn)
+            elif action < 0.75:
+                book_manager.update_books(isbn, title=random_text(rng) or None, author=random_text(rng) or None)
+            else:
+                book_manager.remove_book(isbn)
+
+    books = list(book_manager.books)
+    for query in random_queries(rng, [book.title for book in books]):
+        assert book_manager.find_books_by_title(query) == \
+            [book for book in books if query.lower() in book.title.lower()]
+    for query in random_queries(rng, [book.author for book in books]):
+        assert book_manager.find_books_by_author(query) == \
+            [book for book in books if query.lower() in book.author.lower()]
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_user_name_search_matches_list_comprehension(seed):
+    rng = random.Random(seed)
+    user_manager = UserManager(cache_size=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(250):
+            user_id = rng.randrange(1, 80)
+            action = rng.random()
+            if action < 0.5:
+                user_manager.add_user(random_text(rng) or "x", user_id)
+            elif action < 0.75:
+                user_manager.update_user(user_id, name=random_text(rng) or None)
+            else:
+                user_manager.remove_user(user_id)
+
+    users = list(user_manager.users)
+    for query in random_queries(rng, [user.name for user in users]):
+        assert user_manager.find_users_by_name(query) == \
+            [user for user in users if query.lower() in user.name.lower()]
+
+def test_reloaded_collections_are_reindexed():
+    book_manager = BookManager(cache_size=0)
+    book_manager.add_book("Old Title", "Someone", 1)
+    book_manager.find_books_by_title("old")  # Build the indexes before replacing the collection
+    user_manager = UserManager(cache_size=0)
+    user_manager.add_user("Old Name", 1)
+    user_manager.find_users_by_name("old")
+
+    from book import Book
+    from user import User
+    book_manager.books = [Book("New Title", "Other", 2)]
+    user_manager.users = [User("New Name", 2)]
+    assert book_manager.find_books_by_title("old") == []
+    assert [book.isbn for book in book_manager.find_books_by_title("ew t")] == [2]
+    assert user_manager.find_users_by_name("old") == []
+    assert [user.user_id for user in user_manager.find_users_by_name("NEW")] == [2]
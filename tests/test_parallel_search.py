@@ -0,0 +1,38 @@
+import contextlib
+import io
+
+from book import BookManager
+from parallel_search import ParallelSearcher, scan_books
+
+def is_checked_out(book):
+    return not book.available
+
+def make_manager(count=200):
+    book_manager = BookManager()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for isbn in range(1, count + 1):
+            book_manager.add_book(f"Title {isbn}", f"Author {isbn % 7}", isbn)
+    return book_manager
+
+def test_results_match_single_process_scan():
+    book_manager = make_manager()
+    with ParallelSearcher(book_manager, workers=2) as searcher:
+        for pattern, field in (("title 1\\d$", "title"), ("author [35]", "author"), ("^(title 7|author 2)", "any")):
+            assert searcher.search(pattern, field) == scan_books(book_manager.books, pattern, field)
+
+def test_availability_changes_do_not_re_export():
+    book_manager = make_manager()
+    with ParallelSearcher(book_manager, workers=2) as searcher:
+        assert searcher.search(predicate=is_checked_out) == []
+        path = searcher._path
+        for isbn in (3, 50, 199):
+            book_manager.update_book_availability(isbn, False)
+        assert [book.isbn for book in searcher.search(predicate=is_checked_out)] == [3, 50, 199]
+        book_manager.update_book_availability(50, True)
+        assert [book.isbn for book in searcher.search("title", predicate=is_checked_out)] == [3, 199]
+        assert searcher._path == path
+
+        book_manager.update_books(3, title="Renamed")
+        assert [book.isbn for book in searcher.search("^renamed$")] == [3]
+        assert searcher._path != path
+        assert [book.isbn for book in searcher.search(predicate=is_checked_out)] == [3, 199]
@@ -0,0 +1,107 @@
+"""
+Cached searches must never return stale results: a stream of searches is
+interleaved with random mutations, and every search is answered by a cached
+manager and by an uncached one (cache_size=0) holding the same data.
+(benchmarks/stress_query_cache.py runs the same check at scale.)
+"""
+import contextlib
+import io
+import random
+
+import pytest
+
+from book import BookManager
+from cache import QueryCache
+from user import UserManager
+
+WORDS = ("Red", "red", "Sea", "season", "Night", "night", "Ant", "ÉTÉ", "été", "a", "")
+
+def random_text(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))).strip() or "x"
+
+def random_query(rng):
+    query = rng.choice(WORDS + ("re", "e", "ea", "sea", "ght n", "NIGHT", "d s"))
+    return query.upper() if rng.random() < 0.3 else query
+
+def search(book_manager, user_manager, kind, text):
+    if kind == "title":
+        return [(b.isbn, b.title, b.author, b.available) for b in book_manager.find_books_by_title(text)]
+    if kind == "author":
+        return [(b.isbn, b.title, b.author, b.available) for b in book_manager.find_books_by_author(text)]
+    return [(u.user_id, u.name) for u in user_manager.find_users_by_name(text)]
+
+def mutate(rng, managers):
+    """
+    Apply one random mutation, identically, to every (book_manager, user_manager) pair.
+    """
+    choice = rng.randrange(7)
+    key = rng.randint(1, 40)
+    title, author, name = random_text(rng), random_text(rng), random_text(rng)
+    new_title = title if rng.random() < 0.5 else None
+    available = rng.random() < 0.5
+    for book_manager, user_manager in managers:
+        if choice == 0:
+            book_manager.add_book(title, author, key)
+        elif choice == 1:
+            book_manager.update_books(key, title=new_title, author=author)
+        elif choice == 2:
+            book_manager.remove_book(key)
+        elif choice == 3:
+            book_manager.update_book_availability(key, available)
+        elif choice == 4:
+            user_manager.add_user(name, key)
+        elif choice == 5:
+            user_manager.update_user(key, name)
+        else:
+            user_manager.remove_user(key)
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("cache_size", [4, 1024])
+def test_cached_searches_are_never_stale(seed, cache_size):
+    rng = random.Random(seed)
+    cached = (BookManager(cache_size=cache_size), UserManager(cache_size=cache_size))
+    uncached = (BookManager(cache_size=0), UserManager(cache_size=0))
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(1500):
+            if rng.random() < 0.3:
+                mutate(rng, (cached, uncached))
+                continue
+            kind, text = rng.choice(("title", "author", "name")), random_query(rng)
+            assert search(*cached, kind, text) == search(*uncached, kind, text)
+    assert cached[0].query_cache.stats()["hits"] > 0
+    assert cached[1].query_cache.stats()["hits"] > 0
+
+def test_replacing_the_collection_clears_the_cache():
+    book_manager, user_manager = BookManager(), UserManager()
+    with contextlib.redirect_stdout(io.StringIO()):
+        book_manager.add_book("Dune", "Herbert", 1)
+        user_manager.add_user("Alice", 1)
+    assert len(book_manager.find_books_by_title("dune")) == 1
+    assert len(user_manager.find_users_by_name("ali")) == 1
+    book_manager.books = []
+    user_manager.users = []
+    assert book_manager.find_books_by_title("dune") == []
+    assert user_manager.find_users_by_name("ali") == []
+
+def test_invalidate_drops_only_matching_queries():
+    cache = QueryCache()
+    for field, query in (("title", ""), ("title", "r"), ("title", "ed s"), ("title", "red"),
+                         ("title", "blue"), ("author", "red"), ("title", "reds")):
+        cache.put((field, query), ())
+    assert cache.invalidate("title", "red sea") == 4
+    assert cache.get(("title", "blue")) == ()
+    assert cache.get(("author", "red")) == ()
+    assert cache.get(("title", "reds")) == ()
+    assert cache.get(("title", "r")) is None
+    assert cache.invalidate("title", "") == 0
+
+def test_evicted_and_cleared_keys_leave_the_buckets():
+    cache = QueryCache(maxsize=2)
+    for query in ("abc", "abd", "abe"):
+        cache.put(("title", query), ())
+    assert cache.get(("title", "abc")) is None
+    assert cache.invalidate("title", "abc abd abe") == 2
+    assert len(cache) == 0 and cache._buckets == {}
+    cache.put(("title", "abc"), ())
+    cache.clear()
+    assert cache._buckets == {}
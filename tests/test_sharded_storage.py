@@ -0,0 +1,110 @@
+import json
+import os
+
+import pytest
+
+from book import Book, BookManager
+from sharded_storage import ShardedStorageManager, join, split
+from storage import StorageManager, check_layout, read_footer, read_shard_manifest
+
+def make_storage(tmp_path, shards=4, **options):
+    return ShardedStorageManager(str(tmp_path / "books.json"), 'isbn', shards, **options)
+
+def book_records(count):
+    return [Book(f"Title {isbn}", "Author", isbn).to_dict() for isbn in range(count)]
+
+def modification_times(storage):
+    return [os.stat(path).st_mtime_ns for path in storage.paths]
+
+def test_tracked_save_writes_only_changed_shards(tmp_path):
+    storage = make_storage(tmp_path)
+    storage.save_data(book_records(20), 'isbn')
+    book_manager = BookManager()
+    book_manager.books = storage.iter_books()
+    book_manager.observers.append(storage.track_changes())
+    for path in storage.paths:
+        os.utime(path, ns=(0, 0))
+
+    book_manager.update_books(5, title="Changed")  # Shard 1
+    book_manager.remove_book(6)  # Shard 2
+    storage.save_books(book_manager.books)
+    assert [time != 0 for time in modification_times(storage)] == [False, True, True, False]
+    assert {record["isbn"]: record["title"] for record in storage.load_data()} == \
+        {book.isbn: book.title for book in book_manager.books}
+
+    os.utime(storage.paths[1], ns=(0, 0))
+    storage.save_books(book_manager.books)  # Nothing changed since
+    assert modification_times(storage)[1] == 0
+
+def test_untracked_save_writes_every_shard(tmp_path):
+    storage = make_storage(tmp_path)
+    storage.save_data(book_records(8), 'isbn')
+    for path in storage.paths:
+        os.utime(path, ns=(0, 0))
+    storage.save_data(book_records(8), 'isbn')
+    assert all(modification_times(storage))
+
+def test_failed_save_keeps_shards_dirty(tmp_path, monkeypatch):
+    storage = make_storage(tmp_path)
+    storage.save_data(book_records(8), 'isbn')
+    storage.track_changes().record_change("books", "put", 3)
+
+    def fail(index, data):
+        raise IOError("disk full")
+    monkeypatch.setattr(storage, "write_shard", fail)
+    with pytest.raises(IOError):
+        storage.save_data(book_records(8), 'isbn')
+    monkeypatch.undo()
+    os.utime(storage.paths[3], ns=(0, 0))
+    storage.save_data(book_records(8), 'isbn')
+    assert modification_times(storage)[3] != 0
+
+def test_first_save_splits_the_file_and_writes_the_manifest(tmp_path):
+    StorageManager(str(tmp_path / "books.json")).write_data(book_records(10))
+    storage = make_storage(tmp_path)
+    assert not storage.has_shards()
+    records = storage.load_data()
+    storage.save_data(records, 'isbn')
+    assert storage.has_shards()
+    assert read_shard_manifest(storage.file_path) == 4
+    assert not os.path.exists(storage.file_path)  # No stale unsharded copy is left
+    reopened = make_storage(tmp_path)
+    assert reopened.has_shards()
+    assert sorted(record["isbn"] for record in reopened.load_data()) == list(range(10))
+    assert reopened.find_record(7)["title"] == "Title 7"
+    assert [record["isbn"] % 4 for record in reopened.load_shard(3)] == [3, 3]
+
+def test_mismatched_layouts_are_refused(tmp_path):
+    make_storage(tmp_path).save_data(book_records(4), 'isbn')
+    with pytest.raises(ValueError):
+        make_storage(tmp_path, shards=3)
+    with pytest.raises(ValueError):
+        StorageManager(str(tmp_path / "books.json"))
+    check_layout(str(tmp_path / "books.json"), 4)
+
+def test_split_and_join_round_trip(tmp_path):
+    path = str(tmp_path / "books.json")
+    StorageManager(path).write_data(book_records(9))
+    assert split(path, 'isbn', 4, checksum=True) == 9
+    assert read_shard_manifest(path) == 4 and not os.path.exists(path)
+    assert join(path, 'isbn', 4) == 9
+    assert read_shard_manifest(path) is None
+    assert not any(name.startswith("books-") for name in os.listdir(tmp_path))
+    assert sorted(record["isbn"] for record in StorageManager(path).load_data()) == list(range(9))
+
+def test_corrupt_shard_is_rejected_and_missing_footer_is_rewritten(tmp_path):
+    storage = make_storage(tmp_path, checksum=True)
+    storage.save_data(book_records(8), 'isbn')
+    with open(storage.paths[1], 'rb') as raw:
+        data = raw.read()
+    with open(storage.paths[1], 'wb') as raw:
+        raw.write(data.replace(b"Title 5", b"Title 6"))
+    with pytest.raises(IOError):
+        make_storage(tmp_path, checksum=True).load_data()
+
+    make_storage(tmp_path).write_shard(1, json.dumps(book_records(8)[1::4]).encode('utf-8'))  # No footer
+    storage = make_storage(tmp_path, checksum=True)
+    storage.track_changes()
+    storage.save_data(storage.load_data(), 'isbn')
+    with open(storage.paths[1], 'rb') as raw:
+        assert read_footer(raw)[0] is not None
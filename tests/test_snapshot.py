@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from book import Book, BookManager
+from snapshot import BookSnapshot, json_to_snapshot, snapshot_to_json, update_availability, write_snapshot
+from storage import StorageManager
+
+BOOKS = [Book("Été à Paris", "Zoë", 30, False), Book("Dune", "Frank Herbert", 10),
+         Book("Children of Dune", "Frank Herbert", 20), Book("", "", -1, False)]
+
+def fields(books):
+    return [(book.title, book.author, book.isbn, book.available) for book in books]
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = str(tmp_path / "books.bin")
+    write_snapshot(path, BOOKS)
+    return path
+
+def test_round_trip_keeps_order_fields_and_availability(snapshot_path):
+    with BookSnapshot(snapshot_path) as snapshot:
+        assert len(snapshot) == len(BOOKS)
+        assert fields(snapshot) == fields(BOOKS)
+        assert snapshot.count_available() == 2
+        assert fields([snapshot.get_book(20)]) == fields([BOOKS[2]])
+        assert snapshot.get_book(-1).title == ""
+        assert snapshot.get_book(15) is None
+
+def test_empty_snapshot(tmp_path):
+    path = str(tmp_path / "empty.bin")
+    assert write_snapshot(path, []) == 0
+    with BookSnapshot(path) as snapshot:
+        assert len(snapshot) == 0 and list(snapshot) == [] and snapshot.get_book(1) is None
+
+def test_duplicate_isbns_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        write_snapshot(str(tmp_path / "books.bin"), [Book("A", "B", 1), Book("C", "D", 1)])
+    assert not os.path.exists(tmp_path / "books.bin")
+
+@pytest.mark.parametrize("keep", [0, 16, 100, -3])
+def test_truncated_file_is_rejected(snapshot_path, keep):
+    with open(snapshot_path, 'rb') as file:
+        data = file.read()
+    with open(snapshot_path, 'wb') as file:
+        file.write(data[:keep])
+    with pytest.raises(ValueError):
+        BookSnapshot(snapshot_path)
+
+def test_other_files_are_rejected(tmp_path):
+    path = str(tmp_path / "books.json")
+    StorageManager(path).write_data([book.to_dict() for book in BOOKS])
+    with pytest.raises(ValueError):
+        BookSnapshot(path)
+
+def test_json_conversion_round_trip(tmp_path, snapshot_path):
+    json_path, copy_path = str(tmp_path / "books.json"), str(tmp_path / "copy.bin")
+    assert snapshot_to_json(snapshot_path, json_path) == len(BOOKS)
+    assert json_to_snapshot(json_path, copy_path) == len(BOOKS)
+    with open(snapshot_path, 'rb') as original, open(copy_path, 'rb') as copy:
+        assert original.read() == copy.read()
+
+def test_update_availability_is_seen_through_an_open_mapping(snapshot_path):
+    with BookSnapshot(snapshot_path) as snapshot:
+        books = list(snapshot)
+        for book in books:
+            book.available = not book.available
+        update_availability(snapshot_path, books)
+        assert [snapshot.is_available(row) for row in range(len(books))] == [book.available for book in books]
+    with pytest.raises(ValueError):
+        update_availability(snapshot_path, books[:2])
+
+def test_manager_serves_a_snapshot_without_materializing_it(snapshot_path):
+    book_manager = BookManager()
+    with BookSnapshot(snapshot_path) as snapshot:
+        book_manager.load_snapshot(snapshot)
+        assert book_manager.get_book(10).title == "Dune"
+        assert book_manager.count_available() == 2
+        assert fields(book_manager.find_books_by_author("herbert")) == fields(BOOKS[1:3])
@@ -0,0 +1,15 @@
+from book import Book
+from check import Checkout
+from sqlite_storage import SQLiteStorageManager
+from user import User
+
+def test_rows_load_in_primary_key_order(tmp_path):
+    storage = SQLiteStorageManager(str(tmp_path / "library.db"))
+    storage.save_books([Book("Emma", "Jane Austen", 30), Book("Dune", "Frank Herbert", 10, False)])
+    storage.save_users([User("Bob", 2), User("Alice", 1)])
+    storage.save_checkouts([Checkout(2, 30), Checkout(1, 10)])
+    storage.upsert("books", Book("Ulysses", "James Joyce", 20))
+    assert [(book.isbn, book.available) for book in storage.load_books()] == [(10, False), (20, True), (30, True)]
+    assert [user.user_id for user in storage.load_users()] == [1, 2]
+    assert [checkout.isbn for checkout in storage.load_checkouts()] == [10, 30]
+    storage.close()
@@ -0,0 +1,116 @@
+import json
+import os
+import zlib
+
+import pytest
+
+from book import Book
+from storage import JournalStorageManager, StorageManager, atomic_write, read_footer
+
+@pytest.fixture
+def journaled(tmp_path):
+    storage = JournalStorageManager(str(tmp_path / "books.json"), 'isbn')
+    storage.write_data([Book("One", "Author", 1).to_dict()])
+    yield storage
+    storage.close()
+
+def isbns(storage):
+    return [record["isbn"] for record in storage.load_data()]
+
+def test_journal_replays_puts_and_deletes(journaled):
+    journaled.record_changes("books", [("put", 2, Book("Two", "Author", 2)), ("put", 3, Book("Three", "Author", 3))])
+    journaled.record_change("books", "delete", 1)
+    journaled.record_change("books", "put", 2, Book("Two, revised", "Author", 2))
+    assert {record["isbn"]: record["title"] for record in journaled.load_data()} == {2: "Two, revised", 3: "Three"}
+
+def test_torn_tail_is_dropped_before_new_appends(journaled):
+    journaled.record_change("books", "put", 2, Book("Two", "Author", 2))
+    journaled.close()
+    with open(journaled.journal_path, 'a') as journal:
+        journal.write('{"op": "put", "key": 4, "da')  # Crash mid-append
+
+    journaled.record_change("books", "put", 3, Book("Three", "Author", 3))
+    assert isbns(journaled) == [1, 2, 3]
+    journaled.record_change("books", "put", 5, Book("Five", "Author", 5))
+    assert isbns(journaled) == [1, 2, 3, 5]
+
+def test_torn_tail_is_truncated_on_load(journaled):
+    journaled.record_change("books", "put", 2, Book("Two", "Author", 2))
+    journaled.close()
+    size = os.path.getsize(journaled.journal_path)
+    with open(journaled.journal_path, 'a') as journal:
+        journal.write('{"op": "delete", "k')
+    assert isbns(journaled) == [1, 2]
+    assert os.path.getsize(journaled.journal_path) == size
+
+def test_entry_missing_only_its_newline_is_kept(journaled):
+    journaled.close()
+    with open(journaled.journal_path, 'a') as journal:
+        journal.write('{"op": "delete", "key": 1}')
+    journaled.record_change("books", "put", 2, Book("Two", "Author", 2))
+    assert isbns(journaled) == [2]
+
+def test_corrupt_entry_before_the_last_line_is_an_error(journaled):
+    journaled.close()
+    with open(journaled.journal_path, 'a') as journal:
+        journal.write('not json\n{"op": "delete", "key": 1}\n')
+    with pytest.raises(ValueError):
+        journaled.load_data()
+
+def test_crash_between_snapshot_and_truncate_replays_safely(journaled):
+    journaled.record_changes("books", [("put", 2, Book("Two", "Author", 2)), ("delete", 1, None),
+                                       ("put", 3, Book("Three", "Author", 3))])
+    expected = journaled.load_data()
+    # The snapshot is written but the journal is never truncated
+    StorageManager.write_data(journaled, expected)
+    assert os.path.getsize(journaled.journal_path) > 0
+    assert journaled.load_data() == expected
+    journaled.record_change("books", "put", 4, Book("Four", "Author", 4))
+    assert isbns(journaled) == [2, 3, 4]
+
+def test_checksum_footer_round_trip(tmp_path):
+    storage = StorageManager(str(tmp_path / "books.json"), checksum=True)
+    records = [Book("Été", "Author", isbn).to_dict() for isbn in range(3)]
+    storage.write_data(records)
+    with open(storage.file_path, 'rb') as raw:
+        length, crc = read_footer(raw)
+        data = raw.read()
+    assert data[:length] == json.dumps(records).encode('utf-8')
+    assert crc == zlib.crc32(data[:length])
+    assert data[length:] == f"\n#crc32={crc:08x} length={length}\n".encode('ascii')
+    assert storage.load_data() == records
+
+def test_corrupt_or_truncated_file_is_rejected(tmp_path):
+    storage = StorageManager(str(tmp_path / "books.json"), checksum=True)
+    storage.write_data([Book("Title", "Author", 1).to_dict()])
+    with open(storage.file_path, 'rb') as raw:
+        data = raw.read()
+    with open(storage.file_path, 'wb') as raw:
+        raw.write(data.replace(b"Title", b"Tytle"))
+    with pytest.raises(IOError):
+        storage.load_data()
+    with open(storage.file_path, 'wb') as raw:
+        raw.write(data[:5] + data[10:])  # Bytes lost before the footer
+    with pytest.raises(IOError):
+        storage.load_data()
+
+def test_file_without_footer_loads_and_gains_one_on_save(tmp_path):
+    StorageManager(str(tmp_path / "books.json")).write_data([Book("Title", "Author", 1).to_dict()])
+    storage = StorageManager(str(tmp_path / "books.json"), checksum=True)
+    records = storage.load_data()
+    assert [record["isbn"] for record in records] == [1]
+    storage.save_data(records, 'isbn')
+    with open(storage.file_path, 'rb') as raw:
+        assert read_footer(raw)[0] is not None
+
+def test_failed_atomic_write_leaves_the_file_untouched(tmp_path):
+    path = str(tmp_path / "books.json")
+    with atomic_write(path) as file:
+        file.write(b"old")
+    with pytest.raises(RuntimeError):
+        with atomic_write(path) as file:
+            file.write(b"new")
+            raise RuntimeError("crash while writing")
+    with open(path, 'rb') as file:
+        assert file.read() == b"old"
+    assert os.listdir(tmp_path) == ["books.json"]
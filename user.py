@@ -4,9 +4,19 @@
 #     users.append({"name": name, "user_id": user_id})
 
 import logging
+import threading
+from cache import QueryCache
+from eventlog import should_log
+from index import TrigramIndex
+from locks import RWLock, reads, writes
+from metrics import timed
+
+logger = logging.getLogger(__name__)
 
 # Class representing a user in the library system
 class User:
+    __slots__ = ('name', 'user_id')  # No per-instance __dict__, to keep large user bases small
+
     def __init__(self, name, user_id):
         """
         Initialize a new User object.
@@ -17,6 +27,15 @@ class User:
         """
         self.name = name
         self.user_id = user_id
+
+    def to_dict(self):
+        """
+        Dictionary of the user's fields, as stored in user.json.
+
+        Returns:
+            dict: The name and user_id fields.
+        """
+        return {"name": self.name, "user_id": self.user_id}
     
     def __str__(self):
         """
@@ -29,12 +48,130 @@ class User:
     
 # Class for managing a collection of users
 class UserManager:
-    def __init__(self):
+    def __init__(self, concurrent=False, cache_size=1024):
         """
         Initialize a new UserManager object to manage user collections.
+
+        Args:
+            concurrent (bool): Guard the collection with a reader-writer lock so
+                it can be shared between threads. Defaults to False.
+            cache_size (int): Number of name search results kept in the LRU
+                query cache. Defaults to 1024; 0 disables the cache.
+        """
+        self._users = {}  # Primary index mapping user ID to User, kept in insertion order
+        self._name_index = TrigramIndex()  # Substring index over user names
+        self.observers = []  # Objects notified of every mutation via record_change()
+        self.lock = RWLock() if concurrent else None  # Reader-writer lock in concurrent mode
+        self._loader = None  # Callable returning the users, run on first use (see load_lazily)
+        self._load_lock = threading.Lock()  # Lets only one reader run the lazy load
+        self.query_cache = QueryCache(cache_size)  # Name search results by normalized query
+
+    @property
+    def users(self):
+        """
+        View of all User objects in the collection, in insertion order.
+
+        Returns:
+            dict_values: An iterable view over the stored users.
+        """
+        self._ensure_loaded()
+        return self._users.values()
+
+    @users.setter
+    @writes
+    def users(self, users):
+        """
+        Replace the collection with the given users and rebuild the indexes.
+
+        Args:
+            users (iterable): An iterable of User objects.
+        """
+        self._replace_users(users)
+
+    def _replace_users(self, users):
+        """
+        Replace the collection and rebuild the name index (the users setter,
+        without taking the write lock).
+
+        Args:
+            users (iterable): An iterable of User objects.
+        """
+        self._users = {user.user_id: user for user in users}
+        self._name_index.clear()
+        for user in self._users.values():
+            self._name_index.add(user.user_id, user.name)
+        self.query_cache.clear()
+        self._loader = None
+
+    def _invalidate_cached_searches(self, name):
+        """
+        Drop the cached name searches that match a user's name, i.e. whose
+        results include (or now should include) that user.
+
+        Args:
+            name (str): The user's name (call again with the old one after a change).
+        """
+        self.query_cache.invalidate("name", name.lower())
+
+    @writes
+    def load_lazily(self, loader):
+        """
+        Empty the collection and defer loading it until it is first used.
+
+        Args:
+            loader (callable): Returns an iterable of User objects, e.g. a
+                storage's iter_users method.
+        """
+        self._replace_users(())
+        self._loader = loader
+
+    def is_loaded(self):
+        """
+        Check whether the users are in memory (no lazy load pending).
+
+        Returns:
+            bool: True if the users have been loaded.
+        """
+        return self._loader is None
+
+    def _ensure_loaded(self):
+        """
+        Run a pending lazy load.
         """
-        self.users = []  # List to store all User objects
+        if self._loader is None:
+            return
+        with self._load_lock:
+            if self._loader is not None:
+                self._replace_users(self._loader())
+                logger.info("Loaded %s users on first use", len(self._users))
 
+    def _notify(self, op, key, record=None):
+        """
+        Report a change to every registered observer (e.g. a journaled storage).
+
+        Args:
+            op (str): Either "put" (added or updated) or "delete".
+            key (int): The user ID of the changed user.
+            record: The changed object for "put", None for "delete".
+        """
+        for observer in self.observers:
+            observer.record_change("users", op, key, record)
+
+    def exists(self, user_id):
+        """
+        Check whether a user with the given ID exists, without logging.
+
+        Args:
+            user_id (int): The unique ID of the user.
+
+        Returns:
+            bool: True if the user exists, False otherwise.
+        """
+        self._ensure_loaded()
+        return user_id in self._users
+
+    @timed
+    @writes
     def add_user(self, name, user_id):
         """
         Add a new user to the collection.
@@ -50,23 +187,29 @@ class UserManager:
             # Ensure user ID is an integer
             if not isinstance(user_id, int):
                 raise ValueError("User ID must be an integer.")
+            self._ensure_loaded()
             
             # Check for duplicate user IDs
-            if any(user.user_id == user_id for user in self.users):
+            if user_id in self._users:
                 print(f"A user with ID {user_id} already exists.")
                 return
             
             # Add new user to collection
             new_user = User(name, user_id)
-            self.users.append(new_user)
-            logging.info(f"User added: {new_user}")
+            self._users[user_id] = new_user
+            self._name_index.add(user_id, name)
+            self._invalidate_cached_searches(name)
+            self._notify("put", user_id, new_user)
+            logger.info("User added: %s", new_user, extra={"event": "user.add", "user_id": user_id})
         except ValueError as ve:
-            logging.error(f"Value error when adding user: {ve}")
+            logger.error("Value error when adding user: %s", ve)
             raise
         except Exception as e:
-            logging.error(f"Error adding user: {e}")
+            logger.error("Error adding user: %s", e)
             raise
 
+    @timed
+    @reads
     def list_users(self):
         """
         List all users in the collection.
@@ -78,9 +221,10 @@ class UserManager:
             for user in self.users:
                 print(user)
         except Exception as e:
-            logging.error(f"Error listing users: {e}")
+            logger.error("Error listing users: %s", e)
             raise
 
+    @timed
     def find_user_by_id(self, user_id):
         """
         Find a user in the collection by their ID.
@@ -98,24 +242,31 @@ class UserManager:
             if not isinstance(user_id, int):
                 raise ValueError("User ID must be an integer.")
             
-            # Search for user by ID
-            for user in self.users:
-                if user.user_id == user_id:
-                    logging.info(f"User found by ID: {user}")
-                    return user
+            # Look up user in the ID index
+            self._ensure_loaded()
+            user = self._users.get(user_id)
+            if user:
+                if should_log(logger, "user.lookup"):
+                    logger.info("User found by ID: %s", user, extra={"event": "user.lookup", "user_id": user_id})
+                return user
             
-            logging.warning(f"User not found by ID: {user_id}")
+            if should_log(logger, "user.lookup", logging.WARNING):
+                logger.warning("User not found by ID: %s", user_id, extra={"event": "user.lookup", "user_id": user_id})
             return None
         except ValueError as ve:
-            logging.error(f"Value error when searching user: {ve}")
+            logger.error("Value error when searching user: %s", ve)
             raise
         except Exception as e:
-            logging.error(f"Error searching users by id: {user_id} : {e}")
+            logger.error("Error searching users by id: %s : %s", user_id, e)
             raise
 
+    @timed
+    @reads
     def find_users_by_name(self, name):
         """
         Find users in the collection by name.
+        Results are cached by lowercased name (see query_cache) until a
+        change touches a matching user.
 
         Args:
             name (str): The name of the user to search for.
@@ -124,13 +275,23 @@ class UserManager:
             list: A list of users that match the search name.
         """
         try:
-            results = [user for user in self.users if name.lower() in user.name.lower()]
-            logging.info(f"Found {len(results)} users with name as: '{name}'")
+            key = ("name", name.lower())
+            cached = self.query_cache.get(key)
+            if cached is not None:
+                return list(cached)
+            self._ensure_loaded()
+            results = [self._users[user_id] for user_id in self._name_index.search(name)]
+            self.query_cache.put(key, tuple(results))
+            if should_log(logger, "user.search"):
+                logger.info("Found %s users with name as: '%s'", len(results), name,
+                            extra={"event": "user.search", "query": name, "results": len(results)})
             return results
         except Exception as e:
-            logging.error(f"Error searching users by name: {name} : {e}")
+            logger.error("Error searching users by name: %s : %s", name, e)
             raise
 
+    @timed
+    @writes
     def remove_user(self, user_id):
         """
         Remove a user from the collection by their ID.
@@ -148,22 +309,27 @@ class UserManager:
             if not isinstance(user_id, int):
                 raise ValueError("User ID must be an integer.")
             
-            # Find user to remove
-            user_to_remove = self.find_user_by_id(user_id)
+            # Remove user from the ID and name indexes
+            self._ensure_loaded()
+            user_to_remove = self._users.pop(user_id, None)
             if user_to_remove:
-                self.users.remove(user_to_remove)
-                logging.info(f"User removed: {user_to_remove}")
+                self._name_index.remove(user_id)
+                self._invalidate_cached_searches(user_to_remove.name)
+                self._notify("delete", user_id)
+                logger.info("User removed: %s", user_to_remove, extra={"event": "user.remove", "user_id": user_id})
                 return True
             
-            logging.warning(f"Failed to remove user: ID {user_id} not found")
+            logger.warning("Failed to remove user: ID %s not found", user_id)
             return False
         except ValueError as ve:
-            logging.error(f"Value error when removing user: {ve}")
+            logger.error("Value error when removing user: %s", ve)
             raise
         except Exception as e:
-            logging.error(f"Error removing users by id: {user_id} : {e}")
+            logger.error("Error removing users by id: %s : %s", user_id, e)
             raise
 
+    @timed
+    @writes
     def update_user(self, user_id, name=None):
         """
         Update a user's information in the collection.
@@ -183,18 +349,23 @@ class UserManager:
                 raise ValueError("User ID must be an integer.")
             
             # Find user to update
-            user_to_update = self.find_user_by_id(user_id)
+            self._ensure_loaded()
+            user_to_update = self._users.get(user_id)
             if user_to_update:
                 if name:
+                    self._invalidate_cached_searches(user_to_update.name)
                     user_to_update.name = name
-                    logging.info(f"User updated: {user_to_update}")
+                    self._name_index.add(user_id, name)
+                    self._invalidate_cached_searches(name)
+                    self._notify("put", user_id, user_to_update)
+                    logger.info("User updated: %s", user_to_update, extra={"event": "user.update", "user_id": user_id})
                 return True
             
-            logging.warning(f"Failed to update user: ID {user_id} not found")
+            logger.warning("Failed to update user: ID %s not found", user_id)
             return False   
         except ValueError as ve:
-            logging.error(f"Value error when updating user: {ve}")
+            logger.error("Value error when updating user: %s", ve)
             raise 
         except Exception as e:
-            logging.error(f"Error updating user by id: {user_id} : {e}")
+            logger.error("Error updating user by id: %s : %s", user_id, e)
             raise